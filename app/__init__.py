@@ -22,6 +22,7 @@ from flask_sqlalchemy import SQLAlchemy  # ORM for Model layer
 from flask_login import LoginManager     # Authentication support
 from werkzeug.middleware.proxy_fix import ProxyFix
 from sqlalchemy.orm import DeclarativeBase
+from app.replica import RoutingSession  # Sends reads of @read_replica routes to the replica
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -39,9 +40,12 @@ class Base(DeclarativeBase):
 # These are initialized here but configured in create_app()
 # - db: Database ORM (Model layer support)
 # - login_manager: User authentication (Controller layer support)
-db = SQLAlchemy(model_class=Base)
+db = SQLAlchemy(model_class=Base, session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 
+# Values accepted by CASHBOOK_STARTUP (see Step 4d)
+STARTUP_MODES = ('full', 'fast')
+
 # ===========================================
 # STEP 4: Application Factory Function
 # ===========================================
@@ -60,6 +64,15 @@ def create_app():
     # Step 4c: Configure proxy settings (for production behind reverse proxy)
     app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
     
+    # Step 4d: Startup mode
+    # 'full' = test the database connection, create tables and seed defaults on every start
+    # 'fast' = for serverless cold starts: schema and seed data come from `flask init-db`,
+    #          startup only checks that the stored schema version matches the models
+    app.config['STARTUP_MODE'] = os.environ.get("CASHBOOK_STARTUP", "full")
+    if app.config['STARTUP_MODE'] not in STARTUP_MODES:
+        raise ValueError(f"CASHBOOK_STARTUP must be one of {', '.join(STARTUP_MODES)}, "
+                         f"not {app.config['STARTUP_MODE']!r}")
+    
     # ===========================================
     # STEP 5: Database Configuration (Model Layer Setup)
     # ===========================================
@@ -67,29 +80,46 @@ def create_app():
     database_url = os.environ.get("DATABASE_URL")
     use_sqlite = False
     
+    # Step 5a-2: Connection pool per process (app/db_pool.py)
+    # Keep workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) below PostgreSQL's max_connections
+    app.config['DB_POOL_SIZE'] = int(os.environ.get("DB_POOL_SIZE", 5))
+    app.config['DB_MAX_OVERFLOW'] = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+    app.config['DB_POOL_TIMEOUT'] = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+    app.config['DB_POOL_RECYCLE'] = int(os.environ.get("DB_POOL_RECYCLE", 300))
+    # Liveness check on checkout: 'always' (a round trip each time), 'idle'
+    # (only connections unused for DB_POOL_PING_IDLE_SECONDS) or 'off'
+    app.config['DB_POOL_PRE_PING'] = os.environ.get("DB_POOL_PRE_PING", "idle")
+    app.config['DB_POOL_PING_IDLE_SECONDS'] = float(os.environ.get("DB_POOL_PING_IDLE_SECONDS", 10))
+    
+    # Step 5a-3: Optional read replica (app/replica.py)
+    # Routes marked @read_replica read from it; after a user's own write their reads
+    # stay on the primary for REPLICA_STICKY_SECONDS
+    replica_url = os.environ.get("READ_REPLICA_URL")
+    app.config['REPLICA_STICKY_SECONDS'] = float(os.environ.get("REPLICA_STICKY_SECONDS", 10))
+    
     if database_url and 'postgres' in database_url.lower():
         # Step 5b: Test PostgreSQL connection before committing
+        # Fast startup skips this extra connection; the pool connects on first use
         try:
-            import psycopg2
-            from urllib.parse import urlparse
-            
-            # Parse the DATABASE_URL to extract connection parameters
-            parsed = urlparse(database_url)
-            test_conn = psycopg2.connect(
-                host=parsed.hostname,
-                port=parsed.port or 5432,
-                user=parsed.username,
-                password=parsed.password,
-                database=parsed.path[1:] if parsed.path else 'postgres'
-            )
-            test_conn.close()
+            if app.config['STARTUP_MODE'] != 'fast':
+                import psycopg2
+                from urllib.parse import urlparse
+                
+                # Parse the DATABASE_URL to extract connection parameters
+                parsed = urlparse(database_url)
+                test_conn = psycopg2.connect(
+                    host=parsed.hostname,
+                    port=parsed.port or 5432,
+                    user=parsed.username,
+                    password=parsed.password,
+                    database=parsed.path[1:] if parsed.path else 'postgres'
+                )
+                test_conn.close()
             
             # Step 5c: Connection successful, use PostgreSQL
             app.config["SQLALCHEMY_DATABASE_URI"] = database_url
-            app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-                "pool_recycle": 300,
-                "pool_pre_ping": True,
-            }
+            from app.db_pool import engine_options
+            app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
             logging.info("Using PostgreSQL database")
         except Exception as e:
             # Step 5d: PostgreSQL connection failed, fall back to SQLite
@@ -104,7 +134,10 @@ def create_app():
     if use_sqlite:
         # On Vercel, use /tmp directory for SQLite (writable filesystem)
         # In production, you should use PostgreSQL instead
-        if os.environ.get("VERCEL"):
+        # SQLITE_PATH overrides the file (e.g. a scratch database for the tests)
+        if os.environ.get("SQLITE_PATH"):
+            db_path = os.environ["SQLITE_PATH"]
+        elif os.environ.get("VERCEL"):
             db_path = "/tmp/cashbook.db"
         else:
             db_path = "cashbook.db"
@@ -112,6 +145,27 @@ def create_app():
         if not database_url:
             logging.info("No DATABASE_URL found, using SQLite database")
     
+    # Step 5f-2: SQLite PRAGMAs run on every connection (app/sqlite_profile.py)
+    # WAL lets request threads read while another one writes; "" keeps SQLite's default
+    app.config['SQLITE_BUSY_TIMEOUT'] = os.environ.get("SQLITE_BUSY_TIMEOUT", "5000")  # ms
+    app.config['SQLITE_JOURNAL_MODE'] = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+    app.config['SQLITE_SYNCHRONOUS'] = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+    app.config['SQLITE_CACHE_SIZE'] = os.environ.get("SQLITE_CACHE_SIZE", "-65536")  # 64 MB
+    app.config['SQLITE_MMAP_SIZE'] = os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))
+    app.config['SQLITE_TEMP_STORE'] = os.environ.get("SQLITE_TEMP_STORE", "MEMORY")
+    
+    # Step 5f-3: Register the read replica as the 'replica' bind
+    # Not when PostgreSQL was unreachable: the SQLite fallback holds different data
+    if replica_url and use_sqlite and database_url and 'postgres' in database_url.lower():
+        logging.warning("Read replica disabled while running on the SQLite fallback")
+    elif replica_url:
+        replica = {'url': replica_url}
+        if 'postgres' in replica_url.lower():
+            from app.db_pool import engine_options
+            replica.update(engine_options(app.config, bind_key='replica'))
+        app.config['SQLALCHEMY_BINDS'] = {'replica': replica}
+        logging.info("Using read replica for read-only routes")
+    
     # Step 5g: Disable SQLAlchemy modification tracking (performance)
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     
@@ -120,6 +174,8 @@ def create_app():
     # ===========================================
     # Step 6a: File upload configuration
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+    # Backup uploads on /backup/restore may be much larger than receipts
+    app.config['RESTORE_MAX_CONTENT_LENGTH'] = int(os.environ.get("RESTORE_MAX_CONTENT_LENGTH", 512 * 1024 * 1024))
     # On Vercel, use /tmp directory (writable filesystem)
     # In production, consider using cloud storage (S3, etc.)
     if os.environ.get("VERCEL"):
@@ -127,10 +183,55 @@ def create_app():
     else:
         app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
     
+    # Step 6a-2: Transaction list pagination ('offset' page numbers or 'keyset' cursors)
+    # Keyset pagination keeps deep pages as fast as the first one on large ledgers
+    app.config['TRANSACTIONS_PAGINATION'] = os.environ.get("TRANSACTIONS_PAGINATION", "offset")
+    
+    # Step 6a-3: Background report jobs (app/report_jobs.py)
+    # Worker threads per process, and seconds a finished report stays downloadable
+    app.config['REPORT_JOB_WORKERS'] = int(os.environ.get("REPORT_JOB_WORKERS", 2))
+    app.config['REPORT_JOB_TTL'] = int(os.environ.get("REPORT_JOB_TTL", 3600))
+    
+    # Step 6a-4: In-memory cache of generated reports (app/report_cache.py)
+    # Total bytes per process (0 disables it), and the largest single report kept
+    app.config['REPORT_CACHE_MAX_BYTES'] = int(os.environ.get("REPORT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    app.config['REPORT_CACHE_MAX_ENTRY_BYTES'] = int(os.environ.get("REPORT_CACHE_MAX_ENTRY_BYTES", 8 * 1024 * 1024))
+    
+    # Step 6a-5: Audit log writes (app/audit.py)
+    # 'session' = written by the request's own commit, 'async' = batched by a
+    # background thread, 'sync' = one commit per record
+    app.config['AUDIT_MODE'] = os.environ.get("AUDIT_MODE", "session")
+    app.config['AUDIT_QUEUE_SIZE'] = int(os.environ.get("AUDIT_QUEUE_SIZE", 10000))
+    app.config['AUDIT_BATCH_SIZE'] = int(os.environ.get("AUDIT_BATCH_SIZE", 500))
+    app.config['AUDIT_FLUSH_INTERVAL'] = float(os.environ.get("AUDIT_FLUSH_INTERVAL", 1.0))
+    # Whole months kept in the database; older ones go to compressed JSON Lines files
+    app.config['AUDIT_RETENTION_MONTHS'] = int(os.environ.get("AUDIT_RETENTION_MONTHS", 12))
+    app.config['AUDIT_ARCHIVE_FOLDER'] = os.environ.get(
+        "AUDIT_ARCHIVE_FOLDER", os.path.join(app.config['UPLOAD_FOLDER'], 'audit_archive'))
+    
+    # Step 6a-6: Per-process cache of logged-in users (app/user_cache.py)
+    # Deactivations and role changes made in another process show up within
+    # USER_CACHE_RECHECK_SECONDS, other edits within USER_CACHE_TTL seconds; TTL 0 = off
+    app.config['USER_CACHE_TTL'] = float(os.environ.get("USER_CACHE_TTL", 60))
+    app.config['USER_CACHE_MAX_ENTRIES'] = int(os.environ.get("USER_CACHE_MAX_ENTRIES", 10000))
+    app.config['USER_CACHE_RECHECK_SECONDS'] = float(os.environ.get("USER_CACHE_RECHECK_SECONDS", 5))
+    
+    # Step 6a-7: Compiled role permissions (app/permissions.py)
+    # How often each process checks whether another one changed the role permissions
+    app.config['PERMISSIONS_RECHECK_SECONDS'] = float(os.environ.get("PERMISSIONS_RECHECK_SECONDS", 5))
+    
     # Step 6b: Initialize extensions with app instance
     db.init_app(app)  # Connect database to app
     login_manager.init_app(app)  # Connect login manager to app
     
+    # Step 6b-2: Connection pool liveness checks and statistics (before the first connection)
+    from app.db_pool import init_pool
+    init_pool(app)
+    
+    # Step 6b-3: SQLite PRAGMAs on each new connection (before the first connection)
+    from app.sqlite_profile import init_sqlite_profile
+    init_sqlite_profile(app)
+    
     # Step 6c: Configure login manager settings
     login_manager.login_view = 'main.login'  # Redirect to login if not authenticated
     login_manager.login_message = 'Please log in to access this page.'
@@ -150,69 +251,20 @@ def create_app():
         # Step 7b: Import models to register them with SQLAlchemy
         from app import models
         
-        # Step 7c: Create all database tables based on Model definitions
-        # This reads app/models.py and creates tables for User, Transaction, etc.
-        db.create_all()
-        
-        # Step 7d: Seed database with initial data (Roles)
-        from app.models import User, Role
-        from werkzeug.security import generate_password_hash
-        
-        # Step 7e: Create default roles if none exist
-        if not Role.query.first():
-            admin_role = Role()
-            admin_role.name = 'Admin'
-            admin_role.description = 'Full system access'
-            
-            manager_role = Role()
-            manager_role.name = 'Manager'
-            manager_role.description = 'Add/view transactions, manage expenses, generate reports'
-            
-            viewer_role = Role()
-            viewer_role.name = 'Viewer'
-            viewer_role.description = 'Read-only access to data and reports'
-            
-            db.session.add(admin_role)
-            db.session.add(manager_role)
-            db.session.add(viewer_role)
-            db.session.commit()
-        
-        # Step 7f: Create default admin user if none exists
-        if not User.query.filter_by(username='admin').first():
-            admin_role = Role.query.filter_by(name='Admin').first()
-            admin_user = User()
-            admin_user.username = 'admin'
-            admin_user.email = 'admin@cashbook.com'
-            admin_user.password_hash = generate_password_hash('admin123')
-            admin_user.role_id = admin_role.id
-            admin_user.is_active = True
-            db.session.add(admin_user)
-            db.session.commit()
-            logging.info("Default admin user created: admin/admin123")
+        # Step 7b-2: Register the session events that keep compiled role
+        # permissions in sync (app/permissions.py) before anything is written
+        from app import permissions
         
-        # Step 7g: Create default categories if none exist
-        from app.models import Category
-        if not Category.query.first():
-            default_categories = [
-                {'name': 'Food & Dining', 'color': '#FF6B6B', 'is_system': True},
-                {'name': 'Transportation', 'color': '#4ECDC4', 'is_system': True},
-                {'name': 'Shopping', 'color': '#45B7D1', 'is_system': True},
-                {'name': 'Entertainment', 'color': '#96CEB4', 'is_system': True},
-                {'name': 'Bills & Utilities', 'color': '#FECA57', 'is_system': True},
-                {'name': 'Healthcare', 'color': '#FF9FF3', 'is_system': True},
-                {'name': 'Salary', 'color': '#54A0FF', 'is_system': True},
-                {'name': 'Investment', 'color': '#5F27CD', 'is_system': True},
-                {'name': 'Other', 'color': '#999999', 'is_system': True}
-            ]
-            
-            for cat_data in default_categories:
-                category = Category()
-                category.name = cat_data['name']
-                category.color = cat_data['color']
-                category.is_system = cat_data['is_system']
-                db.session.add(category)
-            
-            db.session.commit()
+        # Step 7c: Create tables and seed defaults (app/schema.py)
+        # Fast startup only checks the schema version stamp left by `flask init-db`
+        from app.schema import init_database, schema_is_current
+        if app.config['STARTUP_MODE'] == 'fast' and schema_is_current():
+            logging.info("Schema version is current, skipping database initialization")
+        else:
+            if app.config['STARTUP_MODE'] == 'fast':
+                logging.warning("Schema version is missing or out of date; initializing the database "
+                                "(run `flask init-db` after each deploy to keep cold starts fast)")
+            init_database()
     
     # ===========================================
     # STEP 8: Register Blueprints (Controller Layer)
@@ -225,6 +277,18 @@ def create_app():
     # This connects all routes in app/routes.py to the Flask app
     app.register_blueprint(main_blueprint)
     
+    # Step 8c: Register CLI maintenance commands (flask upgrade-db, ...)
+    from app.commands import register_commands
+    register_commands(app)
+    
+    # Step 8d: Commit audit records still pending at the end of a request
+    from app.audit import init_audit
+    init_audit(app)
+    
+    # Step 8e: Commit spending limit counters recomputed while serving a request
+    from app.models import commit_refreshed_counters
+    app.after_request(commit_refreshed_counters)
+    
     # ===========================================
     # STEP 9: Register Error Handlers (Controller Layer)
     # ===========================================
@@ -255,5 +319,5 @@ def create_app():
 # It's part of the authentication system (Controller layer support)
 @login_manager.user_loader
 def load_user(user_id):
-    from app.models import User
-    return User.query.get(int(user_id))
+    from app.user_cache import load_cached_user
+    return load_cached_user(int(user_id))
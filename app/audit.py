@@ -0,0 +1,368 @@
+"""
+===========================================
+AUDIT LOG - WRITING, RETENTION & QUERIES
+===========================================
+Writes AuditLog records without a commit of their own, moves old months
+out of the database into compressed archive files, and pages through the
+log for the audit API.
+
+log_audit_action() used to add the record and commit it by itself, so
+every login, create and delete paid for two commits (two fsyncs) instead
+of one. How records are written is now set by AUDIT_MODE:
+
+- 'session' (default): the record joins the database session and is
+  written by the controller's own commit, so routes log *before* they
+  commit. A record still pending when the request ends is committed then.
+  The record is exactly as durable as the change it describes.
+- 'async': records are queued in memory once the controller's commit
+  succeeds (records of rolled back work are dropped) and a background
+  thread inserts them in batches: one executemany and one commit per up to
+  AUDIT_BATCH_SIZE records, at most AUDIT_FLUSH_INTERVAL seconds after they
+  were queued. The queue holds AUDIT_QUEUE_SIZE records; when it is full
+  the record is written synchronously instead of being dropped. The queue
+  is flushed at interpreter exit, so only a killed process loses records.
+- 'sync': the original behaviour, one commit per record.
+
+created_at is taken when the action is logged, not when it is written, so
+incremental backups (which read delete actions from the audit log) see a
+queued record with its real time; the backup watermark overlap covers the
+flush delay.
+
+NOTE: serverless platforms (Vercel) may freeze the instance right after
+the response, so use 'session' there, not 'async'.
+
+RETENTION (archive_audit_logs, `flask archive-audit-logs`):
+The database keeps the last AUDIT_RETENTION_MONTHS whole months. Older
+months are written to AUDIT_ARCHIVE_FOLDER/audit-YYYY-MM.jsonl.gz (one
+JSON record per line) and then deleted, one month at a time. These
+monthly files are the partitions of the log. Records that the next
+incremental backup still reads (deletes since the last backup) are never
+archived. Re-running after an interrupted archive is safe: a month's file
+is merged with any of its records still in the database, not duplicated.
+
+QUERIES (audit_log_page, /api/audit-logs):
+Newest first with keyset cursors on (created_at, id). Each filter (user,
+action) has an index led by that column and followed by (created_at, id),
+so any page costs the same as the first one however long the log gets.
+"""
+
+# ===========================================
+# STEP 1: Import required libraries
+# ===========================================
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from itertools import islice
+from flask import current_app, has_request_context, request
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from app import db
+
+AUDIT_MODES = ('session', 'async', 'sync')
+
+# Key in Session.info holding async records until the session commits
+_PENDING_KEY = 'audit_records'
+
+# Marks the end of the queue at shutdown
+_STOP = object()
+
+_queue = None
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+# ===========================================
+# STEP 2: Logging an action
+# ===========================================
+def audit_record(user_id, action, table_name=None, record_id=None, old_values=None, new_values=None):
+    """Column values for one AuditLog row; request details are captured now"""
+    in_request = has_request_context()
+    return {
+        'user_id': user_id,
+        'action': action,
+        'table_name': table_name,
+        'record_id': record_id,
+        'old_values': json.dumps(old_values) if old_values else None,
+        'new_values': json.dumps(new_values) if new_values else None,
+        'ip_address': request.remote_addr if in_request else None,
+        'user_agent': request.headers.get('User-Agent') if in_request else None,
+        'created_at': datetime.utcnow(),
+    }
+
+
+def write_audit(record):
+    """Write one audit record according to AUDIT_MODE"""
+    from app.models import AuditLog
+
+    mode = current_app.config['AUDIT_MODE']
+    if mode == 'session' and has_request_context():
+        db.session.add(AuditLog(**record))
+    elif mode == 'async' and has_request_context():
+        db.session.info.setdefault(_PENDING_KEY, []).append((current_app._get_current_object(), record))
+    elif mode == 'async':
+        _enqueue(current_app._get_current_object(), record)
+    else:
+        db.session.add(AuditLog(**record))
+        db.session.commit()
+
+
+def _commit_pending_audit(response):
+    """Commit audit records that were logged after the controller's last commit"""
+    from app.models import AuditLog
+
+    pending = db.session.info.get(_PENDING_KEY) or any(isinstance(obj, AuditLog) for obj in db.session.new)
+    if pending:
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error logging audit action: {str(e)}")
+    return response
+
+
+@event.listens_for(Session, 'after_commit')
+def _queue_committed_audit(session):
+    for app, record in session.info.pop(_PENDING_KEY, ()):
+        _enqueue(app, record)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_rolled_back_audit(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# ===========================================
+# STEP 3: Background writer (AUDIT_MODE = 'async')
+# ===========================================
+def _enqueue(app, record):
+    """Queue a record for the writer thread; writes it directly if the queue is full"""
+    global _queue, _writer, _writer_pid
+    with _writer_lock:
+        # Threads do not survive a fork (e.g. gunicorn workers): start one per process
+        if _writer is None or _writer_pid != os.getpid():
+            _queue = queue.Queue(maxsize=app.config['AUDIT_QUEUE_SIZE'])
+            _writer = threading.Thread(target=_run_writer, args=(_queue,), name='audit-writer', daemon=True)
+            _writer_pid = os.getpid()
+            _writer.start()
+        records = _queue
+    try:
+        records.put_nowait((app, record))
+    except queue.Full:
+        _insert_batch(app, [record])
+
+
+def _run_writer(records):
+    """Collect queued records into batches and insert each batch with one commit"""
+    while True:
+        item = records.get()
+        if item is _STOP:
+            return
+        app = item[0]
+        batch = [item]
+        deadline = time.monotonic() + app.config['AUDIT_FLUSH_INTERVAL']
+        stop = False
+        while len(batch) < app.config['AUDIT_BATCH_SIZE']:
+            try:
+                item = records.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+
+        # Records normally all belong to one app; keep them apart if not
+        by_app = {}
+        for app, record in batch:
+            by_app.setdefault(app, []).append(record)
+        for app, app_records in by_app.items():
+            _insert_batch(app, app_records)
+        if stop:
+            return
+
+
+def _insert_batch(app, records):
+    from app.models import AuditLog
+
+    with app.app_context():
+        try:
+            db.session.execute(AuditLog.__table__.insert(), records)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error writing {len(records)} audit record(s): {str(e)}")
+        finally:
+            db.session.remove()
+
+
+def shutdown_audit_writer(timeout=10):
+    """Write every queued record and stop the writer thread (runs at interpreter exit)"""
+    with _writer_lock:
+        writer, records = _writer, _queue
+    if writer is None or _writer_pid != os.getpid() or not writer.is_alive():
+        return
+    records.put(_STOP)
+    writer.join(timeout)
+
+
+# ===========================================
+# STEP 4: Retention - monthly archive files
+# ===========================================
+def _month_start(moment):
+    return datetime(moment.year, moment.month, 1)
+
+
+def _next_month(month):
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def archive_cutoff(retention_months=None, now=None):
+    """Records created before this moment are due for archiving"""
+    from app.models import SystemSetting
+    from app.utils import BACKUP_WATERMARK_KEY, BACKUP_WATERMARK_OVERLAP
+
+    if retention_months is None:
+        retention_months = current_app.config['AUDIT_RETENTION_MONTHS']
+    cutoff = _month_start(now or datetime.utcnow())
+    for _ in range(retention_months):
+        cutoff = _month_start(cutoff - timedelta(days=1))
+
+    # The next incremental backup reads deletions since the last backup from the log
+    last_backup = SystemSetting.get_value(BACKUP_WATERMARK_KEY)
+    if last_backup:
+        cutoff = min(cutoff, _month_start(datetime.fromisoformat(last_backup) - BACKUP_WATERMARK_OVERLAP))
+    return cutoff
+
+
+def archive_path(month):
+    folder = current_app.config['AUDIT_ARCHIVE_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"audit-{month:%Y-%m}.jsonl.gz")
+
+
+def _archive_month(month, chunk_size=1000):
+    """Append one month of records to its archive file, then delete them; returns the row count"""
+    from app.models import AuditLog
+
+    table = AuditLog.__table__
+    in_month = (AuditLog.created_at >= month, AuditLog.created_at < _next_month(month))
+    first_id, last_id = db.session.query(func.min(AuditLog.id), func.max(AuditLog.id)).filter(*in_month).one()
+    if first_id is None:
+        return 0
+
+    path = archive_path(month)
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    count = 0
+    try:
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as archive:
+            # Keep records archived by an earlier run, except ones that are
+            # still in the database (that run was interrupted before its
+            # delete) - they are written again below. SQLite may reuse the
+            # ids of deleted rows, so a record is matched on id and time.
+            if os.path.exists(path):
+                with gzip.open(path, 'rt', encoding='utf-8') as existing:
+                    while True:
+                        lines = list(islice(existing, chunk_size))
+                        if not lines:
+                            break
+                        records = [json.loads(line) for line in lines]
+                        ids = [record['id'] for record in records if first_id <= record['id'] <= last_id]
+                        in_database = {(log_id, created_at.isoformat()) for log_id, created_at in
+                                       db.session.query(AuditLog.id, AuditLog.created_at).filter(
+                                           AuditLog.id.in_(ids))} if ids else set()
+                        for line, record in zip(lines, records):
+                            if (record['id'], record['created_at']) not in in_database:
+                                archive.write(line)
+            rows = db.session.query(*table.c).filter(*in_month, AuditLog.id <= last_id).order_by(
+                AuditLog.created_at, AuditLog.id).yield_per(chunk_size)
+            for row in rows:
+                record = row._asdict()
+                record['created_at'] = record['created_at'].isoformat() if record['created_at'] else None
+                archive.write(json.dumps(record) + '\n')
+                count += 1
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    db.session.execute(table.delete().where(*in_month, table.c.id <= last_id))
+    db.session.commit()
+    return count
+
+
+def archive_audit_logs(retention_months=None, now=None):
+    """
+    Move whole months older than the retention period to archive files.
+
+    Returns a list of ('YYYY-MM', records archived), oldest month first.
+    """
+    from app.models import AuditLog
+
+    cutoff = archive_cutoff(retention_months, now)
+    archived = []
+    while True:
+        oldest = db.session.query(func.min(AuditLog.created_at)).filter(AuditLog.created_at < cutoff).scalar()
+        if oldest is None:
+            return archived
+        month = _month_start(oldest)
+        if _next_month(month) > cutoff:
+            return archived  # cutoff lies inside this month; only whole months are archived
+        archived.append((f"{month:%Y-%m}", _archive_month(month)))
+
+
+# ===========================================
+# STEP 5: Queries (audit log API)
+# ===========================================
+def audit_log_page(cursor=None, per_page=50, user_id=None, action=None, since=None, until=None):
+    """Newest-first page of audit records (a KeysetPage, see app/pagination.py)"""
+    from app.models import AuditLog
+    from app.pagination import keyset_paginate
+
+    query = AuditLog.query
+    if user_id is not None:
+        query = query.filter(AuditLog.user_id == user_id)
+    if action:
+        query = query.filter(AuditLog.action == action)
+    if since:
+        query = query.filter(AuditLog.created_at >= since)
+    if until:
+        query = query.filter(AuditLog.created_at < until)
+    return keyset_paginate(query, (AuditLog.created_at, AuditLog.id),
+                           lambda log: (log.created_at, log.id), cursor=cursor, per_page=per_page)
+
+
+def audit_log_to_dict(log):
+    return {
+        'id': log.id,
+        'user_id': log.user_id,
+        'action': log.action,
+        'table_name': log.table_name,
+        'record_id': log.record_id,
+        'old_values': json.loads(log.old_values) if log.old_values else None,
+        'new_values': json.loads(log.new_values) if log.new_values else None,
+        'ip_address': log.ip_address,
+        'user_agent': log.user_agent,
+        'created_at': log.created_at.isoformat() if log.created_at else None,
+    }
+
+
+# ===========================================
+# STEP 6: Setup (called from create_app)
+# ===========================================
+def init_audit(app):
+    """Validate AUDIT_MODE and commit records still pending at the end of each request"""
+    if app.config['AUDIT_MODE'] not in AUDIT_MODES:
+        raise ValueError(f"AUDIT_MODE must be one of {', '.join(AUDIT_MODES)}, "
+                         f"not {app.config['AUDIT_MODE']!r}")
+    app.after_request(_commit_pending_audit)
+
+
+atexit.register(shutdown_audit_writer)
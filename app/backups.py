@@ -0,0 +1,644 @@
+"""
+===========================================
+BACKUP RESTORE & SQLITE SNAPSHOTS
+===========================================
+Restores JSON backups written by /backup (see stream_backup() in
+app/utils.py) into the configured database, and takes native snapshots of
+SQLite databases.
+
+A restore takes one full backup followed by the incremental backups taken
+after it, oldest first:
+
+    flask --app main restore-backup full.json.gz incr1.json.gz incr2.json.gz
+
+or an upload on the settings page (/backup/restore).
+
+HOW A RESTORE WORKS:
+- Backup files (plain or gzip) are streamed line by line: every row sits on
+  a line of its own, so only one batch of rows is in memory at a time.
+  Older backups written with json.dumps(indent=2) are loaded whole instead.
+- Rows are upserted by primary key in batches of RESTORE_BATCH_SIZE with a
+  single executemany per batch (COPY into a staging table on PostgreSQL),
+  not one ORM object per row. Tag associations are rebuilt per batch from
+  a tag name -> id lookup.
+- The "deleted" section of an incremental removes rows deleted in between.
+- The whole chain is applied in one database transaction. For large
+  restores (RESTORE_INDEX_REBUILD_ROWS transaction rows or more), indexes
+  on transactions and the SQLite search triggers are dropped during the
+  load and rebuilt in one pass afterwards; keeping them up to date row by
+  row made up over 80% of the load time. Smaller restores, e.g. a full
+  backup of a small book plus a few incrementals, write with the indexes
+  in place so the app's queries stay indexed meanwhile.
+- Afterwards sequences are reset (PostgreSQL), and the derived data that
+  ORM events normally maintain is rebuilt: monthly rollups, spending-limit
+  counters and the report data version. On PostgreSQL the search column
+  is generated by the database itself.
+
+NOTE: backups never contain password hashes. Restored users that do not
+already exist get an unusable password and must have it reset by an admin.
+
+SQLite snapshots (/backup?mode=snapshot, `flask snapshot-db`) copy the
+database file page by page with SQLite's online backup API into a zip
+archive, optionally with the receipt files. Restoring one means putting
+cashbook.db (and the receipts) back in place.
+"""
+
+# ===========================================
+# STEP 1: Import required libraries
+# ===========================================
+import gzip
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import uuid
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+from sqlalchemy import insert
+from app import db
+
+# Rows written per executemany/COPY while restoring
+RESTORE_BATCH_SIZE = 5000
+
+# Transaction rows (restored or deleted) from which a restore drops the
+# transaction indexes and rebuilds them at the end; below it they stay in place
+RESTORE_INDEX_REBUILD_ROWS = 20000
+
+# SQLite snapshots: pages copied per backup step (the source is only locked
+# during a step, so writers can get in between), the pause between steps,
+# and how often a write may restart the copy before it is finished in one step
+SNAPSHOT_PAGES_PER_STEP = 4096
+SNAPSHOT_STEP_SLEEP = 0.005
+SNAPSHOT_MAX_RESTARTS = 3
+
+
+class BackupChainError(ValueError):
+    """The given backups do not form a full backup plus consecutive incrementals"""
+
+
+class BackupFormatError(ValueError):
+    """The file is not a CashBook JSON backup"""
+
+
+# ===========================================
+# STEP 2: Reading backups (streamed)
+# ===========================================
+def _open_backup(path):
+    """Open a backup file for reading text, transparently un-gzipping it"""
+    with open(path, 'rb') as f:
+        gzipped = f.read(2) == b'\x1f\x8b'
+    if gzipped:
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def _is_line_per_row(path):
+    """True for backups with one row per line (anything written since streaming backups)"""
+    with _open_backup(path) as f:
+        if f.readline().strip() != '{':
+            raise BackupFormatError(f"{path} is not a JSON backup")
+        in_section = False
+        for line in f:
+            line = line.strip().rstrip(',')
+            if in_section and line != ']':
+                return line != '{'  # json.dumps(indent=2) puts each field on its own line
+            in_section = line.endswith('[')
+    return True
+
+
+def _load_whole(path):
+    try:
+        with _open_backup(path) as f:
+            return json.load(f)
+    except ValueError as e:
+        raise BackupFormatError(f"{path} is not a JSON backup: {e}")
+
+
+def read_backup_header(path):
+    """Scalar fields of a backup (timestamp, mode, since, watermark) without reading its rows"""
+    if not _is_line_per_row(path):
+        return {key: value for key, value in _load_whole(path).items() if not isinstance(value, list)}
+    header = {}
+    with _open_backup(path) as f:
+        f.readline()
+        for line in f:
+            line = line.strip().rstrip(',')
+            if line.endswith('[') or line.endswith('[]') or line == '}':
+                break
+            header.update(json.loads('{%s}' % line))
+    return header
+
+
+def iter_backup_sections(path):
+    """
+    Yield (section name, row iterator) in file order.
+
+    Like itertools.groupby, a row iterator is only valid until the next
+    section is requested; rows of a section that is not iterated are
+    skipped without being parsed.
+    """
+    if not _is_line_per_row(path):
+        for name, value in _load_whole(path).items():
+            if isinstance(value, list):
+                yield name, iter(value)
+        return
+
+    with _open_backup(path) as f:
+        f.readline()
+        for line in f:
+            line = line.strip().rstrip(',')
+            if line.endswith('[]'):
+                yield json.loads(line[:-2].rstrip().rstrip(':')), iter(())
+            elif line.endswith('['):
+                name = json.loads(line[:-1].rstrip().rstrip(':'))
+                raw_rows = _section_lines(f)
+                yield name, (json.loads(raw) for raw in raw_rows)
+                for _ in raw_rows:  # skip whatever the consumer did not read
+                    pass
+
+
+def count_backup_rows(path, sections, stop_at=None):
+    """
+    Rows in the given sections of a backup, counted without parsing them.
+
+    Counting stops once stop_at rows were seen (the result is then >= stop_at).
+    """
+    if not _is_line_per_row(path):
+        backup = _load_whole(path)
+        return sum(len(backup.get(name) or ()) for name in sections)
+    count = 0
+    with _open_backup(path) as f:
+        f.readline()
+        for line in f:
+            line = line.strip().rstrip(',')
+            if not line.endswith('[') or line.endswith('[]'):
+                continue
+            name = json.loads(line[:-1].rstrip().rstrip(':'))
+            for _ in _section_lines(f):
+                if name in sections:
+                    count += 1
+                    if stop_at is not None and count >= stop_at:
+                        return count
+    return count
+
+
+def _section_lines(f):
+    for line in f:
+        line = line.strip().rstrip(',')
+        if line == ']':
+            return
+        yield line
+
+
+def check_chain(headers):
+    """Raise BackupChainError unless the backups are a full backup followed by its incrementals"""
+    if not headers:
+        raise BackupChainError("No backups given")
+    if headers[0].get('mode', 'full') != 'full':
+        raise BackupChainError("The first backup must be a full backup")
+    for previous, header in zip(headers, headers[1:]):
+        if header.get('mode') != 'incremental':
+            raise BackupChainError(f"Backup taken at {header.get('timestamp')} is not incremental")
+        if not previous.get('watermark') or header['since'] > previous['watermark']:
+            raise BackupChainError(
+                f"Gap in backup chain: incremental taken at {header.get('timestamp')} "
+                f"starts after the backup taken at {previous.get('timestamp')}")
+
+
+# ===========================================
+# STEP 3: Bulk writes
+# ===========================================
+def _batches(rows):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, RESTORE_BATCH_SIZE))
+        if not batch:
+            return
+        yield batch
+
+
+def _upsert(connection, table, rows, update_columns):
+    """Insert rows or overwrite update_columns of existing ones (by id) in one executemany"""
+    if connection.dialect.name in ('sqlite', 'postgresql'):
+        if connection.dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=['id'], set_={column: statement.excluded[column] for column in update_columns})
+        connection.execute(statement, rows)
+        return
+
+    # Generic fallback: replace the rows
+    connection.execute(table.delete().where(table.c.id.in_([row['id'] for row in rows])))
+    connection.execute(insert(table), rows)
+
+
+def _copy_value(value):
+    """Format one value for COPY ... FROM STDIN (text format)"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def _bulk_upsert(connection, table, columns, rows, update_columns, constants=None, converters=None):
+    """
+    Upsert a large batch by id without per-row statement processing.
+
+    rows are tuples in `columns` order holding the values as they appear in
+    the backup (amounts and dates as strings); constants (column -> value)
+    are appended to every row.
+
+    - SQLite: one DB-API executemany of a prepared upsert. SQLite stores
+      dates as ISO text and converts numeric strings by column affinity, so
+      backup values go in unchanged.
+    - PostgreSQL: COPY into a temporary staging table, then one
+      INSERT ... SELECT ... ON CONFLICT.
+    - Others: _upsert() with values converted by `converters` (column -> function).
+    """
+    constants = constants or {}
+    columns = list(columns) + list(constants)
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        # Constants are converted to their stored form once, not per row
+        extra = tuple(
+            processor(value) if processor else value
+            for processor, value in ((table.c[column].type._cached_bind_processor(connection.dialect), value)
+                                     for column, value in constants.items()))
+        updates = ', '.join(f'{column} = excluded.{column}' for column in update_columns)
+        connection.exec_driver_sql(
+            f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT (id) DO UPDATE SET {updates}",
+            [row + extra for row in rows])
+        return
+
+    cursor = connection.connection.cursor() if dialect == 'postgresql' else None
+    if cursor is not None and hasattr(cursor, 'copy_expert'):
+        extra = '\t' + '\t'.join(_copy_value(value) for value in constants.values()) if constants else ''
+        column_list = ', '.join(columns)
+        staging = f'restore_{table.name}'
+        cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {staging} "
+                       f"(LIKE {table.name} INCLUDING DEFAULTS) ON COMMIT DROP")
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(map(_copy_value, row)) + extra + '\n')
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN", buffer)
+        updates = ', '.join(f'{column} = EXCLUDED.{column}' for column in update_columns)
+        cursor.execute(f"INSERT INTO {table.name} ({column_list}) SELECT {column_list} FROM {staging} "
+                       f"ON CONFLICT (id) DO UPDATE SET {updates}")
+        cursor.execute(f"TRUNCATE {staging}")
+        return
+
+    converters = converters or {}
+    dicts = []
+    for row in rows:
+        values = dict(zip(columns, row), **constants)
+        for column, convert in converters.items():
+            values[column] = convert(values[column])
+        dicts.append(values)
+    _upsert(connection, table, dicts, update_columns)
+
+
+# ===========================================
+# STEP 4: Restoring each section
+# ===========================================
+def _restore_categories(connection, rows):
+    from app.models import Category
+    count = 0
+    for batch in _batches(rows):
+        _upsert(connection, Category.__table__, [{
+            'id': row['id'],
+            'name': row['name'],
+            'description': row['description'],
+            'color': row['color'],
+            'is_system': row['is_system'],
+        } for row in batch], ['name', 'description', 'color', 'is_system'])
+        count += len(batch)
+    return count
+
+
+def _insert_tags(connection, rows):
+    """Insert tags, skipping any whose id or name already exists"""
+    from app.models import Tag
+    table = Tag.__table__
+    if connection.dialect.name in ('sqlite', 'postgresql'):
+        if connection.dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        connection.execute(dialect_insert(table).on_conflict_do_nothing(), rows)
+        return
+    existing = {name for (name,) in connection.execute(
+        db.select(table.c.name).where(table.c.name.in_([row['name'] for row in rows])))}
+    rows = [row for row in rows if row['name'] not in existing]
+    if rows:
+        connection.execute(insert(table), rows)
+
+
+def _restore_tags(connection, rows):
+    count = 0
+    now = datetime.utcnow()
+    for batch in _batches(rows):
+        _insert_tags(connection, [{'id': row['id'], 'name': row['name'], 'created_at': now} for row in batch])
+        count += len(batch)
+    return count
+
+
+def _restore_users(connection, rows):
+    from app.models import User
+    count = 0
+    for batch in _batches(rows):
+        _upsert(connection, User.__table__, [{
+            'id': row['id'],
+            'username': row['username'],
+            'email': row['email'],
+            'password_hash': '!' + uuid.uuid4().hex,  # never matches: new users need a reset
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'phone': row['phone'],
+            'is_active': row['is_active'],
+            'role_id': row['role_id'],
+            'created_at': datetime.fromisoformat(row['created_at']),
+        } for row in batch], ['username', 'email', 'first_name', 'last_name', 'phone',
+                              'is_active', 'role_id', 'created_at'])
+        count += len(batch)
+    return count
+
+
+def _tag_ids(connection, names, known):
+    """Resolve tag names to ids, creating missing tags; known is a name -> id cache"""
+    from app.models import Tag
+    table = Tag.__table__
+    missing = sorted(set(names) - known.keys())
+    if missing:
+        now = datetime.utcnow()
+        _insert_tags(connection, [{'name': name, 'created_at': now} for name in missing])
+        known.update(connection.execute(
+            db.select(table.c.name, table.c.id).where(table.c.name.in_(missing))).all())
+    return known
+
+
+TRANSACTION_COLUMNS = ('id', 'type', 'amount', 'description', 'notes', 'party',
+                       'transaction_date', 'user_id', 'category_id')
+
+
+def _restore_transactions(connection, rows):
+    from app.models import Transaction, transaction_tags
+    table = Transaction.__table__
+    now = datetime.utcnow()
+    known_tags = {}
+    count = 0
+    for batch in _batches(rows):
+        _bulk_upsert(
+            connection, table, TRANSACTION_COLUMNS,
+            [tuple(row[column] for column in TRANSACTION_COLUMNS) for row in batch],
+            [column for column in TRANSACTION_COLUMNS if column != 'id'] + ['updated_at'],
+            constants={'created_at': now, 'updated_at': now},
+            converters={'amount': Decimal, 'transaction_date': date.fromisoformat})
+
+        # Rebuild this batch's tag associations in two statements
+        _tag_ids(connection, [name for row in batch for name in row['tags']], known_tags)
+        connection.execute(transaction_tags.delete().where(
+            transaction_tags.c.transaction_id.in_([row['id'] for row in batch])))
+        links = [{'transaction_id': row['id'], 'tag_id': known_tags[name]}
+                 for row in batch for name in set(row['tags'])]
+        if links:
+            connection.execute(transaction_tags.insert(), links)
+        count += len(batch)
+    return count
+
+
+def _restore_spending_limits(connection, rows):
+    from app.models import SpendingLimit
+    count = 0
+    for batch in _batches(rows):
+        _upsert(connection, SpendingLimit.__table__, [{
+            'id': row['id'],
+            'type': row['type'],
+            'amount': Decimal(row['amount']),
+            'is_active': row['is_active'],
+            'user_id': row['user_id'],
+            'category_id': row['category_id'],
+        } for row in batch], ['type', 'amount', 'is_active', 'user_id', 'category_id'])
+        count += len(batch)
+    return count
+
+
+def _restore_deletions(connection, rows):
+    from app.models import Transaction, Receipt, transaction_tags
+    count = 0
+    for batch in _batches(rows):
+        ids = [row['id'] for row in batch if row['table_name'] == 'transactions']
+        connection.execute(transaction_tags.delete().where(transaction_tags.c.transaction_id.in_(ids)))
+        connection.execute(Receipt.__table__.delete().where(Receipt.__table__.c.transaction_id.in_(ids)))
+        connection.execute(Transaction.__table__.delete().where(Transaction.__table__.c.id.in_(ids)))
+        count += len(batch)
+    return count
+
+
+# Section -> (restore function, sections it references)
+RESTORE_STEPS = {
+    'categories': (_restore_categories, set()),
+    'tags': (_restore_tags, set()),
+    'users': (_restore_users, set()),
+    'transactions': (_restore_transactions, {'users', 'categories', 'tags'}),
+    'spending_limits': (_restore_spending_limits, {'users', 'categories'}),
+    'deleted': (_restore_deletions, {'transactions'}),
+}
+
+
+def apply_backup(connection, path):
+    """
+    Restore every section of one backup file; returns {section: row count}.
+
+    Sections are restored as they are read. Backups written before the
+    referenced tables were moved to the front need a second pass over the
+    file for the sections that had to wait.
+    """
+    counts = {}
+    pending = set(RESTORE_STEPS)
+    while pending:
+        present = set()
+        for name, rows in iter_backup_sections(path):
+            present.add(name)
+            if name not in pending:
+                continue
+            restore, references = RESTORE_STEPS[name]
+            if references & pending:
+                continue
+            counts[name] = restore(connection, rows)
+            pending.discard(name)
+        pending &= present
+    return counts
+
+
+def _finish_restore(connection):
+    """Bring sequences and the data normally kept by ORM events up to date"""
+    from app.models import SpendingLimit, bump_data_version
+
+    if connection.dialect.name == 'postgresql':
+        for table in ('categories', 'tags', 'users', 'transactions', 'spending_limits'):
+            connection.execute(db.text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}"))
+
+    # Spending-limit counters are recomputed on their next read
+    limits = SpendingLimit.__table__
+    connection.execute(limits.update().values(current_period_start=None, current_spent=None,
+                                              updated_at=limits.c.updated_at))
+    bump_data_version(connection)
+    # Users were written without the ORM: make the other processes drop their cached copies
+    from app.user_cache import bump_users_version
+    bump_users_version(connection)
+
+
+# ===========================================
+# STEP 5: Public API
+# ===========================================
+def restore_backups(paths):
+    """
+    Restore a full backup and its incrementals (oldest first).
+
+    The whole chain is applied in one database transaction. When it holds
+    at least RESTORE_INDEX_REBUILD_ROWS transaction rows, the secondary
+    indexes on transactions and the SQLite full-text triggers are dropped
+    for the load and rebuilt afterwards in one sorted pass each, whether
+    the restore succeeds or not. Smaller restores keep them in place.
+
+    Returns a list of (path, {section: row count}).
+    """
+    from app.models import Transaction, TransactionRollup
+    from app.search import suspend_fulltext_sync, resume_fulltext_sync
+
+    check_chain([read_backup_header(path) for path in paths])
+
+    # Only large loads win from rebuilding; count until the threshold is reached
+    rows = 0
+    for path in paths:
+        rows += count_backup_rows(path, ('transactions', 'deleted'), RESTORE_INDEX_REBUILD_ROWS - rows)
+        if rows >= RESTORE_INDEX_REBUILD_ROWS:
+            break
+    indexes = list(Transaction.__table__.indexes) if rows >= RESTORE_INDEX_REBUILD_ROWS else []
+    fulltext = False
+    if indexes:
+        with db.engine.begin() as connection:
+            fulltext = suspend_fulltext_sync(connection)
+            for index in indexes:
+                index.drop(connection, checkfirst=True)
+    try:
+        results = []
+        with db.engine.begin() as connection:
+            for path in paths:
+                results.append((path, apply_backup(connection, path)))
+            _finish_restore(connection)
+    finally:
+        if indexes:
+            with db.engine.begin() as connection:
+                for index in indexes:
+                    index.create(connection, checkfirst=True)
+                if fulltext:
+                    resume_fulltext_sync(connection)
+    TransactionRollup.rebuild()
+    # Users were written without the ORM, so the user cache saw no events
+    from app.user_cache import user_cache
+    user_cache.clear()
+    return results
+
+
+# ===========================================
+# STEP 6: SQLite snapshots
+# ===========================================
+def sqlite_database_path():
+    """Path of the SQLite database file, or None when running on another database"""
+    url = db.engine.url
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        return None
+    return url.database
+
+
+class _SnapshotRestarted(Exception):
+    pass
+
+
+def _copy_database(source, target):
+    """
+    Copy source into target with the online backup API without holding off writers.
+
+    - WAL mode: readers never block writers, so everything is copied in one
+      step inside a single read transaction (a consistent point in time).
+    - Rollback journal: a reader does block writers, so pages are copied in
+      steps and writers get in between. SQLite restarts the copy whenever
+      another connection writes, so on a busy database it gives up stepping
+      after SNAPSHOT_MAX_RESTARTS restarts and copies the rest in one step.
+    """
+    if source.execute('PRAGMA journal_mode').fetchone()[0].lower() == 'wal':
+        source.backup(target)
+        return
+
+    progress = {'remaining': None, 'restarts': 0}
+
+    def on_step(status, remaining, total):
+        if progress['remaining'] is not None and remaining > progress['remaining']:
+            progress['restarts'] += 1
+            if progress['restarts'] > SNAPSHOT_MAX_RESTARTS:
+                raise _SnapshotRestarted()
+        progress['remaining'] = remaining
+
+    try:
+        source.backup(target, pages=SNAPSHOT_PAGES_PER_STEP, progress=on_step, sleep=SNAPSHOT_STEP_SLEEP)
+    except _SnapshotRestarted:
+        source.backup(target)
+
+
+def create_sqlite_snapshot(output, include_receipts=False, compresslevel=1):
+    """
+    Write a zip archive with a consistent copy of the SQLite database.
+
+    The copy is made with SQLite's online backup API (see _copy_database()),
+    which copies pages as-is with no row decoding or serialization. The
+    archive is compressed at a low level (fast).
+
+    Args:
+        output: Path or binary file object to write the zip archive to
+        include_receipts: Also add the receipt files from the upload folder
+        compresslevel: zlib level for the archive (1 = fastest)
+    Returns the number of receipt files added.
+    """
+    from flask import current_app
+    from app.models import Receipt
+
+    database_path = sqlite_database_path()
+    if database_path is None:
+        raise RuntimeError("Snapshots are only available for SQLite databases")
+
+    fd, snapshot_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        source = sqlite3.connect(database_path)
+        target = sqlite3.connect(snapshot_path)
+        try:
+            _copy_database(source, target)
+        finally:
+            target.close()
+            source.close()
+
+        receipts = 0
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as archive:
+            archive.write(snapshot_path, 'cashbook.db')
+            if include_receipts:
+                upload_folder = current_app.config['UPLOAD_FOLDER']
+                for (filename,) in db.session.query(Receipt.filename).yield_per(1000):
+                    path = os.path.join(upload_folder, filename)
+                    if os.path.isfile(path):
+                        archive.write(path, f'uploads/{filename}')
+                        receipts += 1
+        return receipts
+    finally:
+        os.remove(snapshot_path)
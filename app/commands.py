@@ -0,0 +1,126 @@
+"""
+===========================================
+CLI COMMANDS - DATABASE MAINTENANCE
+===========================================
+Maintenance tasks exposed through the Flask CLI, e.g.:
+
+    flask --app main init-db
+    flask --app main upgrade-db
+    flask --app main check-query-plans
+    flask --app main restore-backup full.json.gz incremental.json.gz
+    flask --app main snapshot-db snapshot.zip --with-receipts
+    flask --app main archive-audit-logs --months 12
+    flask --app main sync-replica
+"""
+
+# ===========================================
+# STEP 1: Import required libraries
+# ===========================================
+import click
+from app import db
+
+
+# ===========================================
+# STEP 2: Register commands with the app
+# ===========================================
+def register_commands(app):
+    """Attach all maintenance commands to the Flask app"""
+
+    @app.cli.command('upgrade-db')
+    def upgrade_db():
+        """Create missing tables, columns and indexes in an existing database."""
+        from app.schema import upgrade_schema
+        db.create_all()
+        created = upgrade_schema()
+        click.echo(f"Added {len(created)} column(s)/index(es): {', '.join(created) or 'none needed'}")
+
+    @app.cli.command('init-db')
+    def init_db():
+        """Create the schema and default data, and stamp the schema version (run once per deploy)."""
+        from app.schema import init_database, schema_fingerprint
+        created = init_database()
+        click.echo(f"Database ready at schema version {schema_fingerprint()} "
+                   f"(added {len(created)} column(s)/index(es))")
+
+    @app.cli.command('check-query-plans')
+    def check_query_plans_command():
+        """Show the query plan of every hot query and fail on full table scans."""
+        from app.schema import check_query_plans
+        failures = 0
+        for name, uses_index, plan_lines in check_query_plans():
+            status = 'OK  ' if uses_index else 'SCAN'
+            click.echo(f"[{status}] {name}")
+            for line in plan_lines:
+                click.echo(f"         {line}")
+            if not uses_index:
+                failures += 1
+        if failures:
+            raise click.ClickException(f"{failures} hot query(s) do not use an index")
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index():
+        """Re-index all transactions for full-text search."""
+        from app.search import ensure_fulltext_index, rebuild_fulltext_index
+        if not ensure_fulltext_index():
+            raise click.ClickException("Full-text search is not available on this database")
+        rebuild_fulltext_index()
+        click.echo("Search index rebuilt")
+
+    @app.cli.command('rebuild-rollups')
+    def rebuild_rollups():
+        """Recompute the monthly transaction rollup table from scratch."""
+        from app.models import TransactionRollup
+        TransactionRollup.rebuild()
+        click.echo(f"Rebuilt {TransactionRollup.query.count()} rollup bucket(s)")
+
+    @app.cli.command('purge-report-jobs')
+    def purge_report_jobs():
+        """Delete expired background report jobs and their files."""
+        from app.report_jobs import purge_expired_jobs
+        click.echo(f"Purged {purge_expired_jobs()} expired report job(s)")
+
+    @app.cli.command('restore-backup')
+    @click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+    def restore_backup(paths):
+        """Restore a full backup followed by its incremental backups (oldest first)."""
+        from app.backups import BackupChainError, BackupFormatError, restore_backups
+        try:
+            results = restore_backups(paths)
+        except (BackupChainError, BackupFormatError) as e:
+            raise click.ClickException(str(e))
+        for path, counts in results:
+            summary = ', '.join(f"{count} {section}" for section, count in counts.items() if count)
+            click.echo(f"{path}: {summary or 'no changes'}")
+
+    @app.cli.command('snapshot-db')
+    @click.argument('output', type=click.Path(dir_okay=False, writable=True))
+    @click.option('--with-receipts', is_flag=True, help='Also archive the receipt files.')
+    def snapshot_db(output, with_receipts):
+        """Write a zip snapshot of the SQLite database using SQLite's online backup API."""
+        from app.backups import create_sqlite_snapshot, sqlite_database_path
+        if sqlite_database_path() is None:
+            raise click.ClickException("Snapshots are only available for SQLite databases")
+        receipts = create_sqlite_snapshot(output, include_receipts=with_receipts)
+        click.echo(f"Snapshot written to {output}" + (f" with {receipts} receipt(s)" if with_receipts else ""))
+
+    @app.cli.command('archive-audit-logs')
+    @click.option('--months', type=int, default=None,
+                  help='Whole months to keep in the database (default: AUDIT_RETENTION_MONTHS).')
+    def archive_audit_logs_command(months):
+        """Move audit records older than the retention period to monthly .jsonl.gz files."""
+        from app.audit import archive_audit_logs
+        archived = archive_audit_logs(retention_months=months)
+        for month, count in archived:
+            click.echo(f"{month}: archived {count} record(s)")
+        if not archived:
+            click.echo("Nothing to archive")
+
+    @app.cli.command('sync-replica')
+    def sync_replica():
+        """Copy the SQLite database into the SQLite READ_REPLICA_URL (local testing)."""
+        from app.replica import sync_sqlite_replica
+        try:
+            path = sync_sqlite_replica()
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Replica {path} updated")
@@ -0,0 +1,217 @@
+"""
+===========================================
+DATABASE POOL - SIZING, LIVENESS AND STATS
+===========================================
+Each process (gunicorn worker) keeps its own pool of database connections.
+All processes together may hold up to
+workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections, and that number
+has to stay below the PostgreSQL server's max_connections.
+
+LIVENESS (DB_POOL_PRE_PING):
+- 'always' = SQLAlchemy's pool_pre_ping: a round trip on every checkout
+- 'idle'   = ping only connections that sat unused in the pool for longer
+             than DB_POOL_PING_IDLE_SECONDS. Busy connections are reused
+             without a round trip. Connections dropped by the server after
+             an idle period are caught and replaced, and DB_POOL_RECYCLE
+             retires old connections.
+- 'off'    = no check; a dead connection fails the request that gets it
+
+Every bound engine (the primary and the read replica, app/replica.py)
+gets the same liveness check and its own counters.
+
+STATS (GET /api/pool-stats, per process; the replica under "replica"):
+- checkouts, new connections, current/peak checked-out connections
+- waits: checkouts that had to queue because the pool and its overflow
+  were all in use, with total/max wait time and timeouts
+- pings and ping failures (idle mode), invalidated connections
+If waits keep growing, DB_POOL_SIZE / DB_MAX_OVERFLOW are too small for
+the number of threads per worker.
+"""
+
+# ===========================================
+# STEP 1: Import required libraries
+# ===========================================
+import os
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+from app import db
+
+PRE_PING_MODES = ('always', 'idle', 'off')
+
+
+# ===========================================
+# STEP 2: Counters
+# ===========================================
+class PoolStats:
+    """Thread-safe counters for the connection pool of this process"""
+
+    FIELDS = ('checkouts', 'checkins', 'connects', 'checked_out', 'peak_checked_out', 'waits',
+              'wait_seconds', 'max_wait_seconds', 'timeouts', 'pings', 'ping_failures', 'invalidations')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, field, amount=1):
+        with self._lock:
+            self._counts[field] += amount
+
+    def checked_out(self, change):
+        with self._lock:
+            self._counts['checked_out'] += change
+            self._counts['peak_checked_out'] = max(self._counts['peak_checked_out'], self._counts['checked_out'])
+
+    def waited(self, seconds, timed_out):
+        with self._lock:
+            self._counts['waits'] += 1
+            self._counts['timeouts'] += timed_out
+            self._counts['wait_seconds'] += seconds
+            self._counts['max_wait_seconds'] = max(self._counts['max_wait_seconds'], seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+# Counters per bind key: None is the primary database, 'replica' the read replica
+pool_stats = PoolStats()
+_bind_stats = {None: pool_stats}
+
+
+def stats_for(bind_key):
+    """The counters of one bound engine"""
+    return _bind_stats.setdefault(bind_key, PoolStats())
+
+
+# ===========================================
+# STEP 3: Pool class that measures queueing
+# ===========================================
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records checkouts that had to wait for a free connection"""
+
+    stats = pool_stats  # engine_options() subclasses this per bind
+
+    def _do_get(self):
+        # Same test QueuePool uses to decide whether get() blocks
+        if not (self._max_overflow > -1 and self._overflow >= self._max_overflow and self._pool.empty()):
+            return super()._do_get()
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.waited(time.perf_counter() - start, True)
+            raise
+        self.stats.waited(time.perf_counter() - start, False)
+        return connection
+
+
+def engine_options(config, bind_key=None):
+    """SQLALCHEMY_ENGINE_OPTIONS for PostgreSQL from the DB_POOL_* settings"""
+    poolclass = InstrumentedQueuePool
+    if bind_key is not None:
+        # A class per bind, as the pool is rebuilt from its class on dispose()
+        poolclass = type(f'InstrumentedQueuePool[{bind_key}]', (InstrumentedQueuePool,),
+                         {'stats': stats_for(bind_key)})
+    return {
+        'poolclass': poolclass,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'] == 'always',
+    }
+
+
+# ===========================================
+# STEP 4: Pool events
+# ===========================================
+def _stats_listeners(stats):
+    """connect/checkout/checkin/invalidate listeners counting into stats"""
+    def on_connect(dbapi_connection, connection_record):
+        stats.add('connects')
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.add('checkouts')
+        stats.checked_out(1)
+
+    def on_checkin(dbapi_connection, connection_record):
+        stats.add('checkins')
+        stats.checked_out(-1)
+        if dbapi_connection is not None:
+            connection_record.info['checked_in_at'] = time.monotonic()
+
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.add('invalidations')
+
+    return {'connect': on_connect, 'checkout': on_checkout, 'checkin': on_checkin, 'invalidate': on_invalidate}
+
+
+def _idle_ping(idle_seconds, stats):
+    """Checkout listener that pings connections idle for longer than idle_seconds"""
+    def ping(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get('checked_in_at')
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        stats.add('pings')
+        try:
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            finally:
+                cursor.close()
+        except Exception:
+            stats.add('ping_failures')
+            # The pool discards this connection and retries with a new one
+            raise exc.DisconnectionError()
+    return ping
+
+
+# ===========================================
+# STEP 5: Setup and the stats surface
+# ===========================================
+def init_pool(app):
+    """Validate DB_POOL_PRE_PING and attach the stats and liveness listeners to every bound engine"""
+    if app.config['DB_POOL_PRE_PING'] not in PRE_PING_MODES:
+        raise ValueError(f"DB_POOL_PRE_PING must be one of {', '.join(PRE_PING_MODES)}, "
+                         f"not {app.config['DB_POOL_PRE_PING']!r}")
+    with app.app_context():
+        engines = dict(db.engines)
+    for bind_key, engine in engines.items():
+        stats = stats_for(bind_key)
+        # The ping goes first: when it fails, the pool retries the checkout and
+        # the failed attempt must not be counted as a checkout
+        if app.config['DB_POOL_PRE_PING'] == 'idle':
+            event.listen(engine, 'checkout', _idle_ping(app.config['DB_POOL_PING_IDLE_SECONDS'], stats))
+        for name, listener in _stats_listeners(stats).items():
+            event.listen(engine, name, listener)
+
+
+def _engine_status(engine, stats):
+    pool = engine.pool
+    status = stats.snapshot()
+    status['pool_class'] = type(pool).__name__
+    if isinstance(pool, QueuePool):
+        status.update({'size': pool.size(), 'idle': pool.checkedin(), 'overflow': pool.overflow(),
+                       'max_overflow': pool._max_overflow, 'timeout': pool.timeout()})
+    return status
+
+
+def pool_status():
+    """Counters plus the pool's own view of its connections, for this process"""
+    engines = db.engines
+    status = _engine_status(engines[None], stats_for(None))
+    status.update({
+        'pid': os.getpid(),
+        'pre_ping': current_app.config['DB_POOL_PRE_PING'],
+    })
+    for bind_key, engine in engines.items():
+        if bind_key is not None:
+            status[bind_key] = _engine_status(engine, stats_for(bind_key))
+    return status
@@ -0,0 +1,98 @@
+"""
+===========================================
+EXPORT DATA ACCESS - BACKUPS & REPORTS
+===========================================
+Shared read path for every bulk export (JSON backup, PDF and Excel reports).
+
+Walking ORM objects and touching transaction.tags / transaction.category
+per row costs extra queries per transaction (or per chunk). This module
+reads plain rows instead, in a constant number of set-based queries no
+matter how many transactions are exported:
+
+1. categories:        one query, kept as an id -> name lookup (small table)
+2. transactions:      one streamed query (yield_per / server-side cursor)
+3. transaction_tags:  one streamed query joined to tags, ordered by
+                      transaction id and merged with (2) as both streams
+                      advance, so tags are never collected up front
+
+USAGE:
+    for row in export_transactions(query):                 # reports
+    for row, tags in export_transactions_with_tags(query): # backups
+"""
+
+# ===========================================
+# STEP 1: Import required libraries
+# ===========================================
+from app import db
+
+# Rows are fetched from the database in chunks of this many
+EXPORT_CHUNK_SIZE = 1000
+
+
+# ===========================================
+# STEP 2: Lookups
+# ===========================================
+def category_lookup():
+    """Map category id -> name in one query"""
+    from app.models import Category
+    return dict(db.session.query(Category.id, Category.name))
+
+
+def _export_columns():
+    from app.models import Transaction
+    return (Transaction.id, Transaction.type, Transaction.amount, Transaction.description,
+            Transaction.notes, Transaction.party, Transaction.transaction_date,
+            Transaction.user_id, Transaction.category_id)
+
+
+# ===========================================
+# STEP 3: Transactions
+# ===========================================
+def export_transactions(query=None, order_by=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Stream transaction rows for a (filtered) Transaction query.
+
+    Yields rows with attributes id, type, amount, description, notes, party,
+    transaction_date, user_id, category_id; no ORM objects are built.
+
+    Args:
+        query: Filtered Transaction.query (None exports every transaction)
+        order_by: Sort columns (default: by id)
+        chunk_size: Rows fetched per round trip
+    """
+    from app.models import Transaction
+
+    query = query if query is not None else Transaction.query
+    return query.with_entities(*_export_columns()).order_by(
+        *(order_by if order_by is not None else (Transaction.id,))
+    ).yield_per(chunk_size)
+
+
+def export_transactions_with_tags(query=None, order_by=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Stream (row, [tag names]) for a (filtered) Transaction query, ordered by id.
+
+    Tags come from one query over transaction_tags sorted by transaction id,
+    merged with the transaction stream, instead of a query per transaction.
+    order_by may replace the id sort with an equivalent ascending expression.
+    """
+    from app.models import Transaction, Tag, transaction_tags
+
+    tag_rows = db.session.query(transaction_tags.c.transaction_id, Tag.name).join(
+        Tag, Tag.id == transaction_tags.c.tag_id)
+    if query is not None:
+        transaction_ids = query.with_entities(Transaction.id).order_by(None).subquery()
+        tag_rows = tag_rows.filter(transaction_tags.c.transaction_id.in_(db.select(transaction_ids.c.id)))
+    tag_rows = tag_rows.order_by(transaction_tags.c.transaction_id, Tag.id).yield_per(chunk_size)
+
+    tag_iter = iter(tag_rows)
+    next_tag = next(tag_iter, None)
+    for row in export_transactions(query, order_by=order_by, chunk_size=chunk_size):
+        # Skip tags whose transaction is not in this export, collect this row's tags
+        while next_tag is not None and next_tag[0] < row.id:
+            next_tag = next(tag_iter, None)
+        tags = []
+        while next_tag is not None and next_tag[0] == row.id:
+            tags.append(next_tag[1])
+            next_tag = next(tag_iter, None)
+        yield row, tags
@@ -1,8 +1,9 @@
 from flask_wtf import FlaskForm
-from flask_wtf.file import FileField, FileAllowed
-from wtforms import StringField, TextAreaField, DecimalField, SelectField, DateField, PasswordField, BooleanField, SubmitField, HiddenField
+from flask_wtf.file import FileField, FileAllowed, FileRequired, MultipleFileField
+from wtforms import StringField, TextAreaField, DecimalField, SelectField, SelectMultipleField, DateField, PasswordField, BooleanField, SubmitField, HiddenField
+from wtforms.widgets import ListWidget, CheckboxInput
 from wtforms.validators import DataRequired, Email, Length, NumberRange, Optional, ValidationError, EqualTo
-from app.models import User, Category, Role
+from app.models import User, Category, Role, Permission
 from datetime import date
 
 class LoginForm(FlaskForm):
@@ -76,6 +77,7 @@ class ReportForm(FlaskForm):
     category_id = SelectField('Category', coerce=int, validators=[Optional()])
     type = SelectField('Type', choices=[('', 'All'), ('income', 'Income'), ('expense', 'Expense')], validators=[Optional()])
     format = SelectField('Format', choices=[('pdf', 'PDF'), ('excel', 'Excel')], validators=[DataRequired()])
+    background = BooleanField('Generate in background')
     submit = SubmitField('Generate Report')
     
     def __init__(self, *args, **kwargs):
@@ -83,6 +85,10 @@ class ReportForm(FlaskForm):
         self.user_id.choices = [(0, 'All Users')] + [(user.id, user.get_full_name()) for user in User.query.filter_by(is_active=True).order_by(User.username).all()]
         self.category_id.choices = [(0, 'All Categories')] + [(cat.id, cat.name) for cat in Category.query.order_by(Category.name).all()]
 
+class RestoreForm(FlaskForm):
+    backups = MultipleFileField('Backup Files (full backup first, then incrementals)', validators=[FileRequired()])
+    submit = SubmitField('Restore')
+
 class SearchForm(FlaskForm):
     search_term = StringField('Search', validators=[Optional()], render_kw={"placeholder": "Search transactions..."})
     category_id = SelectField('Category', coerce=int, validators=[Optional()])
@@ -137,3 +143,22 @@ class UserForm(FlaskForm):
         user = User.query.filter_by(email=email.data).first()
         if user:
             raise ValidationError('Email already exists. Please choose a different one.')
+
+class RoleForm(FlaskForm):
+    name = StringField('Role Name', validators=[DataRequired(), Length(max=50)])
+    description = TextAreaField('Description', validators=[Optional(), Length(max=500)])
+    permissions = SelectMultipleField('Permissions', coerce=int, validators=[Optional()],
+                                      widget=ListWidget(prefix_label=False), option_widget=CheckboxInput())
+    submit = SubmitField('Save Role')
+    
+    def __init__(self, role=None, *args, **kwargs):
+        super(RoleForm, self).__init__(*args, **kwargs)
+        self.permissions.choices = [(permission.id, permission.name)
+                                    for permission in Permission.query.order_by(Permission.bit).all()]
+        self._role = role
+    
+    def validate_name(self, name):
+        if self._role and self._role.name == name.data:
+            return
+        if Role.query.filter_by(name=name.data).first():
+            raise ValidationError('Role already exists. Please choose a different name.')
@@ -16,9 +16,14 @@ In Django terms: This is equivalent to models.py in a Django app.
 # ===========================================
 # STEP 1: Import required libraries
 # ===========================================
+import hashlib
+import uuid
 from datetime import datetime, date
+from decimal import Decimal
 from flask_login import UserMixin  # Provides user authentication methods
-from sqlalchemy import func
+from sqlalchemy import func, event, insert, case, or_, inspect as sa_inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from app import db  # Database instance from app/__init__.py
 
 # ===========================================
@@ -39,6 +44,32 @@ class Role(db.Model):
     # Step 2c: Define relationship (one Role can have many Users)
     # This creates a reverse relationship: role.users to get all users with this role
     users = db.relationship('User', backref='role', lazy=True)
+    
+    # Step 2d: Permissions held by this role (editable on the /roles page)
+    permissions = db.relationship('Permission', secondary='role_permissions', lazy='select',
+                                  order_by='Permission.bit', backref=db.backref('roles', lazy=True))
+    
+    @property
+    def permission_mask(self):
+        """Compiled bitmask of this role's permissions (see app/permissions.py)"""
+        from app.permissions import permission_table
+        return permission_table.get().masks.get(self.id, 0)
+
+# Step 2e: Permission names checked by routes; `bit` is the permission's
+# position in a compiled role mask and never changes once assigned
+class Permission(db.Model):
+    __tablename__ = 'permissions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    description = db.Column(db.String(200))
+    bit = db.Column(db.Integer, unique=True, nullable=False)
+
+# Step 2f: Association table for Role <-> Permission (many-to-many)
+role_permissions = db.Table('role_permissions',
+    db.Column('role_id', db.Integer, db.ForeignKey('roles.id'), primary_key=True),
+    db.Column('permission_id', db.Integer, db.ForeignKey('permissions.id'), primary_key=True)
+)
 
 # ===========================================
 # STEP 3: Define User Model (Core Model)
@@ -48,6 +79,9 @@ class Role(db.Model):
 class User(UserMixin, db.Model):
     # Step 3a: Define table name
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_active', 'is_active'),  # dashboard active-user count
+    )
     
     # Step 3b: Define user fields (columns in database)
     id = db.Column(db.Integer, primary_key=True)
@@ -88,13 +122,9 @@ class User(UserMixin, db.Model):
     
     # Step 3g: Permission checking method (business logic)
     def has_permission(self, permission):
-        """Check if user has specific permission based on role"""
-        role_permissions = {
-            'Admin': ['create', 'read', 'update', 'delete', 'manage_users', 'reports', 'backup'],
-            'Manager': ['create', 'read', 'update', 'delete', 'reports'],
-            'Viewer': ['read', 'reports']
-        }
-        return permission in role_permissions.get(self.role.name, [])
+        """Check if user has specific permission based on role (a bit test on the compiled role mask)"""
+        from app.permissions import permission_table
+        return permission_table.get().allows(self.role_id, permission)
 
 # ===========================================
 # STEP 4: Define Category Model
@@ -141,6 +171,19 @@ transaction_tags = db.Table('transaction_tags',
 class Transaction(db.Model):
     __tablename__ = 'transactions'
     
+    # Step 7-pre: Composite indexes for the hot filters
+    # Every hot path filters on user_id first, then type/category and a date
+    # range; the listing sorts on (transaction_date, created_at, id).
+    # Existing databases receive these through app/schema.py (upgrade_schema).
+    __table_args__ = (
+        db.Index('ix_transactions_user_date', 'user_id', 'transaction_date', 'created_at', 'id'),  # per-user listing, date ranges
+        db.Index('ix_transactions_user_type_date', 'user_id', 'type', 'transaction_date'),  # dashboard totals, spending limits
+        db.Index('ix_transactions_user_category_date', 'user_id', 'category_id', 'transaction_date'),  # category limits/filters
+        db.Index('ix_transactions_date', 'transaction_date', 'created_at', 'id'),  # admin listing and reports
+        db.Index('ix_transactions_user_created', 'user_id', 'created_at'),  # recent transactions
+        db.Index('ix_transactions_updated', 'updated_at'),  # incremental backups
+    )
+    
     # Step 7a: Define transaction fields
     id = db.Column(db.Integer, primary_key=True)
     type = db.Column(db.String(20), nullable=False)  # 'income' or 'expense'
@@ -198,6 +241,10 @@ class SpendingLimit(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'))  # Optional: limit per category
     
+    # Running counter for the current period (maintained by Transaction writes)
+    current_period_start = db.Column(db.Date)
+    current_spent = db.Column(db.Numeric(12, 2))
+    
     # Step 9a: Business logic methods (Model layer responsibility)
     def get_period_start(self):
         """Get the start date for the current period"""
@@ -209,23 +256,142 @@ class SpendingLimit(db.Model):
         return today
     
     def get_spent_amount(self):
-        """Get amount spent in current period (queries Transaction model)"""
-        period_start = self.get_period_start()
-        query = Transaction.query.filter(
-            Transaction.user_id == self.user_id,
-            Transaction.type == 'expense',
-            Transaction.transaction_date >= period_start
-        )
-        
-        if self.category_id:
-            query = query.filter(Transaction.category_id == self.category_id)
-            
-        result = query.with_entities(func.sum(Transaction.amount)).scalar()
-        return result or 0
+        """Get amount spent in current period (O(1): read from the running counter)"""
+        SpendingLimit.refresh_counters([self])
+        return self.current_spent or 0
     
     def is_exceeded(self):
         """Check if spending limit is exceeded"""
         return self.get_spent_amount() > self.amount
+    
+    # Step 9a-2: Running counters
+    # current_spent holds the expenses dated on/after current_period_start.
+    # Transaction writes adjust it (see Step 12a); when the day/month rolls
+    # over it is recomputed lazily the next time the limit is read.
+    def counter_is_current(self):
+        """True if the running counter belongs to the current period"""
+        return self.current_spent is not None and self.current_period_start == self.get_period_start()
+    
+    @classmethod
+    def counter_refresh_statement(cls, ids):
+        """
+        UPDATE recomputing the counters of limits `ids` that belong to an
+        earlier period, with a correlated SUM subquery over their expenses.
+        """
+        today = date.today()
+        table = cls.__table__
+        transactions = Transaction.__table__
+        period_start = case((table.c.type == 'monthly', today.replace(day=1)), else_=today)
+        spent = db.select(func.coalesce(func.sum(transactions.c.amount), 0)).where(
+            transactions.c.user_id == table.c.user_id,
+            transactions.c.type == 'expense',
+            transactions.c.transaction_date >= period_start,
+            or_(table.c.category_id.is_(None), transactions.c.category_id == table.c.category_id)
+        ).scalar_subquery()
+        return (
+            table.update()
+            .where(table.c.id.in_(ids),
+                   or_(table.c.current_period_start.is_(None), table.c.current_period_start != period_start))
+            .values(current_period_start=period_start, current_spent=spent,
+                    updated_at=table.c.updated_at)  # counters are not user edits
+        )
+    
+    @classmethod
+    def refresh_counters(cls, limits):
+        """
+        Recompute the running counters of limits whose period has rolled over.
+        
+        Uses one UPDATE with a correlated SUM subquery, so a transaction written
+        concurrently is either included in the sum or applied on top of it.
+        Fresh counters cost no queries at all.
+        
+        The UPDATE and the read-back both run on the session's primary
+        connection (also under @read_replica), so counters never come from a
+        lagging replica. The change is committed with the request by
+        commit_refreshed_counters; outside a request it goes with the
+        caller's next commit.
+        """
+        stale = [limit for limit in limits if limit.id and not limit.counter_is_current()]
+        if not stale:
+            return
+        
+        table = cls.__table__
+        ids = [limit.id for limit in stale]
+        primary = {'bind': db.engine}
+        db.session.execute(cls.counter_refresh_statement(ids), bind_arguments=primary)
+        rows = db.session.execute(
+            db.select(table.c.id, table.c.current_period_start, table.c.current_spent)
+            .where(table.c.id.in_(ids)),
+            bind_arguments=primary
+        ).all()
+        db.session.info[_COUNTERS_REFRESHED_KEY] = True
+        
+        # Load the new values without marking the objects dirty
+        by_id = {limit.id: limit for limit in stale}
+        for limit_id, current_period_start, current_spent in rows:
+            set_committed_value(by_id[limit_id], 'current_period_start', current_period_start)
+            set_committed_value(by_id[limit_id], 'current_spent', current_spent)
+    
+    @classmethod
+    def apply_expense_delta(cls, connection, user_id, category_id, transaction_date, amount):
+        """Adjust the counters of every limit an expense counts towards (flush connection)"""
+        table = cls.__table__
+        connection.execute(
+            table.update()
+            .where(table.c.user_id == user_id,
+                   table.c.current_period_start.isnot(None),
+                   table.c.current_period_start <= transaction_date,
+                   or_(table.c.category_id.is_(None), table.c.category_id == category_id))
+            .values(current_spent=table.c.current_spent + amount, updated_at=table.c.updated_at)
+        )
+
+# Step 9a-3: Commit counter refreshes made while serving a (GET) request
+_COUNTERS_REFRESHED_KEY = 'spending_counters_refreshed'
+
+def commit_refreshed_counters(response):
+    """after_request hook: commit counters recomputed by refresh_counters"""
+    if db.session.info.pop(_COUNTERS_REFRESHED_KEY, False):
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()  # recomputed again on the next read
+            from flask import current_app
+            current_app.logger.error(f"Error saving spending limit counters: {str(e)}")
+    return response
+
+# Step 9b: Batched evaluation (one grouped query for all of a user's limits)
+def evaluate_spending_limits(user_id, limits=None):
+    """
+    Compute spent amounts for many spending limits at once.
+    
+    Spent amounts come from the limits' running counters, so evaluating is
+    free once they are current; limits whose period has rolled over are
+    refreshed together in a single statement.
+    
+    Args:
+        user_id: Owner of the limits
+        limits: SpendingLimit objects to evaluate (default: the user's active limits)
+    
+    Returns:
+        List of dicts with 'limit', 'spent', 'percentage' and 'exceeded'
+    """
+    if limits is None:
+        limits = SpendingLimit.query.filter_by(user_id=user_id, is_active=True).all()
+    if not limits:
+        return []
+    
+    SpendingLimit.refresh_counters(limits)
+    
+    results = []
+    for limit in limits:
+        spent = Decimal(str(limit.current_spent or 0))
+        results.append({
+            'limit': limit,
+            'spent': spent,
+            'percentage': (spent / limit.amount) * 100 if limit.amount else 0,
+            'exceeded': spent > limit.amount
+        })
+    return results
 
 # ===========================================
 # STEP 10: Define SystemSetting Model
@@ -240,6 +406,36 @@ class SystemSetting(db.Model):
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @classmethod
+    def get_value(cls, key, default=None):
+        """Read one setting (a single indexed lookup)"""
+        value = db.session.query(cls.value).filter(cls.key == key).scalar()
+        return default if value is None else value
+    
+    @classmethod
+    def set_value(cls, connection, key, value):
+        """Create or overwrite one setting (upsert) on the given connection"""
+        table = cls.__table__
+        now = datetime.utcnow()
+        
+        if connection.dialect.name in ('sqlite', 'postgresql'):
+            if connection.dialect.name == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            statement = dialect_insert(table).values(key=key, value=value, created_at=now, updated_at=now)
+            statement = statement.on_conflict_do_update(
+                index_elements=['key'],
+                set_={'value': statement.excluded.value, 'updated_at': now}
+            )
+            connection.execute(statement)
+            return
+        
+        # Generic fallback: update the row, insert it if it did not exist
+        result = connection.execute(table.update().where(table.c.key == key).values(value=value, updated_at=now))
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(key=key, value=value, created_at=now, updated_at=now))
 
 # ===========================================
 # STEP 11: Define AuditLog Model
@@ -248,6 +444,14 @@ class SystemSetting(db.Model):
 class AuditLog(db.Model):
     __tablename__ = 'audit_logs'
     
+    # Every audit query reads newest first, optionally for one user or action,
+    # and pages on (created_at, id) - see audit_log_page() in app/audit.py
+    __table_args__ = (
+        db.Index('ix_audit_logs_created', 'created_at', 'id'),  # viewer, archival by month
+        db.Index('ix_audit_logs_user_created', 'user_id', 'created_at', 'id'),  # one user's activity
+        db.Index('ix_audit_logs_action_created', 'action', 'created_at', 'id'),  # one action, backup deletes
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     action = db.Column(db.String(100), nullable=False)  # 'login', 'create_transaction', etc.
@@ -261,3 +465,191 @@ class AuditLog(db.Model):
     
     # Relationship: AuditLog belongs to a User
     user = db.relationship('User', backref='audit_logs')
+
+# ===========================================
+# STEP 12: Define TransactionRollup Model
+# ===========================================
+# Pre-aggregated monthly totals: (user, month, type, category) -> sum, count
+# Dashboard and report totals read this small table instead of scanning
+# transactions. It is kept current by the Transaction mapper events below,
+# which run inside the same database transaction as the write itself.
+class TransactionRollup(db.Model):
+    __tablename__ = 'transaction_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'year_month', 'type', 'category_id', name='uq_transaction_rollups_key'),
+        db.Index('ix_transaction_rollups_month', 'year_month', 'type'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    year_month = db.Column(db.String(7), nullable=False)  # 'YYYY-MM'
+    type = db.Column(db.String(20), nullable=False)  # 'income' or 'expense'
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
+    total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    @staticmethod
+    def month_key(day):
+        """Return the 'YYYY-MM' bucket for a date"""
+        return day.strftime('%Y-%m')
+    
+    @classmethod
+    def apply_delta(cls, connection, user_id, transaction_date, type, category_id, amount, count):
+        """Add amount/count to one rollup bucket (upsert), using the flush connection"""
+        table = cls.__table__
+        values = {
+            'user_id': user_id,
+            'year_month': cls.month_key(transaction_date),
+            'type': type,
+            'category_id': category_id,
+            'total': amount,
+            'count': count,
+        }
+        key_columns = ['user_id', 'year_month', 'type', 'category_id']
+        
+        if connection.dialect.name in ('sqlite', 'postgresql'):
+            if connection.dialect.name == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            statement = dialect_insert(table).values(**values)
+            statement = statement.on_conflict_do_update(
+                index_elements=key_columns,
+                set_={'total': table.c.total + statement.excluded.total,
+                      'count': table.c.count + statement.excluded.count}
+            )
+            connection.execute(statement)
+            return
+        
+        # Generic fallback: update the bucket, insert it if it did not exist
+        result = connection.execute(
+            table.update()
+            .where(*[table.c[column] == values[column] for column in key_columns])
+            .values(total=table.c.total + amount, count=table.c.count + count)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(**values))
+    
+    @classmethod
+    def rebuild(cls):
+        """Recompute every bucket from the transactions table"""
+        table = cls.__table__
+        if db.engine.dialect.name == 'postgresql':
+            year_month = func.to_char(Transaction.transaction_date, 'YYYY-MM')
+        else:
+            year_month = func.strftime('%Y-%m', Transaction.transaction_date)
+        
+        grouped = db.select(
+            Transaction.user_id, year_month, Transaction.type, Transaction.category_id,
+            func.sum(Transaction.amount), func.count(Transaction.id)
+        ).group_by(Transaction.user_id, year_month, Transaction.type, Transaction.category_id)
+        
+        db.session.execute(table.delete())
+        db.session.execute(table.insert().from_select(
+            ['user_id', 'year_month', 'type', 'category_id', 'total', 'count'], grouped))
+        db.session.commit()
+
+# Step 12a: Keep rollups and spending-limit counters in sync with Transaction writes
+def _committed_value(target, attribute):
+    """Value of an attribute as it is stored in the database before this flush"""
+    history = sa_inspect(target).attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(target, attribute)
+
+_ROLLUP_KEY = ('user_id', 'transaction_date', 'type', 'category_id')
+
+def _apply_transaction_delta(connection, user_id, transaction_date, type, category_id, amount, count):
+    """Add (or with negative values, remove) one transaction's contribution"""
+    TransactionRollup.apply_delta(connection, user_id, transaction_date, type, category_id, amount, count)
+    if type == 'expense':
+        SpendingLimit.apply_expense_delta(connection, user_id, category_id, transaction_date, amount)
+
+@event.listens_for(Transaction, 'after_insert')
+def _transaction_after_insert(mapper, connection, target):
+    _apply_transaction_delta(connection, target.user_id, target.transaction_date,
+                             target.type, target.category_id, target.amount, 1)
+
+@event.listens_for(Transaction, 'after_update')
+def _transaction_after_update(mapper, connection, target):
+    old_key = tuple(_committed_value(target, name) for name in _ROLLUP_KEY)
+    new_key = tuple(getattr(target, name) for name in _ROLLUP_KEY)
+    old_amount = _committed_value(target, 'amount')
+    if old_key == new_key and old_amount == target.amount:
+        return
+    _apply_transaction_delta(connection, *old_key, -old_amount, -1)
+    _apply_transaction_delta(connection, *new_key, target.amount, 1)
+
+@event.listens_for(Transaction, 'after_delete')
+def _transaction_after_delete(mapper, connection, target):
+    key = tuple(_committed_value(target, name) for name in _ROLLUP_KEY)
+    _apply_transaction_delta(connection, *key, -_committed_value(target, 'amount'), -1)
+
+# Tag changes touch only transaction_tags; stamp the transaction so that
+# incremental backups (rows with updated_at after the last backup) pick them up
+@event.listens_for(Transaction.tags, 'append')
+@event.listens_for(Transaction.tags, 'remove')
+def _transaction_tags_changed(target, value, initiator):
+    target.updated_at = datetime.utcnow()
+
+# Step 12b: A limit whose period or category changes needs a fresh counter
+@event.listens_for(SpendingLimit, 'before_update')
+def _spending_limit_before_update(mapper, connection, target):
+    state = sa_inspect(target)
+    if state.attrs.type.history.has_changes() or state.attrs.category_id.history.has_changes():
+        target.current_period_start = None
+        target.current_spent = None
+
+# Step 12c: Data versions - stamps that change whenever report data changes
+# Cached reports (app/report_cache.py) are keyed on them. Each user has their
+# own stamp ('data_version:<user id>'), bumped by writes to that user's
+# transactions, so users neither wait on one shared row lock nor invalidate
+# each other's reports. The global 'data_version' covers what every report
+# shows (categories) and restores. Stamps are bumped once per flush, inside
+# the same database transaction as the write.
+DATA_VERSION_KEY = 'data_version'
+
+def user_data_version_key(user_id):
+    return f'{DATA_VERSION_KEY}:{user_id}'
+
+def get_data_version(user_id=None):
+    """
+    Data version stamp for the reports of one user, or of all users (user_id=None).
+
+    A single user's stamp is the global stamp plus that user's; the all-users
+    stamp is a digest of the global stamp and every user's.
+    """
+    keys = SystemSetting.key == DATA_VERSION_KEY
+    if user_id is not None:
+        keys = or_(keys, SystemSetting.key == user_data_version_key(user_id))
+    else:
+        keys = or_(keys, SystemSetting.key.like(f'{DATA_VERSION_KEY}:%'))
+    stamps = dict(db.session.query(SystemSetting.key, SystemSetting.value).filter(keys).all())
+    global_stamp = stamps.pop(DATA_VERSION_KEY, '0')
+    if user_id is not None:
+        return f"{global_stamp}:{stamps.get(user_data_version_key(user_id), '0')}"
+    digest = hashlib.sha1(global_stamp.encode())
+    for key in sorted(stamps):
+        digest.update(f'|{key}={stamps[key]}'.encode())
+    return digest.hexdigest()
+
+def bump_data_version(connection, user_id=None):
+    """Change the stamp of one user's data, or with user_id=None, of all data"""
+    key = DATA_VERSION_KEY if user_id is None else user_data_version_key(user_id)
+    SystemSetting.set_value(connection, key, uuid.uuid4().hex)
+
+@event.listens_for(Session, 'after_flush')
+def _bump_data_version_after_flush(session, flush_context):
+    changed = list(session.new) + list(session.deleted) + [
+        obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    if any(isinstance(obj, Category) for obj in changed):
+        bump_data_version(session.connection())
+    user_ids = set()
+    for obj in changed:
+        if isinstance(obj, Transaction):
+            # A transaction moved to another user changes both users' reports
+            user_ids.update({obj.user_id, _committed_value(obj, 'user_id')})
+    for user_id in sorted(user_id for user_id in user_ids if user_id is not None):
+        bump_data_version(session.connection(), user_id)
@@ -0,0 +1,136 @@
+"""
+===========================================
+KEYSET (SEEK) PAGINATION
+===========================================
+Cursor-based pagination for large, ordered listings.
+
+OFFSET pagination (query.paginate) makes the database walk and discard every
+row before the requested page and runs a full COUNT(*) on every view, so deep
+pages get slower the deeper they are. Keyset pagination instead remembers the
+sort key of the last row shown and asks for "rows after this key", which an
+index on the sort columns answers directly - page N costs the same as page 1.
+
+The cursors handed to the View layer are opaque (URL-safe base64 JSON) so
+templates only pass them back, never interpret them.
+"""
+
+# ===========================================
+# STEP 1: Import required libraries
+# ===========================================
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy import tuple_
+
+
+# ===========================================
+# STEP 2: Cursor encoding helpers
+# ===========================================
+def _encode_value(value):
+    """Convert a sort-key value into something JSON can hold"""
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    """Reverse of _encode_value"""
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+    return value
+
+
+def encode_cursor(direction, key):
+    """Encode a direction ('next' or 'prev') and sort key into an opaque token"""
+    payload = json.dumps({'d': direction, 'k': [_encode_value(v) for v in key]},
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor token; returns (direction, key) or None if it is invalid"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        direction = payload['d']
+        key = tuple(_decode_value(v) for v in payload['k'])
+    except (ValueError, KeyError, TypeError):
+        return None
+    if direction not in ('next', 'prev'):
+        return None
+    return direction, key
+
+
+# ===========================================
+# STEP 3: Keyset page object
+# ===========================================
+class KeysetPage:
+    """
+    One page of a keyset-paginated query.
+
+    Mirrors the parts of Flask-SQLAlchemy's Pagination object that the
+    templates use (items, has_next, has_prev) and adds next_cursor and
+    prev_cursor tokens instead of page numbers.
+    """
+
+    is_keyset = True
+
+    def __init__(self, items, key_func, has_next, has_prev):
+        self.items = items
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = encode_cursor('next', key_func(items[-1])) if items and has_next else None
+        self.prev_cursor = encode_cursor('prev', key_func(items[0])) if items and has_prev else None
+
+
+def keyset_paginate(query, sort_columns, key_func, cursor=None, per_page=20):
+    """
+    Paginate a query on a descending composite sort key.
+
+    Args:
+        query: Query with all filters applied but no ORDER BY
+        sort_columns: Columns forming a unique, descending sort key
+                      (the last one should be the primary key as tie-breaker)
+        key_func: Function returning the sort key tuple for a result row
+        cursor: Token from a previous KeysetPage, or None for the first page
+        per_page: Number of rows per page
+
+    Returns:
+        KeysetPage
+    """
+    decoded = decode_cursor(cursor)
+    direction, key = decoded if decoded else ('next', None)
+    row_key = tuple_(*sort_columns)
+
+    # Step 3a: Seek past the cursor key instead of OFFSET-ing to it
+    if key is not None and len(key) == len(sort_columns):
+        if direction == 'next':
+            query = query.filter(row_key < tuple_(*key))
+        else:
+            query = query.filter(row_key > tuple_(*key))
+    else:
+        direction, key = 'next', None
+
+    # Step 3b: Walk the index forwards (next) or backwards (prev)
+    if direction == 'next':
+        query = query.order_by(*[column.desc() for column in sort_columns])
+    else:
+        query = query.order_by(*[column.asc() for column in sort_columns])
+
+    # Step 3c: Fetch one extra row to know whether another page exists
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if direction == 'next':
+        return KeysetPage(rows, key_func, has_next=has_more, has_prev=key is not None)
+
+    rows.reverse()
+    return KeysetPage(rows, key_func, has_next=True, has_prev=has_more)
@@ -0,0 +1,181 @@
+"""
+===========================================
+PERMISSIONS - DATA-DRIVEN ROLE PERMISSIONS
+===========================================
+Which role may do what used to be a dict inside User.has_permission().
+It now lives in the database, so admins can change it on the /roles page
+without a deploy:
+
+- permissions       one row per permission name checked by the routes;
+                    `bit` is its position in a compiled mask
+- role_permissions  which roles hold which permissions
+
+HOW IT WORKS:
+- PermissionTable loads both tables once per process and compiles them
+  into {permission name: bit value} and {role id: integer mask}, so
+  has_permission() is `mask & bit`. It runs no query and builds no set.
+- Any ORM change to roles or permissions bumps the 'permissions_version'
+  system setting inside the same database transaction, and the committing
+  process drops its compiled masks (session events below).
+- Other workers compare their compiled version with the stored one at
+  most every PERMISSIONS_RECHECK_SECONDS and recompile when it changed.
+"""
+
+# ===========================================
+# STEP 1: Import required libraries
+# ===========================================
+import threading
+import time
+import uuid
+from flask import current_app
+from sqlalchemy import event, select, inspect as sa_inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Role, Permission, SystemSetting, role_permissions
+
+PERMISSIONS_VERSION_KEY = 'permissions_version'
+
+# Key in Session.info set when a flush changed roles or permissions
+_CHANGED_KEY = 'permissions_changed'
+
+# Step 1a: Permissions the code checks, in bit order, and the roles that
+# hold them on a new database (or one upgraded from the hardcoded table)
+DEFAULT_PERMISSIONS = [
+    ('create', 'Add transactions and categories'),
+    ('read', 'View transactions'),
+    ('update', 'Edit transactions'),
+    ('delete', 'Delete transactions'),
+    ('manage_users', 'Manage users and roles'),
+    ('reports', 'Generate reports'),
+    ('backup', 'Create and restore backups'),
+]
+
+DEFAULT_ROLE_PERMISSIONS = {
+    'Admin': ['create', 'read', 'update', 'delete', 'manage_users', 'reports', 'backup'],
+    'Manager': ['create', 'read', 'update', 'delete', 'reports'],
+    'Viewer': ['read', 'reports'],
+}
+
+
+# ===========================================
+# STEP 2: Compiled permission masks
+# ===========================================
+class CompiledPermissions:
+    """One immutable compilation of the permission tables"""
+
+    def __init__(self, version, bits, masks):
+        self.version = version
+        self.bits = bits    # permission name -> bit value (1 << Permission.bit)
+        self.masks = masks  # role id -> OR of its permission bits
+
+    def allows(self, role_id, permission):
+        return bool(self.masks.get(role_id, 0) & self.bits.get(permission, 0))
+
+    def names(self, mask):
+        """Permission names set in a mask"""
+        return [name for name, bit in self.bits.items() if mask & bit]
+
+
+def _read_version(connection):
+    settings = SystemSetting.__table__
+    return connection.execute(
+        select(settings.c.value).where(settings.c.key == PERMISSIONS_VERSION_KEY)).scalar() or '0'
+
+
+def _compile():
+    """Read the version stamp, then the tables (so a concurrent change can only cause another recompile)"""
+    with db.engine.connect() as connection:
+        version = _read_version(connection)
+        bits = {name: 1 << bit for name, bit in connection.execute(
+            select(Permission.name, Permission.bit).order_by(Permission.bit))}
+        masks = {}
+        for role_id, bit in connection.execute(
+                select(role_permissions.c.role_id, Permission.bit)
+                .join(Permission, Permission.id == role_permissions.c.permission_id)):
+            masks[role_id] = masks.get(role_id, 0) | (1 << bit)
+    return CompiledPermissions(version, bits, masks)
+
+
+class PermissionTable:
+    """Per-process holder of the compiled masks, rechecked against the stored version"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._compiled = None
+        self._checked_at = 0.0
+
+    def get(self):
+        compiled = self._compiled
+        interval = current_app.config['PERMISSIONS_RECHECK_SECONDS']
+        if compiled is not None and time.monotonic() - self._checked_at < interval:
+            return compiled
+        with self._lock:
+            if self._compiled is None or time.monotonic() - self._checked_at >= interval:
+                if self._compiled is None:
+                    self._compiled = _compile()
+                else:
+                    with db.engine.connect() as connection:
+                        if _read_version(connection) != self._compiled.version:
+                            self._compiled = _compile()
+                self._checked_at = time.monotonic()
+            return self._compiled
+
+    def invalidate(self):
+        with self._lock:
+            self._compiled = None
+
+
+permission_table = PermissionTable()
+
+
+# ===========================================
+# STEP 3: Invalidation
+# ===========================================
+def bump_permissions_version(connection):
+    SystemSetting.set_value(connection, PERMISSIONS_VERSION_KEY, uuid.uuid4().hex)
+
+
+def _changes_masks(session, obj):
+    if isinstance(obj, Permission):
+        return True
+    if isinstance(obj, Role):
+        return obj in session.deleted or sa_inspect(obj).attrs.permissions.history.has_changes()
+    return False
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_permissions_version_after_flush(session, flush_context):
+    changed = list(session.new) + list(session.deleted) + list(session.dirty)
+    if any(_changes_masks(session, obj) for obj in changed):
+        bump_permissions_version(session.connection())
+        session.info[_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    if session.info.pop(_CHANGED_KEY, False):
+        permission_table.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_change(session):
+    session.info.pop(_CHANGED_KEY, None)
+
+
+# ===========================================
+# STEP 4: Seeding
+# ===========================================
+def seed_permissions():
+    """Create missing permissions; give roles their defaults if no role holds any yet"""
+    existing = {permission.name: permission for permission in Permission.query.all()}
+    next_bit = max((permission.bit for permission in existing.values()), default=-1) + 1
+    for name, description in DEFAULT_PERMISSIONS:
+        if name not in existing:
+            existing[name] = Permission(name=name, description=description, bit=next_bit)
+            db.session.add(existing[name])
+            next_bit += 1
+
+    if db.session.query(role_permissions).first() is None:
+        for role in Role.query.filter(Role.name.in_(DEFAULT_ROLE_PERMISSIONS)).all():
+            role.permissions = [existing[name] for name in DEFAULT_ROLE_PERMISSIONS[role.name]]
+    db.session.commit()
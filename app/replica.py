@@ -0,0 +1,135 @@
+"""
+===========================================
+READ REPLICA - ROUTING READ-ONLY REQUESTS
+===========================================
+The dashboard, transaction list, reports and /api/* reads make up most of
+the load. When READ_REPLICA_URL is set, it becomes the 'replica' entry of
+SQLALCHEMY_BINDS, and routes marked with @read_replica run their queries
+there instead of on the primary database.
+
+HOW IT WORKS:
+- db.session is a RoutingSession. Its get_bind() returns the replica
+  engine while the request is marked, and the primary otherwise.
+- Writes always go to the primary: flushes, INSERT/UPDATE/DELETE
+  statements and SELECT ... FOR UPDATE. Once a session has flushed, the
+  rest of its reads in the request go to the primary too.
+- Read-your-writes: when a request commits changes, the user's session
+  cookie records "primary until now + REPLICA_STICKY_SECONDS". Until
+  then @read_replica leaves that user's requests on the primary, so the
+  page shown after a save never comes from a lagging replica.
+- Code that uses db.engine directly (permissions, backups, background
+  jobs) always talks to the primary.
+
+LOCAL TESTING:
+    DATABASE_URL unset, READ_REPLICA_URL=sqlite:///replica.db
+    flask --app main sync-replica   # copy the primary into replica.db
+Two local PostgreSQL servers with streaming replication work the same way.
+"""
+
+# ===========================================
+# STEP 1: Import required libraries
+# ===========================================
+# Imported by app/__init__.py before `db` exists, so no `from app import db` here
+import sqlite3
+import time
+from functools import wraps
+from flask import current_app, g, has_app_context, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND = 'replica'
+
+# Key in the user's Flask session: time until which their reads stay on the primary
+_STICKY_KEY = '_replica_sticky_until'
+
+# Key in Session.info set once the session flushed a change
+_WROTE_KEY = 'replica_wrote'
+
+
+# ===========================================
+# STEP 2: Session that picks the engine per statement
+# ===========================================
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends the reads of @read_replica requests to the replica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._reads_from_replica(clause):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        if not (has_app_context() and g.get('use_replica')):
+            return False
+        if self._flushing or self.info.get(_WROTE_KEY):
+            return False
+        if clause is not None and (clause.is_dml or getattr(clause, '_for_update_arg', None) is not None):
+            return False
+        return True
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _note_write(session, flush_context):
+    session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_to_primary(session):
+    if not session.info.pop(_WROTE_KEY, False) or not has_request_context():
+        return
+    g.use_replica = False
+    seconds = current_app.config.get('REPLICA_STICKY_SECONDS', 0)
+    if seconds > 0 and replica_enabled():
+        flask_session[_STICKY_KEY] = time.time() + seconds
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_write(session):
+    session.info.pop(_WROTE_KEY, None)
+
+
+# ===========================================
+# STEP 3: Marking read-only routes
+# ===========================================
+def replica_enabled():
+    return REPLICA_BIND in (current_app.config.get('SQLALCHEMY_BINDS') or {})
+
+
+def read_replica(view):
+    """Run this view's queries on the read replica (if one is configured and the user has not just written)"""
+    @wraps(view)
+    def decorated_view(*args, **kwargs):
+        if replica_enabled():
+            sticky_until = flask_session.get(_STICKY_KEY)
+            if sticky_until is not None and sticky_until <= time.time():
+                flask_session.pop(_STICKY_KEY)
+                sticky_until = None
+            g.use_replica = sticky_until is None
+        return view(*args, **kwargs)
+    return decorated_view
+
+
+# ===========================================
+# STEP 4: Local testing with two SQLite files
+# ===========================================
+def sync_sqlite_replica():
+    """Copy the primary SQLite database into the SQLite replica (stands in for replication)"""
+    from app import db
+    from app.backups import sqlite_database_path
+
+    if not replica_enabled():
+        raise RuntimeError("READ_REPLICA_URL is not set")
+    replica_url = db.engines[REPLICA_BIND].url
+    primary_path = sqlite_database_path()
+    if primary_path is None or replica_url.get_backend_name() != 'sqlite' or not replica_url.database:
+        raise RuntimeError("Both the primary and the replica must be SQLite files")
+
+    # Replica connections must not keep reading the old file contents
+    db.engines[REPLICA_BIND].dispose()
+    source = sqlite3.connect(primary_path)
+    target = sqlite3.connect(replica_url.database)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return replica_url.database
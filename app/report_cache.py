@@ -0,0 +1,83 @@
+"""
+===========================================
+REPORT CACHE - GENERATED REPORT FILES
+===========================================
+Month-end exports are re-run many times with the same filters. This cache
+keeps the generated PDF/Excel bytes in memory so a repeated export skips
+both the database query and the PDF/Excel rendering.
+
+HOW IT WORKS:
+- Key: the resolved report parameters (user scope, start/end date,
+  category, type, format) plus the data version stamp of the report's user
+  (see get_data_version() in app/models.py), which every write to that
+  user's transactions bumps. A user's writes leave other users' cached
+  reports alone; reports over all users change with anyone's writes.
+  Stale entries are therefore never served; they simply age out.
+- Bounded by total size (REPORT_CACHE_MAX_BYTES), least recently used
+  entries are evicted first. Reports larger than REPORT_CACHE_MAX_ENTRY_BYTES
+  are not cached, so they stay on disk instead of being pulled into memory.
+- One cache per process; REPORT_CACHE_MAX_BYTES=0 disables it.
+"""
+
+# ===========================================
+# STEP 1: Import required libraries
+# ===========================================
+import json
+import threading
+from collections import OrderedDict
+
+
+# ===========================================
+# STEP 2: Byte-bounded LRU cache
+# ===========================================
+class ReportCache:
+    """Thread-safe LRU of report bytes, bounded by their total size"""
+
+    def __init__(self):
+        self._entries = OrderedDict()  # key -> report bytes
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(params, data_version):
+        return (json.dumps(params, sort_keys=True), data_version)
+
+    def get(self, key):
+        """Return the cached report bytes and mark them most recently used, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, data, max_bytes):
+        """Store report bytes, evicting least recently used entries to stay within max_bytes"""
+        if len(data) > max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._size,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+report_cache = ReportCache()
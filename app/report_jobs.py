@@ -0,0 +1,258 @@
+"""
+===========================================
+BACKGROUND REPORT JOBS
+===========================================
+Generates PDF/Excel reports outside the request, so large date ranges no
+longer run into worker or serverless request timeouts.
+
+HOW IT WORKS:
+- submit_report_job() stores a job description and hands the rendering to
+  a small local thread pool (REPORT_JOB_WORKERS threads per process)
+- Job state lives in JSON files next to the results under
+  UPLOAD_FOLDER/reports, so any worker process can answer status polls and
+  serve the download, not just the one that rendered it
+- Finished results expire after REPORT_JOB_TTL seconds; expired jobs are
+  purged whenever a new job is submitted (or by `flask purge-report-jobs`)
+- Identical requests made while a job is queued or running share that job:
+  an "in-flight" marker file keyed by a hash of the report parameters is
+  created atomically (O_EXCL), so only one process wins the race
+
+NOTE: serverless platforms (Vercel) suspend the instance between requests,
+so a background job only makes progress while the instance is serving
+requests (e.g. the status polls); long-running deployments have no such
+limitation.
+"""
+
+# ===========================================
+# STEP 1: Import required libraries
+# ===========================================
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+
+# Job states
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+# ===========================================
+# STEP 2: Job storage (JSON files under UPLOAD_FOLDER/reports)
+# ===========================================
+def _jobs_folder():
+    folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'reports')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _job_path(job_id):
+    return os.path.join(_jobs_folder(), f'{job_id}.json')
+
+
+def _inflight_path(key):
+    return os.path.join(_jobs_folder(), f'inflight-{key}')
+
+
+def _write_job(job):
+    """Write job metadata atomically so pollers never read a half-written file"""
+    path = _job_path(job['id'])
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(job, f)
+    os.replace(tmp_path, path)
+
+
+def get_job(job_id):
+    """Load a job by id; returns None for unknown or malformed ids"""
+    try:
+        uuid.UUID(job_id)
+        with open(_job_path(job_id)) as f:
+            return json.load(f)
+    except (ValueError, OSError):
+        return None
+
+
+def job_result_path(job):
+    """Absolute path of a finished job's result file"""
+    return os.path.join(_jobs_folder(), job['filename'])
+
+
+def can_access_job(job, user):
+    """Users see jobs for reports they are allowed to generate themselves"""
+    return user.has_permission('manage_users') or job['params']['user_id'] == user.id
+
+
+def report_job_key(params):
+    """Stable hash of the report parameters used to collapse duplicate requests"""
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:32]
+
+
+# ===========================================
+# STEP 3: Worker pool
+# ===========================================
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=app.config['REPORT_JOB_WORKERS'],
+                                           thread_name_prefix='report-job')
+        return _executor
+
+
+def _run_job(app, job_id):
+    """Render one report inside an application context (runs on a pool thread)"""
+    from app import db
+    from app.utils import render_report
+
+    with app.app_context():
+        job = get_job(job_id)
+        job['status'] = RUNNING
+        job['started_at'] = datetime.utcnow().isoformat()
+        _write_job(job)
+
+        try:
+            buffer, download_name, mimetype = render_report(job['params'])
+            filename = f"{job_id}.{download_name.rsplit('.', 1)[1]}"
+            tmp_path = os.path.join(_jobs_folder(), f'{filename}.tmp')
+            with buffer, open(tmp_path, 'wb') as f:
+                shutil.copyfileobj(buffer, f)
+            os.replace(tmp_path, os.path.join(_jobs_folder(), filename))
+
+            job.update(status=DONE, filename=filename, download_name=download_name, mimetype=mimetype)
+        except Exception as e:
+            logging.exception(f"Report job {job_id} failed")
+            job.update(status=FAILED, error=str(e))
+        finally:
+            db.session.remove()
+
+        finished = datetime.utcnow()
+        job['finished_at'] = finished.isoformat()
+        job['expires_at'] = (finished + timedelta(seconds=app.config['REPORT_JOB_TTL'])).isoformat()
+        _write_job(job)
+        _release_inflight(job)
+
+
+def _release_inflight(job):
+    """Drop the in-flight marker so the next identical request starts a new job"""
+    path = _inflight_path(job['key'])
+    try:
+        with open(path) as f:
+            if f.read().strip() == job['id']:
+                os.remove(path)
+    except OSError:
+        pass
+
+
+# ===========================================
+# STEP 4: Public API
+# ===========================================
+def submit_report_job(params, user):
+    """
+    Queue a report for background rendering.
+
+    Returns the job dict; if an identical report is already queued or
+    running, that job is returned instead of starting a new one.
+    """
+    app = current_app._get_current_object()
+    purge_expired_jobs()
+
+    key = report_job_key(params)
+    marker = _inflight_path(key)
+    job_id = uuid.uuid4().hex
+    while True:
+        try:
+            fd = os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            with open(marker) as f:
+                existing = get_job(f.read().strip())
+            if existing and existing['status'] in (QUEUED, RUNNING) and not _is_stale(existing):
+                return existing
+            # Marker left behind by a crashed worker: take it over
+            try:
+                os.remove(marker)
+            except FileNotFoundError:
+                pass
+            continue
+        with os.fdopen(fd, 'w') as f:
+            f.write(job_id)
+        break
+
+    job = {
+        'id': job_id,
+        'key': key,
+        'params': params,
+        'requested_by': user.id,
+        'status': QUEUED,
+        'created_at': datetime.utcnow().isoformat(),
+    }
+    _write_job(job)
+    _get_executor(app).submit(_run_job, app, job_id)
+    return job
+
+
+def _is_stale(job):
+    """Queued/running jobs older than the TTL were lost (e.g. the process died)"""
+    created = datetime.fromisoformat(job['created_at'])
+    return datetime.utcnow() - created > timedelta(seconds=current_app.config['REPORT_JOB_TTL'])
+
+
+def list_jobs(user, limit=10):
+    """Most recent jobs the user may access, newest first"""
+    jobs = []
+    for name in os.listdir(_jobs_folder()):
+        if name.endswith('.json'):
+            job = get_job(name[:-5])
+            if job and can_access_job(job, user):
+                jobs.append(job)
+    jobs.sort(key=lambda job: job['created_at'], reverse=True)
+    return jobs[:limit]
+
+
+def purge_expired_jobs():
+    """Delete expired jobs, their result files and stale in-flight markers; returns the count"""
+    folder = _jobs_folder()
+    now = datetime.utcnow()
+    purged = 0
+    for name in os.listdir(folder):
+        if not name.endswith('.json'):
+            continue
+        job = get_job(name[:-5])
+        if job is None:
+            continue
+        expired = job.get('expires_at') and datetime.fromisoformat(job['expires_at']) < now
+        if expired or (job['status'] in (QUEUED, RUNNING) and _is_stale(job)):
+            for path in (job.get('filename') and job_result_path(job), _job_path(job['id'])):
+                if path and os.path.exists(path):
+                    os.remove(path)
+            _release_inflight(job)
+            purged += 1
+    return purged
+
+
+def job_to_dict(job):
+    """Public view of a job for the status endpoint"""
+    from flask import url_for
+    data = {
+        'id': job['id'],
+        'status': job['status'],
+        'format': job['params']['format'],
+        'start_date': job['params']['start_date'],
+        'end_date': job['params']['end_date'],
+        'created_at': job['created_at'],
+        'finished_at': job.get('finished_at'),
+        'expires_at': job.get('expires_at'),
+        'status_url': url_for('main.report_job_status', job_id=job['id']),
+    }
+    if job['status'] == DONE:
+        data['download_url'] = url_for('main.report_job_download', job_id=job['id'])
+    if job['status'] == FAILED:
+        data['error'] = job.get('error')
+    return data
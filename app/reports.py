@@ -0,0 +1,288 @@
+"""
+===========================================
+REPORT RENDERING - PDF AND EXCEL
+===========================================
+Turns report rows into PDF (reportlab) and Excel (openpyxl) files.
+
+Importing reportlab and openpyxl takes longer than importing the rest of
+the app, and only report generation needs them. This module is therefore
+imported on first use, by generate_pdf_report() and
+generate_excel_report() in app/utils.py, instead of at startup. That
+keeps serverless cold starts and worker boots fast.
+benchmarks/import_budget.py fails if the app's startup imports pull these
+libraries in again.
+"""
+
+# ===========================================
+# STEP 1: Import required libraries
+# ===========================================
+from datetime import datetime
+from decimal import Decimal
+from tempfile import SpooledTemporaryFile
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
+from app.utils import REPORT_SPOOL_MAX_MEMORY, EXCEL_REPORT_COLUMNS, format_currency
+
+
+# ===========================================
+# STEP 2: PDF reports
+# ===========================================
+# PDF layout (A4, same margins as the original SimpleDocTemplate report)
+PDF_MARGINS = {'left': 72, 'right': 72, 'top': 72, 'bottom': 18}
+PDF_COLUMN_WIDTHS = [1.2*inch, 1*inch, 2.5*inch, 1.5*inch, 1.2*inch]
+PDF_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),  # Amount column right-aligned
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+])
+PDF_HEADER_ROW = ['Date', 'Type', 'Description', 'Category', 'Amount']
+PDF_BODY_FONT = ('Helvetica', 8)  # TableStyle default font, FONTSIZE above
+PDF_CELL_PADDING = 12  # TableStyle default LEFTPADDING + RIGHTPADDING
+
+def _one_line(text, column_width):
+    """Text as a single line that fits its column, shortened with '...' when needed"""
+    text = ' '.join(str(text or '').split())  # line breaks would make the row taller
+    room = column_width - PDF_CELL_PADDING
+    if stringWidth(text, *PDF_BODY_FONT) <= room:
+        return text
+    text = text[:int(room)]  # no glyph is narrower than 1pt at this size
+    while text and stringWidth(text + '...', *PDF_BODY_FONT) > room:
+        text = text[:-1]
+    return text.rstrip() + '...'
+
+def _pdf_row(transaction_date, type, description, category, party, amount, notes):
+    """
+    Format one report row (see report_rows()) for the PDF table.
+    
+    Every row must be exactly one line high: pages are filled with a row
+    count computed from a one-line sample row (generate_pdf_report Step 2).
+    """
+    return [
+        transaction_date.strftime('%Y-%m-%d'),
+        type.title(),
+        _one_line(description, PDF_COLUMN_WIDTHS[2]),
+        _one_line(category, PDF_COLUMN_WIDTHS[3]),
+        format_currency(amount)
+    ]
+
+def _draw_flowable(pdf, flowable, y, width):
+    """Draw a flowable below y, aligned like platypus would; returns the new y"""
+    y -= flowable.getSpaceBefore()
+    flowable_width, height = flowable.wrapOn(pdf, width, y - PDF_MARGINS['bottom'])
+    x = PDF_MARGINS['left']
+    if getattr(flowable, 'hAlign', 'LEFT') == 'CENTER':
+        x += (width - flowable_width) / 2
+    flowable.drawOn(pdf, x, y - height)
+    return y - height - flowable.getSpaceAfter()
+
+def generate_pdf_report(rows, title="Transaction Report", user_filter=None, date_range=None, totals=None):
+    """
+    Generate PDF report from report rows (see app.utils.report_rows()), one page at a time.
+    
+    A single platypus Table holding every row is laid out all at once, which
+    gets slower than linear as rows grow. Instead, rows are consumed from the
+    (streaming) iterator in fixed-size chunks and each chunk is drawn as its
+    own small table, one page each. Layout work per page is constant, so the
+    cost grows linearly with the row count. Output goes to a spooled
+    temporary file.
+    
+    Args:
+        rows: Iterable of (date, type, description, category, party, amount, notes)
+        title, user_filter, date_range: Report heading details
+        totals: get_report_totals() result; if omitted, totals are accumulated
+                from the rows (which then have to be read up front)
+    """
+    buffer = SpooledTemporaryFile(max_size=REPORT_SPOOL_MAX_MEMORY)
+    page_width, page_height = A4
+    frame_width = page_width - PDF_MARGINS['left'] - PDF_MARGINS['right']
+    pdf = canvas.Canvas(buffer, pagesize=A4, pageCompression=1)
+    pdf.setTitle(title)
+    styles = getSampleStyleSheet()
+    
+    if totals is None:
+        rows = list(rows)
+        total_income = sum(Decimal(str(row[5])) for row in rows if row[1] == 'income')
+        total_expense = sum(Decimal(str(row[5])) for row in rows if row[1] == 'expense')
+        totals = {'total_income': total_income, 'total_expense': total_expense,
+                  'net_amount': total_income - total_expense}
+    
+    # Step 1: First page heading - title, report info and summary
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=30,
+        alignment=1  # Center alignment
+    )
+    heading = [Paragraph(title, title_style)]
+    info_style = styles['Normal']
+    if user_filter:
+        heading.append(Paragraph(f"User: {user_filter}", info_style))
+    if date_range:
+        heading.append(Paragraph(f"Period: {date_range}", info_style))
+    heading.append(Paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}", info_style))
+    heading.append(Spacer(1, 20))
+    
+    summary_table = Table([
+        ['Summary', ''],
+        ['Total Income', format_currency(totals['total_income'])],
+        ['Total Expenses', format_currency(totals['total_expense'])],
+        ['Net Amount', format_currency(totals['net_amount'])]
+    ], colWidths=[2*inch, 2*inch])
+    summary_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    heading += [summary_table, Spacer(1, 30)]
+    
+    y = page_height - PDF_MARGINS['top']
+    for flowable in heading:
+        y = _draw_flowable(pdf, flowable, y, frame_width)
+    
+    # Step 2: Measure header and body row heights once to size the page chunks
+    def chunk_table(body):
+        table = Table([PDF_HEADER_ROW] + body, colWidths=PDF_COLUMN_WIDTHS)
+        table.setStyle(PDF_TABLE_STYLE)
+        return table
+    
+    sample = ['0000-00-00', 'Expense', 'X', 'X', '$0.00']
+    header_height = chunk_table([]).wrap(frame_width, page_height)[1]
+    row_height = chunk_table([sample]).wrap(frame_width, page_height)[1] - header_height
+    
+    def rows_that_fit(top):
+        return max(1, int((top - PDF_MARGINS['bottom'] - header_height) // row_height))
+    
+    # Step 3: Stream rows into one fixed-size table per page
+    rows = iter(rows)
+    first_row = next(rows, None)
+    if first_row is not None:
+        y = _draw_flowable(pdf, Paragraph("Transaction Details", styles['Heading2']), y, frame_width)
+        y = _draw_flowable(pdf, Spacer(1, 12), y, frame_width)
+        if rows_that_fit(y) < 3:
+            # Not enough room under the summary - start the details on a fresh page
+            pdf.showPage()
+            y = page_height - PDF_MARGINS['top']
+        
+        pending = [_pdf_row(*first_row)]
+        for row in rows:
+            if len(pending) == rows_that_fit(y):
+                y = _draw_flowable(pdf, chunk_table(pending), y, frame_width)
+                pdf.showPage()
+                y = page_height - PDF_MARGINS['top']
+                pending = []
+            pending.append(_pdf_row(*row))
+        _draw_flowable(pdf, chunk_table(pending), y, frame_width)
+    
+    # Build PDF
+    pdf.showPage()
+    pdf.save()
+    buffer.seek(0)
+    return buffer
+
+
+# ===========================================
+# STEP 3: Excel reports
+# ===========================================
+def generate_excel_report(rows, title="Transaction Report", totals=None, column_widths=None):
+    """
+    Generate Excel report from report rows (see app.utils.report_rows()) in streaming mode.
+    
+    Uses a write-only workbook, so rows go straight to the output file instead
+    of being held as cell objects, and writes into a spooled temporary file
+    that moves to disk once it grows large.
+    
+    Args:
+        rows: Iterable of (date, type, description, category, party, amount, notes)
+        title: Report title
+        totals: get_report_totals() result; if omitted, totals are accumulated
+                while the rows are written
+        column_widths: Widths per column (see app.utils.report_column_widths())
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Transactions")
+    
+    # Column widths must be set before any row is written
+    for col, width in enumerate(column_widths or [], 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+    
+    # Title
+    title_cell = WriteOnlyCell(ws, value=title)
+    title_cell.font = Font(size=16, bold=True)
+    ws.append([title_cell])
+    ws.append([])
+    
+    # Headers
+    header_row = []
+    for header, _ in EXCEL_REPORT_COLUMNS:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = Font(bold=True)
+        cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+        cell.alignment = Alignment(horizontal="center")
+        header_row.append(cell)
+    ws.append(header_row)
+    
+    # Data
+    running = {'income': Decimal('0'), 'expense': Decimal('0')}
+    for transaction_date, type, description, category, party, amount, notes in rows:
+        ws.append([
+            transaction_date.strftime('%Y-%m-%d'),
+            type.title(),
+            description,
+            category,
+            party or '',
+            float(amount),
+            notes or ''
+        ])
+        if totals is None:
+            running[type] = running.get(type, Decimal('0')) + Decimal(str(amount))
+    
+    # Summary sheet
+    summary_ws = wb.create_sheet("Summary")
+    heading = WriteOnlyCell(summary_ws, value="Financial Summary")
+    heading.font = Font(size=14, bold=True)
+    summary_ws.append([heading])
+    summary_ws.append([])
+    
+    if totals:
+        total_income, total_expense, net_amount = totals['total_income'], totals['total_expense'], totals['net_amount']
+    else:
+        total_income, total_expense = running['income'], running['expense']
+        net_amount = total_income - total_expense
+    
+    summary_data = [
+        ['Total Income', float(total_income)],
+        ['Total Expenses', float(total_expense)],
+        ['Net Amount', float(net_amount)]
+    ]
+    
+    for label, value in summary_data:
+        label_cell = WriteOnlyCell(summary_ws, value=label)
+        label_cell.font = Font(bold=True)
+        summary_ws.append([label_cell, value])
+    
+    buffer = SpooledTemporaryFile(max_size=REPORT_SPOOL_MAX_MEMORY)
+    wb.save(buffer)
+    buffer.seek(0)
+    return buffer
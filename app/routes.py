@@ -21,18 +21,30 @@ Flask routes = Django views (both are Controllers in MVC)
 import os
 from datetime import datetime, date, timedelta
 from decimal import Decimal
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, session, abort, send_from_directory, current_app
+from flask import (Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, session, abort,
+                   send_from_directory, current_app, Response, stream_with_context)
 from flask_login import login_user, login_required, logout_user, current_user
 from werkzeug.security import check_password_hash, generate_password_hash
-from sqlalchemy import or_, and_, func, desc
+from sqlalchemy import and_, func, desc
+from sqlalchemy.orm import selectinload
 from app import db  # Database instance
-from app.models import User, Role, Transaction, Category, Tag, Receipt, SpendingLimit, AuditLog, transaction_tags  # MODEL layer
+from app.models import (User, Role, Permission, Transaction, Category, Tag, Receipt, SpendingLimit, AuditLog,
+                        transaction_tags, evaluate_spending_limits)  # MODEL layer
 from app.forms import (LoginForm, RegistrationForm, TransactionForm, CategoryForm, SpendingLimitForm, 
-                  ReportForm, SearchForm, ProfileForm, ChangePasswordForm, UserForm)  # Form validation
+                  ReportForm, SearchForm, ProfileForm, ChangePasswordForm, UserForm, RestoreForm, RoleForm)  # Form validation
 from app.utils import (save_uploaded_file, delete_file, format_currency, parse_tags, 
-                  generate_pdf_report, generate_excel_report, log_audit_action, 
-                  get_dashboard_stats, backup_database)  # Helper functions
-from io import BytesIO
+                  log_audit_action, get_dashboard_stats, report_params, render_report,
+                  stream_backup)  # Helper functions
+from app.pagination import keyset_paginate
+from app.audit import audit_log_page, audit_log_to_dict
+from app.db_pool import pool_status
+from app.replica import read_replica
+from app.backups import (create_sqlite_snapshot, sqlite_database_path, restore_backups,
+                         BackupChainError, BackupFormatError)
+from app.search import apply_search, search_transactions
+from app.report_jobs import (submit_report_job, get_job, list_jobs, can_access_job,
+                             job_result_path, job_to_dict, DONE)
+from tempfile import TemporaryFile, TemporaryDirectory
 
 # ===========================================
 # STEP 2: Create Blueprint (Organize Routes)
@@ -53,6 +65,7 @@ def utility_processor():
         len=len,
         str=str,
         int=int,
+        min=min,
         enumerate=enumerate
     )
 
@@ -169,6 +182,7 @@ def logout():
 # Demonstrates MVC: Controller → Model → View
 @main.route('/dashboard')
 @login_required
+@read_replica
 def dashboard():
     """
     Main dashboard route - Read operation example
@@ -189,16 +203,10 @@ def dashboard():
     # Step 7b: Controller business logic - get spending limit alerts
     spending_alerts = []
     if current_user.has_permission('read'):
-        # Step 7c: Access MODEL relationship (User.spending_limits)
-        for limit in current_user.spending_limits:
-            # Step 7d: Call MODEL method (is_exceeded) - business logic in Model
-            if limit.is_active and limit.is_exceeded():
-                # Step 7e: Controller processes data
-                spending_alerts.append({
-                    'limit': limit,
-                    'spent': limit.get_spent_amount(),  # MODEL method call
-                    'percentage': (limit.get_spent_amount() / limit.amount) * 100
-                })
+        # Step 7c: Evaluate all active limits in one grouped query (MODEL layer)
+        # Step 7d: Controller keeps only the exceeded ones
+        spending_alerts = [status for status in evaluate_spending_limits(current_user.id)
+                           if status['exceeded']]
     
     # Step 7f: Controller passes data to VIEW (template)
     # Template receives: stats, spending_alerts
@@ -210,6 +218,7 @@ def dashboard():
 # Demonstrates complex querying and filtering
 @main.route('/transactions')
 @login_required
+@read_replica
 def transactions():
     """
     List transactions route - Complex read operation
@@ -228,8 +237,13 @@ def transactions():
         abort(403)
     
     # Step 8b: Controller - get pagination parameters from request
+    # Keyset mode is used when a cursor is supplied, when asked for explicitly,
+    # or when the app is configured to use it by default
     page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     per_page = 20
+    pagination_mode = request.args.get('paginate', current_app.config['TRANSACTIONS_PAGINATION'])
+    use_keyset = bool(cursor) or pagination_mode == 'keyset'
     
     # Step 8c: Query MODEL layer - start with base query
     query = Transaction.query
@@ -243,14 +257,9 @@ def transactions():
     if request.method == 'GET' and request.args:
         search_form.process(request.args)
         
-        # Step 8f: Controller - apply search filter (business logic)
+        # Step 8f: Controller - apply search filter (full-text index, prefix match)
         if search_form.search_term.data:
-            search_term = f"%{search_form.search_term.data}%"
-            query = query.filter(or_(
-                Transaction.description.ilike(search_term),
-                Transaction.notes.ilike(search_term),
-                Transaction.party.ilike(search_term)
-            ))
+            query = apply_search(query, search_form.search_term.data)
         
         # Step 8g: Controller - apply category filter
         if search_form.category_id.data and search_form.category_id.data != 0:
@@ -267,18 +276,31 @@ def transactions():
         if search_form.end_date.data:
             query = query.filter(Transaction.transaction_date <= search_form.end_date.data)
     
-    # Step 8j: Controller - order results (business logic)
-    query = query.order_by(desc(Transaction.transaction_date), desc(Transaction.created_at))
+    # Step 8j: Controller - keep the active filters for pagination links
+    filter_args = {key: value for key, value in request.args.items()
+                   if key not in ('page', 'cursor', 'paginate')}
     
     # Step 8k: Controller - paginate results
-    transactions_page = query.paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    # Both modes sort on (transaction_date, created_at, id) newest first;
+    # id breaks ties so the keyset is unique
+    sort_columns = (Transaction.transaction_date, Transaction.created_at, Transaction.id)
+    if use_keyset:
+        transactions_page = keyset_paginate(
+            query, sort_columns,
+            key_func=lambda t: (t.transaction_date, t.created_at, t.id),
+            cursor=cursor, per_page=per_page
+        )
+    else:
+        query = query.order_by(*[desc(column) for column in sort_columns])
+        transactions_page = query.paginate(
+            page=page, per_page=per_page, error_out=False
+        )
     
     # Step 8l: Controller passes data to VIEW (template)
     return render_template('transactions.html', 
                          transactions=transactions_page.items,
                          pagination=transactions_page,
+                         filter_args=filter_args,
                          search_form=search_form)
 
 # ===========================================
@@ -359,15 +381,23 @@ def add_transaction():
                 receipt.transaction_id = transaction.id
                 db.session.add(receipt)
         
-        # Step 9m: Controller - commit all changes to database
-        db.session.commit()
-        
-        # Step 9n: Query MODEL layer - log audit action
+        # Step 9m: Query MODEL layer - log audit action (written by the commit below)
         log_audit_action(current_user.id, 'create_transaction', 'transactions', transaction.id)
         
+        # Step 9n: Controller - commit all changes to database
+        db.session.commit()
+        
         # Step 9o: Controller - show success message
         flash('Transaction added successfully.', 'success')
         
+        # Step 9o-2: Controller - inline spending-limit check (running counters, no SUM scans)
+        if transaction.type == 'expense':
+            for status in evaluate_spending_limits(current_user.id):
+                limit = status['limit']
+                if status['exceeded'] and limit.category_id in (None, transaction.category_id):
+                    flash(f"{limit.type.title()} spending limit exceeded: "
+                          f"{format_currency(status['spent'])} of {format_currency(limit.amount)}.", 'warning')
+        
         # Step 9p: Controller - redirect to list view
         return redirect(url_for('main.transactions'))
     
@@ -466,12 +496,12 @@ def edit_transaction(id):
             'category_id': transaction.category_id
         }
         
-        # Step 10l: Controller - commit changes to database
-        db.session.commit()
-        
-        # Step 10m: Query MODEL layer - log audit action
+        # Step 10l: Query MODEL layer - log audit action (written by the commit below)
         log_audit_action(current_user.id, 'update_transaction', 'transactions', transaction.id, old_values, new_values)
         
+        # Step 10m: Controller - commit changes to database
+        db.session.commit()
+        
         # Step 10n: Controller - show success message
         flash('Transaction updated successfully.', 'success')
         
@@ -496,8 +526,8 @@ def delete_transaction(id):
     Step 11c: Controller checks permissions
     Step 11d: Controller deletes related MODEL instances (Receipts)
     Step 11e: Controller deletes MODEL instance
-    Step 11f: Controller commits to database
-    Step 11g: Controller queries MODEL (log_audit_action)
+    Step 11f: Controller queries MODEL (log_audit_action)
+    Step 11g: Controller commits to database (deletion and audit record together)
     Step 11h: Controller redirects to list view
     """
     # Step 11a: Query MODEL layer - get transaction by ID
@@ -516,12 +546,12 @@ def delete_transaction(id):
     # Step 11d: Controller - delete MODEL instance
     db.session.delete(transaction)
     
-    # Step 11e: Controller - commit deletion to database
-    db.session.commit()
-    
-    # Step 11f: Query MODEL layer - log audit action
+    # Step 11e: Query MODEL layer - log audit action
     log_audit_action(current_user.id, 'delete_transaction', 'transactions', id)
     
+    # Step 11f: Controller - commit deletion to database
+    db.session.commit()
+    
     # Step 11g: Controller - show success message
     flash('Transaction deleted successfully.', 'success')
     
@@ -533,6 +563,7 @@ def delete_transaction(id):
 # ===========================================
 @main.route('/reports', methods=['GET', 'POST'])
 @login_required
+@read_replica
 def reports():
     """
     Generate reports route - Complex read operation
@@ -542,7 +573,7 @@ def reports():
     Step 12b: Controller validates form data
     Step 12c: Controller queries MODEL (Transaction.query) with filters
     Step 12d: Controller processes data (business logic)
-    Step 12e: Controller generates report (PDF/Excel)
+    Step 12e: Controller generates report (PDF/Excel), or queues a background job
     Step 12f: Controller returns file to user
     """
     # Step 12a: Controller - check permissions
@@ -554,58 +585,60 @@ def reports():
     
     # Step 12c: Handle form submission
     if form.validate_on_submit():
-        # Step 12d: Query MODEL layer - start with base query
-        query = Transaction.query
-        
-        # Step 12e: Controller business logic - apply user filter
-        if form.user_id.data and form.user_id.data != 0:
-            if current_user.has_permission('manage_users'):
-                query = query.filter(Transaction.user_id == form.user_id.data)
-            else:
-                query = query.filter(Transaction.user_id == current_user.id)
-        elif not current_user.has_permission('manage_users'):
-            query = query.filter(Transaction.user_id == current_user.id)
-        
-        # Step 12f: Controller - apply date range filter
-        query = query.filter(
-            Transaction.transaction_date >= form.start_date.data,
-            Transaction.transaction_date <= form.end_date.data
-        )
+        # Step 12d: Controller business logic - resolve filters (users only see their own data)
+        params = report_params(form, current_user)
+        
+        # Step 12e: Large reports can be rendered by the background worker pool
+        # The page then polls the job and offers the file once it is ready
+        if form.background.data:
+            submit_report_job(params, current_user)
+            flash('Your report is being generated. It will appear under Recent Report Activity when ready.', 'info')
+            return redirect(url_for('main.reports'))
+        
+        # Step 12f: Query MODEL layer and generate the PDF or Excel file in this request
+        buffer, download_name, mimetype = render_report(params)
         
-        # Step 12g: Controller - apply category filter
-        if form.category_id.data and form.category_id.data != 0:
-            query = query.filter(Transaction.category_id == form.category_id.data)
-        
-        # Step 12h: Controller - apply type filter
-        if form.type.data:
-            query = query.filter(Transaction.type == form.type.data)
-        
-        # Step 12i: Controller - get all matching transactions
-        transactions = query.order_by(Transaction.transaction_date.desc()).all()
-        
-        # Step 12j: Controller - generate report title
-        title = f"Financial Report - {form.start_date.data} to {form.end_date.data}"
-        
-        # Step 12k: Controller business logic - generate PDF or Excel
-        if form.format.data == 'pdf':
-            buffer = generate_pdf_report(transactions, title)
-            return send_file(
-                buffer,
-                as_attachment=True,
-                download_name=f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                mimetype='application/pdf'
-            )
-        else:  # Excel
-            buffer = generate_excel_report(transactions, title)
-            return send_file(
-                buffer,
-                as_attachment=True,
-                download_name=f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-    
-    # Step 12l: Render VIEW (template) - display report form
-    return render_template('reports.html', form=form)
+        # Step 12g: Controller returns file to user
+        return send_file(buffer, as_attachment=True, download_name=download_name, mimetype=mimetype)
+    
+    # Step 12h: Render VIEW (template) - display report form and recent background jobs
+    jobs = [job_to_dict(job) for job in list_jobs(current_user)]
+    return render_template('reports.html', form=form, jobs=jobs)
+
+@main.route('/reports/jobs', methods=['POST'])
+@login_required
+def create_report_job():
+    """Queue a background report (JSON API); identical in-flight requests share one job"""
+    if not current_user.has_permission('reports'):
+        abort(403)
+    
+    form = ReportForm()
+    if not form.validate_on_submit():
+        return jsonify({'errors': form.errors}), 400
+    
+    job = submit_report_job(report_params(form, current_user), current_user)
+    return jsonify(job_to_dict(job)), 202
+
+@main.route('/reports/jobs/<job_id>')
+@login_required
+def report_job_status(job_id):
+    """Poll the status of a background report job"""
+    job = get_job(job_id)
+    if not job or not current_user.has_permission('reports') or not can_access_job(job, current_user):
+        abort(404)
+    return jsonify(job_to_dict(job))
+
+@main.route('/reports/jobs/<job_id>/download')
+@login_required
+def report_job_download(job_id):
+    """Download the result of a finished background report job"""
+    job = get_job(job_id)
+    if not job or not current_user.has_permission('reports') or not can_access_job(job, current_user):
+        abort(404)
+    if job['status'] != DONE or not os.path.exists(job_result_path(job)):
+        abort(404)
+    return send_file(job_result_path(job), as_attachment=True,
+                     download_name=job['download_name'], mimetype=job['mimetype'])
 
 # ===========================================
 # STEP 13: Additional Routes (Users, Profile, Settings, etc.)
@@ -621,8 +654,10 @@ def users():
     
     # Query MODEL layer
     users = User.query.order_by(User.username).all()
+    roles = Role.query.options(selectinload(Role.permissions)).order_by(Role.id).all()
+    permissions = Permission.query.order_by(Permission.bit).all()
     # Render VIEW
-    return render_template('users.html', users=users)
+    return render_template('users.html', users=users, roles=roles, permissions=permissions)
 
 @main.route('/register', methods=['GET', 'POST'])
 @login_required
@@ -646,10 +681,11 @@ def register():
         
         # Save MODEL to database
         db.session.add(user)
-        db.session.commit()
+        db.session.flush()  # Assigns user.id for the audit record
         
-        # Log audit action
+        # Log audit action, then commit both
         log_audit_action(current_user.id, 'create_user', 'users', user.id)
+        db.session.commit()
         flash(f'User {user.username} has been registered successfully.', 'success')
         return redirect(url_for('main.users'))
     
@@ -694,8 +730,8 @@ def edit_user(id):
         }
         
         # Commit changes
-        db.session.commit()
         log_audit_action(current_user.id, 'update_user', 'users', user.id, old_values, new_values)
+        db.session.commit()
         
         flash('User updated successfully.', 'success')
         return redirect(url_for('main.users'))
@@ -719,12 +755,88 @@ def delete_user(id):
     
     # Update MODEL (deactivate instead of delete)
     user.is_active = False
+    log_audit_action(current_user.id, 'deactivate_user', 'users', user.id)
     db.session.commit()
     
-    log_audit_action(current_user.id, 'deactivate_user', 'users', user.id)
     flash('User deactivated successfully.', 'success')
     return redirect(url_for('main.users'))
 
+@main.route('/roles')
+@login_required
+def roles():
+    """Roles and their permissions - admin only"""
+    if not current_user.has_permission('manage_users'):
+        abort(403)
+    
+    # Query MODEL layer
+    roles = Role.query.options(selectinload(Role.permissions)).order_by(Role.id).all()
+    role_forms = [(role, RoleForm(role=role, obj=role, prefix=f'role-{role.id}',
+                                  data={'permissions': [permission.id for permission in role.permissions]}))
+                  for role in roles]
+    # Render VIEW
+    return render_template('roles.html', role_forms=role_forms, new_role_form=RoleForm(prefix='new'))
+
+@main.route('/roles/add', methods=['POST'])
+@login_required
+def add_role():
+    """Create a role - admin only"""
+    if not current_user.has_permission('manage_users'):
+        abort(403)
+    
+    form = RoleForm(prefix='new')
+    if form.validate_on_submit():
+        # Create MODEL instance
+        role = Role()
+        role.name = form.name.data
+        role.description = form.description.data
+        role.permissions = Permission.query.filter(Permission.id.in_(form.permissions.data)).all()
+        
+        db.session.add(role)
+        db.session.flush()  # Assigns role.id for the audit record
+        log_audit_action(current_user.id, 'create_role', 'roles', role.id,
+                         new_values={'permissions': [permission.name for permission in role.permissions]})
+        db.session.commit()
+        flash(f'Role {role.name} created.', 'success')
+    else:
+        for errors in form.errors.values():
+            flash(errors[0], 'error')
+    
+    return redirect(url_for('main.roles'))
+
+@main.route('/roles/<int:id>/edit', methods=['POST'])
+@login_required
+def edit_role(id):
+    """Change a role's name, description and permissions - admin only"""
+    if not current_user.has_permission('manage_users'):
+        abort(403)
+    
+    role = Role.query.get_or_404(id)
+    form = RoleForm(role=role, prefix=f'role-{role.id}')
+    if form.validate_on_submit():
+        permissions = Permission.query.filter(Permission.id.in_(form.permissions.data)).all()
+        
+        # Controller business logic - an admin cannot lock themselves out of this page
+        if role.id == current_user.role_id and 'manage_users' not in {permission.name for permission in permissions}:
+            flash('You cannot remove user management from your own role.', 'error')
+            return redirect(url_for('main.roles'))
+        
+        old_values = {'name': role.name, 'permissions': [permission.name for permission in role.permissions]}
+        
+        # Update MODEL attributes
+        role.name = form.name.data
+        role.description = form.description.data
+        role.permissions = permissions
+        
+        new_values = {'name': role.name, 'permissions': [permission.name for permission in permissions]}
+        log_audit_action(current_user.id, 'update_role', 'roles', role.id, old_values, new_values)
+        db.session.commit()
+        flash(f'Role {role.name} updated.', 'success')
+    else:
+        for errors in form.errors.values():
+            flash(errors[0], 'error')
+    
+    return redirect(url_for('main.roles'))
+
 @main.route('/profile', methods=['GET', 'POST'])
 @login_required
 def profile():
@@ -739,8 +851,8 @@ def profile():
         current_user.phone = form.phone.data
         
         # Commit changes
-        db.session.commit()
         log_audit_action(current_user.id, 'update_profile')
+        db.session.commit()
         
         flash('Profile updated successfully.', 'success')
         return redirect(url_for('main.profile'))
@@ -758,9 +870,9 @@ def change_password():
         if check_password_hash(current_user.password_hash, form.current_password.data):
             # Update MODEL attribute
             current_user.password_hash = generate_password_hash(form.new_password.data)
+            log_audit_action(current_user.id, 'change_password')
             db.session.commit()
             
-            log_audit_action(current_user.id, 'change_password')
             flash('Password changed successfully.', 'success')
             return redirect(url_for('main.profile'))
         else:
@@ -775,9 +887,13 @@ def settings():
     # Query MODEL layer
     categories = Category.query.order_by(Category.name).all()
     spending_limits = SpendingLimit.query.filter_by(user_id=current_user.id).all()
+    limit_statuses = {status['limit'].id: status
+                      for status in evaluate_spending_limits(current_user.id, spending_limits)}
     
     # Render VIEW
-    return render_template('settings.html', categories=categories, spending_limits=spending_limits)
+    return render_template('settings.html', categories=categories, spending_limits=spending_limits,
+                           limit_statuses=limit_statuses, snapshot_available=sqlite_database_path() is not None,
+                           restore_form=RestoreForm())
 
 @main.route('/categories/add', methods=['POST'])
 @login_required
@@ -796,9 +912,10 @@ def add_category():
         
         # Save to database
         db.session.add(category)
+        db.session.flush()  # Assigns category.id for the audit record
+        log_audit_action(current_user.id, 'create_category', 'categories', category.id)
         db.session.commit()
         
-        log_audit_action(current_user.id, 'create_category', 'categories', category.id)
         flash('Category added successfully.', 'success')
     
     return redirect(url_for('main.settings'))
@@ -821,9 +938,10 @@ def add_spending_limit():
         
         # Save to database
         db.session.add(spending_limit)
+        db.session.flush()  # Assigns spending_limit.id for the audit record
+        log_audit_action(current_user.id, 'create_spending_limit', 'spending_limits', spending_limit.id)
         db.session.commit()
         
-        log_audit_action(current_user.id, 'create_spending_limit', 'spending_limits', spending_limit.id)
         flash('Spending limit added successfully.', 'success')
     
     return redirect(url_for('main.settings'))
@@ -831,21 +949,91 @@ def add_spending_limit():
 @main.route('/backup')
 @login_required
 def backup():
-    """Download database backup - admin only"""
+    """
+    Download database backup - admin only
+    
+    The backup is streamed while it is read from the database, so memory
+    stays flat regardless of database size. ?gzip=1 compresses it on the fly.
+    ?mode=incremental only includes changes since the previous backup
+    (restore with `flask restore-backup FULL INCREMENTAL...`).
+    ?mode=snapshot (SQLite only) downloads a zip with a native copy of the
+    database file; add &receipts=1 to include the receipt files.
+    """
     if not current_user.has_permission('backup'):
         abort(403)
     
-    # Query MODEL layer - get all data
-    backup_data = backup_database()
-    buffer = BytesIO(backup_data.encode('utf-8'))
+    # SQLite snapshot: pages are copied by SQLite itself, no rows are read
+    if request.args.get('mode') == 'snapshot':
+        if sqlite_database_path() is None:
+            flash('Snapshot backups are only available for SQLite databases.', 'error')
+            return redirect(url_for('main.settings'))
+        archive = TemporaryFile()
+        create_sqlite_snapshot(archive, include_receipts=request.args.get('receipts', type=int) == 1)
+        archive.seek(0)
+        return send_file(
+            archive,
+            as_attachment=True,
+            download_name=f"cashbook_snapshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+            mimetype='application/zip'
+        )
     
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name=f"cashbook_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-        mimetype='application/json'
+    # Query MODEL layer - rows are fetched in chunks as the response is sent
+    compress = request.args.get('gzip', type=int) == 1
+    incremental = request.args.get('mode') == 'incremental'
+    filename = f"cashbook_backup_{'incremental_' if incremental else ''}{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    if compress:
+        filename += '.gz'
+    
+    return Response(
+        stream_with_context(stream_backup(compress=compress, incremental=incremental)),
+        mimetype='application/gzip' if compress else 'application/json',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
     )
 
+@main.route('/backup/restore', methods=['POST'])
+@login_required
+def restore_backup():
+    """
+    Restore uploaded backups - admin only
+    
+    Takes a full backup optionally followed by its incremental backups
+    (oldest first), plain or gzip. Files are saved to a temporary directory
+    and streamed into the database in bulk (see app/backups.py).
+    """
+    if not current_user.has_permission('backup'):
+        abort(403)
+    
+    # Backups are larger than the receipt upload limit; raise it before the body is parsed
+    request.max_content_length = current_app.config['RESTORE_MAX_CONTENT_LENGTH']
+    form = RestoreForm()
+    if not form.validate_on_submit():
+        flash('Please choose the backup file(s) to restore.', 'error')
+        return redirect(url_for('main.settings'))
+    
+    user_id = current_user.id
+    db.session.commit()  # The restore writes on its own connection
+    with TemporaryDirectory() as folder:
+        paths = []
+        for number, upload in enumerate(form.backups.data):
+            path = os.path.join(folder, f'{number:03d}.json')
+            upload.save(path)
+            paths.append(path)
+        
+        try:
+            results = restore_backups(paths)
+        except (BackupChainError, BackupFormatError) as e:
+            flash(f'Restore failed: {e}', 'error')
+            return redirect(url_for('main.settings'))
+    
+    totals = {}
+    for _, counts in results:
+        for section, count in counts.items():
+            totals[section] = totals.get(section, 0) + count
+    log_audit_action(user_id, 'restore_backup', new_values=totals)
+    summary = ', '.join(f"{count} {section.replace('_', ' ')}" for section, count in totals.items() if count)
+    flash(f"Restored {len(results)} backup(s): {summary or 'no changes'}.", 'success')
+    return redirect(url_for('main.settings'))
+
 @main.route('/uploads/<filename>')
 @login_required
 def uploaded_file(filename):
@@ -871,9 +1059,9 @@ def delete_receipt(receipt_id):
     
     # Delete MODEL instance
     db.session.delete(receipt)
+    log_audit_action(current_user.id, 'delete_receipt', 'receipts', receipt_id)
     db.session.commit()
     
-    log_audit_action(current_user.id, 'delete_receipt', 'receipts', receipt_id)
     flash('Receipt deleted successfully.', 'success')
     return redirect(url_for('main.edit_transaction', id=transaction.id))
 
@@ -884,15 +1072,17 @@ def delete_receipt(receipt_id):
 
 @main.route('/api/dashboard-stats')
 @login_required
+@read_replica
 def api_dashboard_stats():
     """Get dashboard statistics - API endpoint"""
     # Query MODEL layer
     stats = get_dashboard_stats(current_user)
     # Return JSON (no VIEW template)
-    return jsonify(stats)
+    return jsonify(stats.to_dict())
 
 @main.route('/api/spending-check/<int:category_id>')
 @login_required
+@read_replica
 def api_spending_check(category_id):
     """Check spending limits for category - API endpoint"""
     # Query MODEL layer
@@ -902,20 +1092,93 @@ def api_spending_check(category_id):
         is_active=True
     ).all()
     
-    # Controller business logic - process data
+    # Controller business logic - process data (one grouped query for all limits)
     alerts = []
-    for limit in limits:
-        spent = limit.get_spent_amount()  # MODEL method call
-        if spent > limit.amount * 0.8:  # 80% threshold
+    for status in evaluate_spending_limits(current_user.id, limits):
+        limit, spent = status['limit'], status['spent']
+        if spent > limit.amount * Decimal('0.8'):  # 80% threshold
             alerts.append({
                 'type': limit.type,
                 'limit': float(limit.amount),
                 'spent': float(spent),
-                'percentage': (spent / limit.amount) * 100,
-                'exceeded': spent > limit.amount
+                'percentage': float(status['percentage']),
+                'exceeded': status['exceeded']
             })
     
     # Return JSON (no VIEW template)
     return jsonify(alerts)
 
+@main.route('/api/transactions/search')
+@login_required
+@read_replica
+def api_search_transactions():
+    """Ranked full-text search over transactions - API endpoint"""
+    if not current_user.has_permission('read'):
+        abort(403)
+    
+    term = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    
+    # Controller business logic - non-admins only search their own transactions
+    user_id = None if current_user.has_permission('manage_users') else current_user.id
+    results = search_transactions(term, user_id=user_id, limit=limit)
+    
+    # Return JSON (no VIEW template)
+    return jsonify([{
+        'id': transaction.id,
+        'type': transaction.type,
+        'amount': float(transaction.amount),
+        'description': transaction.description,
+        'party': transaction.party,
+        'transaction_date': transaction.transaction_date.isoformat(),
+        'category_id': transaction.category_id
+    } for transaction in results])
+
+@main.route('/api/pool-stats')
+@login_required
+def api_pool_stats():
+    """
+    Database connection pool statistics of the answering process - admin only
+
+    Counters cover this worker since it started (app/db_pool.py); repeated
+    calls may reach different gunicorn workers, each with its own pool.
+    """
+    if not current_user.has_permission('manage_users'):
+        abort(403)
+    
+    return jsonify(pool_status())
+
+@main.route('/api/audit-logs')
+@login_required
+@read_replica
+def api_audit_logs():
+    """
+    Audit log, newest first - admin only API endpoint
+    
+    Filters: user_id, action, since/until (ISO date or datetime). Pages are
+    keyset-based: pass the returned next_cursor as ?cursor= for the next page.
+    Months past the retention period live in archive files (app/audit.py).
+    """
+    if not current_user.has_permission('manage_users'):
+        abort(403)
+    
+    try:
+        since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else None
+        until = datetime.fromisoformat(request.args['until']) if request.args.get('until') else None
+    except ValueError:
+        return jsonify({'error': 'since/until must be ISO dates'}), 400
+    per_page = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    
+    # Query MODEL layer - one index range scan per page
+    page = audit_log_page(cursor=request.args.get('cursor'), per_page=per_page,
+                          user_id=request.args.get('user_id', type=int),
+                          action=request.args.get('action'), since=since, until=until)
+    
+    # Return JSON (no VIEW template)
+    return jsonify({
+        'items': [audit_log_to_dict(log) for log in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    })
+
 # Error handlers are registered in app/__init__.py
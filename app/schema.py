@@ -0,0 +1,290 @@
+"""
+===========================================
+SCHEMA MAINTENANCE - MIGRATIONS & QUERY PLANS
+===========================================
+db.create_all() only creates tables that do not exist yet, so new columns and
+indexes added to app/models.py never reach an existing SQLite or PostgreSQL
+database.
+This module upgrades existing databases in place and verifies that the hot
+queries actually use those indexes.
+
+USAGE:
+- upgrade_schema() runs on startup after db.create_all(); it also sets up
+  the full-text search index (app/search.py) and backfills the monthly
+  transaction rollups
+- `flask upgrade-db` runs it by hand
+- init_database() does all of that plus seeding the default data, then
+  stores schema_fingerprint() as the 'schema_version' system setting;
+  `flask init-db` runs it. With CASHBOOK_STARTUP=fast, create_app() only
+  compares that stamp with the models and skips the rest when it matches
+- `flask check-query-plans` prints the plan of every hot query and exits
+  non-zero if one of them falls back to a full table scan
+"""
+
+# ===========================================
+# STEP 1: Import required libraries
+# ===========================================
+import hashlib
+import logging
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+
+
+# ===========================================
+# STEP 2: In-place schema upgrade
+# ===========================================
+def upgrade_schema():
+    """Add any column or index defined on the models that is missing from the database"""
+    inspector = db.inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        # New nullable columns can be added in place on SQLite and PostgreSQL
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                with db.engine.begin() as connection:
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                created.append(f'{table.name}.{column.name}')
+        
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                created.append(index.name)
+    if created:
+        logging.info(f"Added missing columns/indexes: {', '.join(created)}")
+    
+    # Full-text index lives outside the models (FTS5 table / tsvector column)
+    from app.search import ensure_fulltext_index
+    ensure_fulltext_index()
+    
+    # Backfill the monthly rollup table the first time it appears
+    from app.models import Transaction, TransactionRollup
+    if not db.session.query(TransactionRollup.id).first() and db.session.query(Transaction.id).first():
+        logging.info("Building monthly transaction rollups")
+        TransactionRollup.rebuild()
+    return created
+
+
+# ===========================================
+# STEP 2b: Default data and the schema version stamp
+# ===========================================
+SCHEMA_VERSION_KEY = 'schema_version'
+
+
+def seed_defaults():
+    """Create the default roles, permissions, admin user and categories if missing"""
+    # Step 2b-1: Seed database with initial data (Roles)
+    from app.models import User, Role
+    from werkzeug.security import generate_password_hash
+
+    # Step 2b-2: Create default roles if none exist
+    if not Role.query.first():
+        admin_role = Role()
+        admin_role.name = 'Admin'
+        admin_role.description = 'Full system access'
+
+        manager_role = Role()
+        manager_role.name = 'Manager'
+        manager_role.description = 'Add/view transactions, manage expenses, generate reports'
+
+        viewer_role = Role()
+        viewer_role.name = 'Viewer'
+        viewer_role.description = 'Read-only access to data and reports'
+
+        db.session.add(admin_role)
+        db.session.add(manager_role)
+        db.session.add(viewer_role)
+        db.session.commit()
+
+    # Step 2b-3: Create the permissions and give the default roles theirs
+    from app.permissions import seed_permissions
+    seed_permissions()
+
+    # Step 2b-4: Create default admin user if none exists
+    if not User.query.filter_by(username='admin').first():
+        admin_role = Role.query.filter_by(name='Admin').first()
+        admin_user = User()
+        admin_user.username = 'admin'
+        admin_user.email = 'admin@cashbook.com'
+        admin_user.password_hash = generate_password_hash('admin123')
+        admin_user.role_id = admin_role.id
+        admin_user.is_active = True
+        db.session.add(admin_user)
+        db.session.commit()
+        logging.info("Default admin user created: admin/admin123")
+
+    # Step 2b-5: Create default categories if none exist
+    from app.models import Category
+    if not Category.query.first():
+        default_categories = [
+            {'name': 'Food & Dining', 'color': '#FF6B6B', 'is_system': True},
+            {'name': 'Transportation', 'color': '#4ECDC4', 'is_system': True},
+            {'name': 'Shopping', 'color': '#45B7D1', 'is_system': True},
+            {'name': 'Entertainment', 'color': '#96CEB4', 'is_system': True},
+            {'name': 'Bills & Utilities', 'color': '#FECA57', 'is_system': True},
+            {'name': 'Healthcare', 'color': '#FF9FF3', 'is_system': True},
+            {'name': 'Salary', 'color': '#54A0FF', 'is_system': True},
+            {'name': 'Investment', 'color': '#5F27CD', 'is_system': True},
+            {'name': 'Other', 'color': '#999999', 'is_system': True}
+        ]
+
+        for cat_data in default_categories:
+            category = Category()
+            category.name = cat_data['name']
+            category.color = cat_data['color']
+            category.is_system = cat_data['is_system']
+            db.session.add(category)
+
+        db.session.commit()
+
+
+def schema_fingerprint():
+    """Short hash of every table, column and index on the models plus the seeded permissions"""
+    from app.permissions import DEFAULT_PERMISSIONS
+    parts = []
+    for table in db.metadata.sorted_tables:
+        parts.append(table.name)
+        parts.extend(f'{column.name}:{type(column.type).__name__}:{column.nullable}' for column in table.columns)
+        parts.extend(sorted(f'{index.name}({",".join(column.name for column in index.columns)})'
+                            for index in table.indexes))
+    parts.extend(name for name, _ in DEFAULT_PERMISSIONS)
+    return hashlib.sha256('\n'.join(parts).encode()).hexdigest()[:16]
+
+
+def init_database():
+    """Create and upgrade the schema, seed defaults, then stamp the schema version"""
+    from app.models import SystemSetting
+    db.create_all()
+    created = upgrade_schema()
+    seed_defaults()
+    with db.engine.begin() as connection:
+        SystemSetting.set_value(connection, SCHEMA_VERSION_KEY, schema_fingerprint())
+    return created
+
+
+def schema_is_current():
+    """True when `flask init-db` (or a full startup) already prepared this version of the schema"""
+    from app.models import SystemSetting
+    try:
+        stored = SystemSetting.get_value(SCHEMA_VERSION_KEY)
+    except SQLAlchemyError:
+        # No system_settings table yet: a brand-new database
+        db.session.rollback()
+        return False
+    finally:
+        # Nothing else runs in this session at startup; do not keep its connection checked out
+        db.session.close()
+    return stored == schema_fingerprint()
+
+
+# ===========================================
+# STEP 3: Hot queries (mirrors of the real access paths)
+# ===========================================
+def hot_queries(user_id=1, limit_id=1):
+    """
+    Return (name, statement) pairs shaped like the queries the app runs most.
+
+    Keep these in step with the code they mirror so the plan check stays honest.
+    """
+    from app.models import Transaction, AuditLog, SpendingLimit
+    from app.search import apply_search
+    from app.utils import dashboard_totals_statement
+
+    month_start = date.today().replace(day=1)
+    listing_columns = (Transaction.transaction_date, Transaction.created_at, Transaction.id)
+
+    return [
+        # get_dashboard_stats: the month's totals from the rollup table and the
+        # active-user count (the all-users variant aggregates the whole rollup
+        # table by design: it holds one row per user, month, type and category)
+        ('dashboard_totals', dashboard_totals_statement(user_id)),
+        # get_dashboard_stats: five most recent transactions for one user
+        ('dashboard_recent', select(Transaction.id).where(
+            Transaction.user_id == user_id
+        ).order_by(Transaction.created_at.desc()).limit(5)),
+        # SpendingLimit.refresh_counters: period rollover recompute (the
+        # correlated SUM covers both all-category and per-category limits)
+        ('spending_limit_refresh', SpendingLimit.counter_refresh_statement([limit_id])),
+        # /transactions for a regular user
+        ('transactions_user_listing', select(Transaction.id).where(
+            Transaction.user_id == user_id
+        ).order_by(*[column.desc() for column in listing_columns]).limit(21)),
+        # /transactions search box (full-text index)
+        ('transactions_search', apply_search(
+            Transaction.query.with_entities(Transaction.id).filter(Transaction.user_id == user_id),
+            'coffee').statement),
+        # /transactions for an admin
+        ('transactions_admin_listing', select(Transaction.id).order_by(
+            *[column.desc() for column in listing_columns]).limit(21)),
+        # /reports for one user and a date range
+        ('reports_user_range', select(Transaction.id).where(
+            Transaction.user_id == user_id,
+            Transaction.transaction_date >= month_start,
+            Transaction.transaction_date <= date.today()
+        ).order_by(Transaction.transaction_date.desc())),
+        # Incremental backup: transactions changed since the last backup
+        ('backup_incremental', select(Transaction.id).where(
+            Transaction.updated_at > datetime.utcnow() - timedelta(days=1)
+        ).order_by(Transaction.id + 0)),
+        # /api/audit-logs: newest page, and one user's page past a cursor
+        ('audit_log_page', select(AuditLog.id).order_by(
+            AuditLog.created_at.desc(), AuditLog.id.desc()).limit(51)),
+        ('audit_log_user_page', select(AuditLog.id).where(
+            AuditLog.user_id == user_id,
+            tuple_(AuditLog.created_at, AuditLog.id) < tuple_(datetime.utcnow(), 1000000)
+        ).order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(51)),
+        # Incremental backup: deletions recorded since the last backup
+        ('backup_deleted', select(AuditLog.record_id).where(
+            AuditLog.action.in_(['delete_transaction']),
+            AuditLog.created_at > datetime.utcnow() - timedelta(days=1)
+        ).order_by(AuditLog.id)),
+        # /reports across all users for a date range
+        ('reports_admin_range', select(Transaction.id).where(
+            Transaction.transaction_date >= month_start,
+            Transaction.transaction_date <= date.today()
+        ).order_by(Transaction.transaction_date.desc())),
+    ]
+
+
+# ===========================================
+# STEP 4: Query plan inspection
+# ===========================================
+def explain(statement):
+    """Return the database's query plan for a statement as a list of lines"""
+    engine = db.engine
+    sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True}))
+
+    with engine.connect() as connection:
+        if engine.dialect.name == 'sqlite':
+            rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+            return [row[-1] for row in rows]
+
+        # On small tables PostgreSQL prefers a sequential scan even when an
+        # index is available, so disable it to see whether an index *can* be used
+        with connection.begin():
+            connection.execute(text("SET LOCAL enable_seqscan = off"))
+            rows = connection.execute(text(f"EXPLAIN {sql}")).fetchall()
+        return [row[0] for row in rows]
+
+
+def plan_uses_index(plan_lines):
+    """True if no step of the plan reads a table without an index"""
+    plan = ' '.join(plan_lines)
+    if db.engine.dialect.name == 'sqlite':
+        # "SCAN transactions" without "USING ... INDEX" is a full table scan
+        full_scan = any(line.startswith('SCAN') and 'INDEX' not in line for line in plan_lines)
+        return 'INDEX' in plan and not full_scan
+    return 'Index' in plan and 'Seq Scan' not in plan
+
+
+def check_query_plans():
+    """Explain every hot query; returns a list of (name, uses_index, plan_lines)"""
+    results = []
+    for name, statement in hot_queries():
+        plan_lines = explain(statement)
+        results.append((name, plan_uses_index(plan_lines), plan_lines))
+    return results
@@ -0,0 +1,225 @@
+"""
+===========================================
+FULL-TEXT SEARCH - TRANSACTIONS
+===========================================
+Indexed search over Transaction.description, notes and party.
+
+The original search ran three ILIKE '%term%' predicates joined by OR, which
+no B-tree index can serve, so every search scanned the whole table. This
+module keeps a real full-text index instead:
+
+- SQLite:     an FTS5 external-content table (transactions_fts) kept in sync
+              by AFTER INSERT/UPDATE/DELETE triggers
+- PostgreSQL: a generated tsvector column (search_vector) with a GIN index,
+              maintained by the database itself
+
+Because both are maintained inside the database, every write path (ORM,
+bulk inserts, restores) stays in sync without application hooks.
+
+Search terms are split into words and each word is matched as a prefix, so
+"coff sh" finds "Coffee Shop". Databases without FTS support fall back to
+the original ILIKE search.
+"""
+
+# ===========================================
+# STEP 1: Import required libraries
+# ===========================================
+import logging
+import re
+from sqlalchemy import column, literal_column, or_, select, table, text
+from app import db
+
+# Column weights used for ranking: description, notes, party
+SQLITE_BM25_WEIGHTS = (10.0, 2.0, 5.0)
+
+fts_table = table('transactions_fts', column('rowid'))
+
+# Cache of "is the full-text index available?" per database URL
+_fulltext_available = {}
+
+
+# ===========================================
+# STEP 2: Index setup (called from app/schema.py)
+# ===========================================
+SQLITE_FTS_SETUP = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+        description, notes, party,
+        content='transactions', content_rowid='id', tokenize='unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_fts_ai AFTER INSERT ON transactions BEGIN
+        INSERT INTO transactions_fts(rowid, description, notes, party)
+        VALUES (new.id, new.description, new.notes, new.party);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_fts_ad AFTER DELETE ON transactions BEGIN
+        INSERT INTO transactions_fts(transactions_fts, rowid, description, notes, party)
+        VALUES ('delete', old.id, old.description, old.notes, old.party);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_fts_au AFTER UPDATE OF description, notes, party ON transactions BEGIN
+        INSERT INTO transactions_fts(transactions_fts, rowid, description, notes, party)
+        VALUES ('delete', old.id, old.description, old.notes, old.party);
+        INSERT INTO transactions_fts(rowid, description, notes, party)
+        VALUES (new.id, new.description, new.notes, new.party);
+    END""",
+]
+
+POSTGRES_FTS_SETUP = [
+    """ALTER TABLE transactions ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(description, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(party, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(notes, '')), 'C')
+        ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_transactions_search ON transactions USING GIN (search_vector)",
+]
+
+
+def ensure_fulltext_index():
+    """Create the full-text index (and its sync triggers) if it does not exist"""
+    engine = db.engine
+    try:
+        with engine.begin() as connection:
+            if engine.dialect.name == 'sqlite':
+                is_new = not connection.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'transactions_fts'")).first()
+                for statement in SQLITE_FTS_SETUP:
+                    connection.execute(text(statement))
+                if is_new:
+                    # Index rows that existed before the FTS table was created
+                    connection.execute(text("INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild')"))
+            elif engine.dialect.name == 'postgresql':
+                for statement in POSTGRES_FTS_SETUP:
+                    connection.execute(text(statement))
+            else:
+                _fulltext_available[str(engine.url)] = False
+                return False
+    except Exception as e:
+        logging.warning(f"Full-text index unavailable, using ILIKE search: {str(e)}")
+        _fulltext_available[str(engine.url)] = False
+        return False
+
+    _fulltext_available[str(engine.url)] = True
+    return True
+
+
+def rebuild_fulltext_index():
+    """Re-index every transaction from scratch (SQLite only; PostgreSQL is always current)"""
+    if db.engine.dialect.name == 'sqlite' and fulltext_available():
+        with db.engine.begin() as connection:
+            connection.execute(text("INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild')"))
+
+
+def suspend_fulltext_sync(connection):
+    """
+    SQLite: drop the sync triggers before a bulk load (restores), which is
+    far cheaper than indexing row by row. Returns True if the index exists;
+    resume_fulltext_sync() then re-creates the triggers and re-indexes.
+    """
+    if connection.dialect.name != 'sqlite' or not connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE name = 'transactions_fts'")).first():
+        return False
+    for trigger in ('transactions_fts_ai', 'transactions_fts_ad', 'transactions_fts_au'):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    return True
+
+
+def resume_fulltext_sync(connection):
+    """SQLite: re-create the sync triggers and rebuild the index in one pass"""
+    for statement in SQLITE_FTS_SETUP:
+        connection.execute(text(statement))
+    connection.execute(text("INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild')"))
+
+
+def fulltext_available():
+    """Check (once per process) whether the full-text index exists"""
+    engine = db.engine
+    key = str(engine.url)
+    if key not in _fulltext_available:
+        if engine.dialect.name == 'sqlite':
+            found = "SELECT 1 FROM sqlite_master WHERE name = 'transactions_fts'"
+        elif engine.dialect.name == 'postgresql':
+            found = ("SELECT 1 FROM information_schema.columns "
+                     "WHERE table_name = 'transactions' AND column_name = 'search_vector'")
+        else:
+            found = None
+        with engine.connect() as connection:
+            _fulltext_available[key] = bool(found and connection.execute(text(found)).first())
+    return _fulltext_available[key]
+
+
+# ===========================================
+# STEP 3: Query building
+# ===========================================
+def _search_words(term):
+    """Split a search box value into plain words (drops FTS operators/quotes)"""
+    return re.findall(r'\w+', term or '', flags=re.UNICODE)
+
+
+def _match_expression(words):
+    """Build the backend-specific WHERE clause matching every word as a prefix"""
+    if db.engine.dialect.name == 'sqlite':
+        fts_query = ' '.join(f'"{word}"*' for word in words)
+        return text("transactions_fts MATCH :fts_query").bindparams(fts_query=fts_query)
+    fts_query = ' & '.join(f'{word}:*' for word in words)
+    return text("transactions.search_vector @@ to_tsquery('simple', :fts_query)").bindparams(fts_query=fts_query)
+
+
+def apply_search(query, term):
+    """
+    Filter a Transaction query by a search term.
+
+    Keeps the query's own ordering, so it combines with the date-ordered
+    listing and keyset pagination.
+    """
+    from app.models import Transaction
+
+    words = _search_words(term)
+    if not words:
+        return query
+
+    if not fulltext_available():
+        like = f"%{term}%"
+        return query.filter(or_(
+            Transaction.description.ilike(like),
+            Transaction.notes.ilike(like),
+            Transaction.party.ilike(like)
+        ))
+
+    if db.engine.dialect.name == 'sqlite':
+        matching_ids = select(fts_table.c.rowid).where(_match_expression(words))
+        return query.filter(Transaction.id.in_(matching_ids))
+    return query.filter(_match_expression(words))
+
+
+def search_transactions(term, user_id=None, limit=20):
+    """
+    Return transactions matching a term, best matches first.
+
+    Args:
+        term: Search box value
+        user_id: Restrict to one user's transactions (None for all users)
+        limit: Maximum number of results
+    """
+    from app.models import Transaction
+
+    words = _search_words(term)
+    if not words:
+        return []
+
+    query = Transaction.query
+    if user_id is not None:
+        query = query.filter(Transaction.user_id == user_id)
+
+    if not fulltext_available():
+        return apply_search(query, term).order_by(Transaction.transaction_date.desc()).limit(limit).all()
+
+    if db.engine.dialect.name == 'sqlite':
+        # bm25() is lower for better matches
+        weights = ', '.join(str(weight) for weight in SQLITE_BM25_WEIGHTS)
+        rank = literal_column(f"bm25(transactions_fts, {weights})")
+        query = query.join(fts_table, fts_table.c.rowid == Transaction.id).filter(_match_expression(words))
+        return query.order_by(rank, Transaction.transaction_date.desc()).limit(limit).all()
+
+    fts_query = ' & '.join(f'{word}:*' for word in words)
+    rank = text("ts_rank(transactions.search_vector, to_tsquery('simple', :rank_query)) DESC").bindparams(rank_query=fts_query)
+    query = query.filter(_match_expression(words))
+    return query.order_by(rank, Transaction.transaction_date.desc()).limit(limit).all()
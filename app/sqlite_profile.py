@@ -0,0 +1,80 @@
+"""
+===========================================
+SQLITE PROFILE - PRAGMAS ON EVERY CONNECTION
+===========================================
+The SQLite fallback used to run with SQLite's defaults: a rollback journal
+(a writer locks out every reader while it commits, and a reader holds off
+writers), an fsync on every commit and a 2 MB page cache per connection.
+With several request threads, requests queued behind each other or failed
+with "database is locked".
+
+Each new pooled connection now runs these PRAGMAs (the SQLITE_* settings,
+an empty value keeps SQLite's default):
+
+- busy_timeout   ms to wait for a lock before failing (set first so the
+                 journal mode switch below waits too)
+- journal_mode   WAL: readers and the writer no longer block each other.
+                 Stored in the database file, so it sticks for every
+                 process, and adds the -wal / -shm files next to it
+- synchronous    NORMAL: in WAL mode, fsync only at checkpoints. A power
+                 loss can drop the last commits but cannot corrupt the file
+- cache_size     page cache per connection (negative = KiB)
+- mmap_size      bytes of the file read through memory mapping
+- temp_store     MEMORY: sorts and temporary tables stay off the disk
+"""
+
+# ===========================================
+# STEP 1: Import required libraries
+# ===========================================
+import re
+from sqlalchemy import event
+from app import db
+
+# Step 1a: PRAGMA -> config key, in the order they are applied
+SQLITE_PRAGMAS = (
+    ('busy_timeout', 'SQLITE_BUSY_TIMEOUT'),
+    ('journal_mode', 'SQLITE_JOURNAL_MODE'),
+    ('synchronous', 'SQLITE_SYNCHRONOUS'),
+    ('cache_size', 'SQLITE_CACHE_SIZE'),
+    ('mmap_size', 'SQLITE_MMAP_SIZE'),
+    ('temp_store', 'SQLITE_TEMP_STORE'),
+)
+
+# PRAGMA values are keywords or integers; anything else is a typo
+_VALUE = re.compile(r'^-?\w+$')
+
+
+# ===========================================
+# STEP 2: Setup
+# ===========================================
+def sqlite_pragmas(config):
+    """(pragma, value) pairs to run on each connection, from the SQLITE_* settings"""
+    pragmas = []
+    for pragma, key in SQLITE_PRAGMAS:
+        value = str(config.get(key) or '').strip()
+        if not value:
+            continue
+        if not _VALUE.match(value):
+            raise ValueError(f"{key} must be a keyword or an integer, not {value!r}")
+        pragmas.append((pragma, value))
+    return pragmas
+
+
+def init_sqlite_profile(app):
+    """Apply the SQLite PRAGMAs to every new connection (no-op on other databases)"""
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        return
+    pragmas = sqlite_pragmas(app.config)
+    if not pragmas:
+        return
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas:
+                cursor.execute(f'PRAGMA {pragma}={value}')
+        finally:
+            cursor.close()
@@ -0,0 +1,199 @@
+"""
+===========================================
+USER CACHE - LOGGED-IN USER LOOKUPS
+===========================================
+Flask-Login calls load_user() on every authenticated request. It ran
+User.query.get(), and the first has_permission() check then lazily loaded
+user.role: two queries per request before the page did any work.
+
+HOW IT WORKS:
+- load_cached_user() keeps a detached copy of each user, with its role,
+  per process. Requests attach the copy to their own session with
+  db.session.merge(load=False), which registers it without a SELECT;
+  changes made through current_user are saved as usual.
+- Entries expire after USER_CACHE_TTL seconds and at most
+  USER_CACHE_MAX_ENTRIES users are kept (least recently used go first).
+- Writes to a user through the ORM evict that user; writes to a role
+  clear the cache (mapper events below, at flush and again after commit
+  so a concurrent request cannot re-cache the old row). Restores clear it
+  as well.
+- Other processes: deactivating, deleting or changing the role of a user,
+  editing a role, and restores also bump the 'users_version' system
+  setting. Each process compares it at most every
+  USER_CACHE_RECHECK_SECONDS and drops its whole cache when it changed.
+  Other edits (e.g. an email) show up there within USER_CACHE_TTL seconds.
+- has_permission() tests a bit in the role's compiled permission mask
+  (app/permissions.py), so it needs neither a query nor the role row.
+- USER_CACHE_TTL=0 disables the cache.
+"""
+
+# ===========================================
+# STEP 1: Import required libraries
+# ===========================================
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event, select, inspect as sa_inspect
+from sqlalchemy.orm import Session, joinedload, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from app import db
+from app.models import User, Role, SystemSetting
+
+USERS_VERSION_KEY = 'users_version'
+
+# Key in Session.info holding user ids to evict once the session commits
+_EVICT_KEY = 'user_cache_evict'
+
+
+# ===========================================
+# STEP 2: TTL + LRU cache of detached users
+# ===========================================
+class UserCache:
+    """Thread-safe LRU of detached User copies, each valid for a fixed time"""
+
+    def __init__(self):
+        self._entries = OrderedDict()  # user id -> (expires at, detached User)
+        self._lock = threading.Lock()
+        self._version = None  # users_version seen at the last recheck
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        """Return the cached copy of a user and mark it most recently used, or None"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id, user, ttl, max_entries):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._entries[user_id] = (time.monotonic() + ttl, user)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def sync_version(self, interval):
+        """Every `interval` seconds, drop all entries if another process bumped users_version"""
+        if time.monotonic() - self._checked_at < interval:
+            return
+        with db.engine.connect() as connection:
+            version = _read_version(connection)
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            self._checked_at = time.monotonic()
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+user_cache = UserCache()
+
+
+# ===========================================
+# STEP 3: Loading users (Flask-Login user_loader)
+# ===========================================
+def _detached_copy(user):
+    """A copy of a loaded user and its role that belongs to no session"""
+    def copy(instance):
+        model = type(instance)
+        duplicate = model(**{attr.key: getattr(instance, attr.key) for attr in sa_inspect(model).column_attrs})
+        make_transient_to_detached(duplicate)
+        return duplicate
+
+    cached = copy(user)
+    # set_committed_value skips the role.users backref, which would otherwise
+    # become a one-user "loaded" collection
+    set_committed_value(cached, 'role', copy(user.role))
+    return cached
+
+
+def load_cached_user(user_id):
+    """Return the user for this request's session, from the cache when possible"""
+    ttl = current_app.config['USER_CACHE_TTL']
+    if ttl <= 0:
+        return db.session.get(User, user_id)
+
+    user_cache.sync_version(current_app.config['USER_CACHE_RECHECK_SECONDS'])
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return db.session.merge(cached, load=False)
+
+    user = db.session.get(User, user_id, options=[joinedload(User.role)])
+    if user is not None:
+        user_cache.put(user_id, _detached_copy(user), ttl, current_app.config['USER_CACHE_MAX_ENTRIES'])
+    return user
+
+
+# ===========================================
+# STEP 4: Invalidation
+# ===========================================
+def _read_version(connection):
+    settings = SystemSetting.__table__
+    return connection.execute(
+        select(settings.c.value).where(settings.c.key == USERS_VERSION_KEY)).scalar() or '0'
+
+
+def bump_users_version(connection):
+    SystemSetting.set_value(connection, USERS_VERSION_KEY, uuid.uuid4().hex)
+
+
+def _evict_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
+    sa_inspect(target).session.info.setdefault(_EVICT_KEY, set()).add(target.id)
+
+
+def _evict_updated_user(mapper, connection, target):
+    _evict_user(mapper, connection, target)
+    # Only changes that affect access have to reach the other processes
+    attrs = sa_inspect(target).attrs
+    if attrs._is_active.history.has_changes() or attrs.role_id.history.has_changes():
+        bump_users_version(connection)
+
+
+def _evict_deleted_user(mapper, connection, target):
+    _evict_user(mapper, connection, target)
+    bump_users_version(connection)
+
+
+def _evict_all(mapper, connection, target):
+    user_cache.clear()
+    bump_users_version(connection)
+    sa_inspect(target).session.info.setdefault(_EVICT_KEY, set()).add(None)
+
+
+event.listen(User, 'after_update', _evict_updated_user)
+event.listen(User, 'after_delete', _evict_deleted_user)
+event.listen(Role, 'after_update', _evict_all)
+event.listen(Role, 'after_delete', _evict_all)
+
+
+@event.listens_for(Session, 'after_commit')
+def _evict_after_commit(session):
+    evicted = session.info.pop(_EVICT_KEY, ())
+    if None in evicted:
+        user_cache.clear()
+    for user_id in evicted:
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_evictions(session):
+    session.info.pop(_EVICT_KEY, None)
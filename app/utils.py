@@ -1,19 +1,21 @@
 import os
 import uuid
-from datetime import datetime
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 from decimal import Decimal
 from flask import current_app
+from sqlalchemy import and_
+from app import db
 from werkzeug.utils import secure_filename
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
 from io import BytesIO
 import json
 
+# Report rendering (reportlab/openpyxl) lives in app/reports.py, which is only
+# imported when a report is generated - those libraries take longer to import
+# than the rest of the app together.
+# Reports are built in memory up to this size, then spill to a temporary file
+REPORT_SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'gif'}
@@ -53,294 +55,501 @@ def parse_tags(tag_string):
         return []
     return [tag.strip() for tag in tag_string.split(',') if tag.strip()]
 
-def generate_pdf_report(transactions, title="Transaction Report", user_filter=None, date_range=None):
-    """Generate PDF report from transactions"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30,
-        alignment=1  # Center alignment
-    )
-    elements.append(Paragraph(title, title_style))
-    
-    # Report info
-    info_style = styles['Normal']
-    if user_filter:
-        elements.append(Paragraph(f"User: {user_filter}", info_style))
-    if date_range:
-        elements.append(Paragraph(f"Period: {date_range}", info_style))
-    elements.append(Paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}", info_style))
-    elements.append(Spacer(1, 20))
-    
-    # Summary
-    total_income = sum(t.amount for t in transactions if t.type == 'income')
-    total_expense = sum(t.amount for t in transactions if t.type == 'expense')
-    net_amount = total_income - total_expense
-    
-    summary_data = [
-        ['Summary', ''],
-        ['Total Income', format_currency(total_income)],
-        ['Total Expenses', format_currency(total_expense)],
-        ['Net Amount', format_currency(net_amount)]
-    ]
-    
-    summary_table = Table(summary_data, colWidths=[2*inch, 2*inch])
-    summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    elements.append(summary_table)
-    elements.append(Spacer(1, 30))
-    
-    # Transactions table
-    if transactions:
-        data = [['Date', 'Type', 'Description', 'Category', 'Amount']]
-        
-        for transaction in transactions:
-            data.append([
-                transaction.transaction_date.strftime('%Y-%m-%d'),
-                transaction.type.title(),
-                transaction.description[:50] + ('...' if len(transaction.description) > 50 else ''),
-                transaction.category.name,
-                format_currency(transaction.amount)
-            ])
-        
-        table = Table(data, colWidths=[1.2*inch, 1*inch, 2.5*inch, 1.5*inch, 1.2*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),  # Amount column right-aligned
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ]))
-        
-        elements.append(Paragraph("Transaction Details", styles['Heading2']))
-        elements.append(Spacer(1, 12))
-        elements.append(table)
-    
-    # Build PDF
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer
-
-def generate_excel_report(transactions, title="Transaction Report"):
-    """Generate Excel report from transactions"""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Transactions"
-    
-    # Title
-    ws['A1'] = title
-    ws['A1'].font = Font(size=16, bold=True)
-    ws.merge_cells('A1:E1')
-    
-    # Headers
-    headers = ['Date', 'Type', 'Description', 'Category', 'Party', 'Amount', 'Notes']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=3, column=col, value=header)
-        cell.font = Font(bold=True)
-        cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        cell.alignment = Alignment(horizontal="center")
-    
-    # Data
-    for row, transaction in enumerate(transactions, 4):
-        ws.cell(row=row, column=1, value=transaction.transaction_date.strftime('%Y-%m-%d'))
-        ws.cell(row=row, column=2, value=transaction.type.title())
-        ws.cell(row=row, column=3, value=transaction.description)
-        ws.cell(row=row, column=4, value=transaction.category.name)
-        ws.cell(row=row, column=5, value=transaction.party or '')
-        ws.cell(row=row, column=6, value=float(transaction.amount))
-        ws.cell(row=row, column=7, value=transaction.notes or '')
-    
-    # Auto-adjust column widths
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Summary sheet
-    summary_ws = wb.create_sheet("Summary")
-    summary_ws['A1'] = "Financial Summary"
-    summary_ws['A1'].font = Font(size=14, bold=True)
-    
-    total_income = sum(t.amount for t in transactions if t.type == 'income')
-    total_expense = sum(t.amount for t in transactions if t.type == 'expense')
-    net_amount = total_income - total_expense
-    
-    summary_data = [
-        ['Total Income', float(total_income)],
-        ['Total Expenses', float(total_expense)],
-        ['Net Amount', float(net_amount)]
-    ]
-    
-    for row, (label, value) in enumerate(summary_data, 3):
-        summary_ws.cell(row=row, column=1, value=label).font = Font(bold=True)
-        summary_ws.cell(row=row, column=2, value=value)
-    
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    return buffer
+def generate_pdf_report(rows, title="Transaction Report", user_filter=None, date_range=None, totals=None):
+    """Generate a PDF report from report rows (see app/reports.py, loaded on first use)"""
+    from app import reports
+    return reports.generate_pdf_report(rows, title, user_filter, date_range, totals)
+
+# Excel report columns: (header, minimum width)
+EXCEL_REPORT_COLUMNS = [('Date', 10), ('Type', 7), ('Description', 11), ('Category', 8),
+                        ('Party', 5), ('Amount', 12), ('Notes', 5)]
+EXCEL_MAX_COLUMN_WIDTH = 50
+
+def report_rows(query, chunk_size=1000):
+    """
+    Stream report rows for a filtered Transaction query.
+    
+    Yields plain tuples (date, type, description, category, party, amount,
+    notes) fetched in chunks of chunk_size through the shared export layer
+    (app/exports.py): no ORM objects are built, category names come from a
+    single lookup query, and the full result set is never held in memory.
+    """
+    from app.models import Transaction
+    from app.exports import category_lookup, export_transactions
+    
+    categories = category_lookup()
+    for row in export_transactions(query, order_by=(Transaction.transaction_date.desc(), Transaction.id.desc()),
+                                   chunk_size=chunk_size):
+        yield (row.transaction_date, row.type, row.description, categories.get(row.category_id, ''),
+               row.party, row.amount, row.notes)
+
+def report_column_widths(query):
+    """
+    Get Excel column widths for a filtered Transaction query in one aggregate query.
+    
+    Write-only worksheets must declare column widths before the first row is
+    written, so the longest value per text column is measured in SQL first.
+    """
+    from app.models import Transaction, Category
+    from sqlalchemy import func
+    
+    lengths = query.join(Category, Transaction.category_id == Category.id).with_entities(
+        func.max(func.length(Transaction.description)),
+        func.max(func.length(Category.name)),
+        func.max(func.length(Transaction.party)),
+        func.max(func.length(Transaction.notes))
+    ).order_by(None).one()
+    
+    widths = [minimum for _, minimum in EXCEL_REPORT_COLUMNS]
+    for column, length in zip((2, 3, 4, 6), lengths):
+        widths[column] = max(widths[column], length or 0)
+    return [min(width + 2, EXCEL_MAX_COLUMN_WIDTH) for width in widths]
+
+def generate_excel_report(rows, title="Transaction Report", totals=None, column_widths=None):
+    """Generate an Excel report from report rows (see app/reports.py, loaded on first use)"""
+    from app import reports
+    return reports.generate_excel_report(rows, title, totals, column_widths)
 
 def log_audit_action(user_id, action, table_name=None, record_id=None, old_values=None, new_values=None):
-    """Log audit action"""
-    from app.models import AuditLog
-    from app import db
-    from flask import request
+    """
+    Log audit action
+    
+    Call it before the controller's db.session.commit(): by default the
+    record is written by that same commit (AUDIT_MODE, see app/audit.py).
+    """
+    from app.audit import audit_record, write_audit
     
     try:
-        audit_log = AuditLog(
-            user_id=user_id,
-            action=action,
-            table_name=table_name,
-            record_id=record_id,
-            old_values=json.dumps(old_values) if old_values else None,
-            new_values=json.dumps(new_values) if new_values else None,
-            ip_address=request.remote_addr if request else None,
-            user_agent=request.headers.get('User-Agent') if request else None
-        )
-        db.session.add(audit_log)
-        db.session.commit()
+        write_audit(audit_record(user_id, action, table_name, record_id, old_values, new_values))
     except Exception as e:
         current_app.logger.error(f"Error logging audit action: {str(e)}")
 
+@dataclass
+class DashboardStats:
+    """Dashboard statistics returned by get_dashboard_stats()"""
+    this_month_income: Decimal
+    this_month_expenses: Decimal
+    total_transactions: int
+    total_users: int
+    recent_transactions: list = field(default_factory=list)
+    
+    @property
+    def this_month_net(self):
+        return self.this_month_income - self.this_month_expenses
+    
+    def to_dict(self):
+        """JSON-serialisable form for the API"""
+        return {
+            'this_month_income': float(self.this_month_income),
+            'this_month_expenses': float(self.this_month_expenses),
+            'this_month_net': float(self.this_month_net),
+            'total_transactions': self.total_transactions,
+            'total_users': self.total_users,
+            'recent_transactions': [{
+                'id': transaction.id,
+                'type': transaction.type,
+                'amount': float(transaction.amount),
+                'description': transaction.description,
+                'transaction_date': transaction.transaction_date.isoformat(),
+                'category': transaction.category.name
+            } for transaction in self.recent_transactions]
+        }
+
+def dashboard_totals_statement(user_id=None):
+    """
+    The dashboard's totals query: this month's income and expenses, the
+    transaction count (all from the monthly rollup table) and the active-user
+    count. user_id=None covers all users.
+    """
+    from app.models import TransactionRollup, User
+    from sqlalchemy import func, case, select, type_coerce
+    from datetime import datetime
+    
+    this_month = TransactionRollup.month_key(datetime.now())
+    
+    def month_total(type_name):
+        # This month and anything dated later, as before
+        return type_coerce(func.coalesce(func.sum(case(
+            (and_(TransactionRollup.type == type_name, TransactionRollup.year_month >= this_month),
+             TransactionRollup.total),
+            else_=0
+        )), 0), db.Numeric(14, 2))
+    
+    active_users = select(func.count(User.id)).where(User._is_active == True).scalar_subquery()
+    statement = select(
+        month_total('income'),
+        month_total('expense'),
+        func.coalesce(func.sum(TransactionRollup.count), 0),
+        active_users
+    ).select_from(TransactionRollup)
+    if user_id:
+        statement = statement.where(TransactionRollup.user_id == user_id)
+    return statement
+
 def get_dashboard_stats(user=None):
-    """Get dashboard statistics"""
-    from app.models import Transaction, User
-    from sqlalchemy import func
-    from datetime import datetime, timedelta
-    
-    # Base query
-    query = Transaction.query
-    if user and not user.has_permission('manage_users'):
-        query = query.filter(Transaction.user_id == user.id)
-    
-    # This month
-    this_month_start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    this_month_income = query.filter(
-        Transaction.type == 'income',
-        Transaction.transaction_date >= this_month_start.date()
-    ).with_entities(func.sum(Transaction.amount)).scalar() or 0
-    
-    this_month_expenses = query.filter(
-        Transaction.type == 'expense',
-        Transaction.transaction_date >= this_month_start.date()
-    ).with_entities(func.sum(Transaction.amount)).scalar() or 0
-    
-    # Total counts
-    total_transactions = query.count()
-    total_users = User.query.filter_by(is_active=True).count()
-    
-    # Recent transactions
+    """
+    Get dashboard statistics in two round trips.
+    
+    One conditional-aggregate query over the monthly rollup table returns the
+    month's income and expenses, the transaction count and (as a scalar
+    subquery) the active-user count; a second query fetches the five most
+    recent transactions with their categories.
+    """
+    from app.models import Transaction
+    from sqlalchemy.orm import joinedload, lazyload
+    
+    user_id = user.id if user and not user.has_permission('manage_users') else None
+    
+    # Step 1: All totals in a single statement
+    income, expenses, total_transactions, total_users = db.session.execute(
+        dashboard_totals_statement(user_id)).one()
+    
+    # Step 2: Recent transactions (category joined in; tags are not shown here)
+    query = Transaction.query.options(joinedload(Transaction.category), lazyload(Transaction.tags))
+    if user_id:
+        query = query.filter(Transaction.user_id == user_id)
     recent_transactions = query.order_by(Transaction.created_at.desc()).limit(5).all()
     
+    return DashboardStats(
+        this_month_income=Decimal(str(income)),
+        this_month_expenses=Decimal(str(expenses)),
+        total_transactions=int(total_transactions),
+        total_users=int(total_users),
+        recent_transactions=recent_transactions
+    )
+
+def get_report_totals(start_date, end_date, user_id=None, category_id=None, type=None):
+    """
+    Get income/expense totals for a report period.
+    
+    Whole calendar months are read from the monthly rollup table; only the
+    partial months at either end of the range are summed from transactions.
+    """
+    from app.models import Transaction, TransactionRollup
+    from sqlalchemy import func, case
+    
+    totals = {'income': Decimal('0'), 'expense': Decimal('0')}
+    
+    # Step 1: Find the run of whole months inside [start_date, end_date]
+    first_full = start_date if start_date.day == 1 else (start_date.replace(day=28) + timedelta(days=4)).replace(day=1)
+    after_end = end_date + timedelta(days=1)
+    end_full = after_end if after_end.day == 1 else end_date.replace(day=1)  # exclusive
+    
+    raw_ranges = []
+    if first_full < end_full:
+        rollups = TransactionRollup.query.filter(
+            TransactionRollup.year_month >= TransactionRollup.month_key(first_full),
+            TransactionRollup.year_month <= TransactionRollup.month_key(end_full - timedelta(days=1))
+        )
+        if user_id:
+            rollups = rollups.filter(TransactionRollup.user_id == user_id)
+        if category_id:
+            rollups = rollups.filter(TransactionRollup.category_id == category_id)
+        if type:
+            rollups = rollups.filter(TransactionRollup.type == type)
+        for row_type, total in rollups.with_entities(
+                TransactionRollup.type, func.sum(TransactionRollup.total)
+        ).group_by(TransactionRollup.type):
+            totals[row_type] = totals.get(row_type, Decimal('0')) + Decimal(str(total or 0))
+        
+        if start_date < first_full:
+            raw_ranges.append((start_date, first_full - timedelta(days=1)))
+        if end_full <= end_date:
+            raw_ranges.append((end_full, end_date))
+    else:
+        raw_ranges.append((start_date, end_date))
+    
+    # Step 2: Sum the partial months straight from transactions
+    for range_start, range_end in raw_ranges:
+        query = Transaction.query.filter(
+            Transaction.transaction_date >= range_start,
+            Transaction.transaction_date <= range_end
+        )
+        if user_id:
+            query = query.filter(Transaction.user_id == user_id)
+        if category_id:
+            query = query.filter(Transaction.category_id == category_id)
+        if type:
+            query = query.filter(Transaction.type == type)
+        income, expense = query.with_entities(
+            func.sum(case((Transaction.type == 'income', Transaction.amount), else_=0)),
+            func.sum(case((Transaction.type == 'expense', Transaction.amount), else_=0))
+        ).one()
+        totals['income'] += Decimal(str(income or 0))
+        totals['expense'] += Decimal(str(expense or 0))
+    
     return {
-        'this_month_income': this_month_income,
-        'this_month_expenses': this_month_expenses,
-        'this_month_net': this_month_income - this_month_expenses,
-        'total_transactions': total_transactions,
-        'total_users': total_users,
-        'recent_transactions': recent_transactions
+        'total_income': totals['income'],
+        'total_expense': totals['expense'],
+        'net_amount': totals['income'] - totals['expense']
     }
 
-def backup_database():
-    """Create database backup"""
-    # This is a simplified backup - in production, you'd use proper database backup tools
-    from app.models import User, Transaction, Category, Tag, SpendingLimit
-    from app import db
-    
-    backup_data = {
-        'timestamp': datetime.now().isoformat(),
-        'users': [],
-        'transactions': [],
-        'categories': [],
-        'tags': [],
-        'spending_limits': []
+# Report formats: file extension and MIME type
+REPORT_FORMATS = {
+    'pdf': ('pdf', 'application/pdf'),
+    'excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+def report_params(form, user):
+    """
+    Turn a submitted ReportForm into plain, JSON-serializable report parameters.
+
+    The user filter is resolved here: users without manage_users permission
+    only ever get reports of their own transactions. Identical parameters
+    always describe the identical report, so they double as a job key.
+    """
+    user_id = None
+    if form.user_id.data and form.user_id.data != 0:
+        user_id = form.user_id.data if user.has_permission('manage_users') else user.id
+    elif not user.has_permission('manage_users'):
+        user_id = user.id
+
+    return {
+        'user_id': user_id,
+        'start_date': form.start_date.data.isoformat(),
+        'end_date': form.end_date.data.isoformat(),
+        'category_id': form.category_id.data or None,
+        'type': form.type.data or None,
+        'format': form.format.data,
     }
+
+def render_report(params):
+    """
+    Build a report from report_params() output.
+
+    Returns (file object, download name, MIME type); the file object is
+    positioned at the start. Repeated requests for unchanged data are served
+    from the report cache (app/report_cache.py).
+    """
+    from app.models import Transaction, get_data_version
+    from app.report_cache import report_cache
+    from datetime import date
+
+    extension, mimetype = REPORT_FORMATS[params['format']]
+    download_name = f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+    # Step 1: Serve an identical report generated since the last change to its data
+    # (the report user's data version; reports over all users use every user's)
+    cache_limit = current_app.config['REPORT_CACHE_MAX_BYTES']
+    cache_key = report_cache.make_key(params, get_data_version(params['user_id'])) if cache_limit else None
+    cached = cache_key and report_cache.get(cache_key)
+    if cached:
+        return BytesIO(cached), download_name, mimetype
+
+    # Step 2: Query and render
+    start_date = date.fromisoformat(params['start_date'])
+    end_date = date.fromisoformat(params['end_date'])
+
+    query = Transaction.query.filter(
+        Transaction.transaction_date >= start_date,
+        Transaction.transaction_date <= end_date
+    )
+    if params['user_id']:
+        query = query.filter(Transaction.user_id == params['user_id'])
+    if params['category_id']:
+        query = query.filter(Transaction.category_id == params['category_id'])
+    if params['type']:
+        query = query.filter(Transaction.type == params['type'])
+
+    title = f"Financial Report - {start_date} to {end_date}"
+    totals = get_report_totals(start_date, end_date, user_id=params['user_id'],
+                               category_id=params['category_id'], type=params['type'])
+
+    # Both formats stream rows from the database in chunks
+    if params['format'] == 'pdf':
+        buffer = generate_pdf_report(report_rows(query), title, totals=totals)
+    else:
+        buffer = generate_excel_report(report_rows(query), title, totals=totals,
+                                       column_widths=report_column_widths(query))
+
+    # Step 3: Keep it for next time unless it is too big to hold in memory
+    if cache_key:
+        size = buffer.seek(0, os.SEEK_END)
+        buffer.seek(0)
+        if size <= current_app.config['REPORT_CACHE_MAX_ENTRY_BYTES']:
+            report_cache.put(cache_key, buffer.read(), cache_limit)
+            buffer.seek(0)
+    return buffer, download_name, mimetype
+
+# Backups are written in pieces of about this size (before compression)
+BACKUP_WRITE_SIZE = 64 * 1024
+
+# Incremental backups: the last backup's start time is kept as a watermark.
+# The next incremental re-reads a little before it, so rows whose write was
+# still being committed while that backup ran are not missed (restores are
+# idempotent, so the overlap costs nothing but a few duplicate rows).
+BACKUP_WATERMARK_KEY = 'backup_watermark'
+BACKUP_WATERMARK_OVERLAP = timedelta(minutes=5)
+
+# Hard deletes are found through these audit log actions
+BACKUP_DELETE_ACTIONS = {'delete_transaction': 'transactions'}
+
+def _backup_sections(chunk_size, since=None):
+    """
+    (section name, iterator of row dicts) for every table in the backup, in order.
+    
+    With since, only users, transactions and spending limits changed after
+    it are included (categories and tags have no updated_at and are small,
+    so they are always included), plus a "deleted" section from the audit log.
+    """
+    from app.models import User, Transaction, Category, Tag, SpendingLimit, AuditLog
+    from app.exports import export_transactions_with_tags
+    
+    user_query = User.query
+    transaction_query = transaction_order = None
+    limit_query = SpendingLimit.query
+    if since:
+        user_query = user_query.filter(User.updated_at > since)
+        limit_query = limit_query.filter(SpendingLimit.updated_at > since)
+        # Sorting on "id + 0" lets the database find the few changed rows through
+        # ix_transactions_updated and sort them, instead of walking the whole
+        # table in primary key order
+        transaction_query = Transaction.query.filter(Transaction.updated_at > since)
+        transaction_order = (Transaction.id + 0,)
     
     # Export users (excluding passwords)
-    for user in User.query.all():
-        backup_data['users'].append({
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'phone': user.phone,
-            'is_active': user.is_active,
-            'role_id': user.role_id,
-            'created_at': user.created_at.isoformat()
-        })
-    
-    # Export transactions
-    for transaction in Transaction.query.all():
-        backup_data['transactions'].append({
-            'id': transaction.id,
-            'type': transaction.type,
-            'amount': str(transaction.amount),
-            'description': transaction.description,
-            'notes': transaction.notes,
-            'party': transaction.party,
-            'transaction_date': transaction.transaction_date.isoformat(),
-            'user_id': transaction.user_id,
-            'category_id': transaction.category_id,
-            'tags': [tag.name for tag in transaction.tags]
-        })
+    users = ({
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'phone': user.phone,
+        'is_active': user.is_active,
+        'role_id': user.role_id,
+        'created_at': user.created_at.isoformat()
+    } for user in user_query.order_by(User.id).yield_per(chunk_size))
+    # Export transactions (rows and tags stream from two set-based queries, see app/exports.py)
+    transactions = ({
+        'id': transaction.id,
+        'type': transaction.type,
+        'amount': str(transaction.amount),
+        'description': transaction.description,
+        'notes': transaction.notes,
+        'party': transaction.party,
+        'transaction_date': transaction.transaction_date.isoformat(),
+        'user_id': transaction.user_id,
+        'category_id': transaction.category_id,
+        'tags': tags
+    } for transaction, tags in export_transactions_with_tags(transaction_query, order_by=transaction_order,
+                                                             chunk_size=chunk_size))
     
     # Export categories
-    for category in Category.query.all():
-        backup_data['categories'].append({
-            'id': category.id,
-            'name': category.name,
-            'description': category.description,
-            'color': category.color,
-            'is_system': category.is_system
-        })
+    categories = ({
+        'id': category.id,
+        'name': category.name,
+        'description': category.description,
+        'color': category.color,
+        'is_system': category.is_system
+    } for category in Category.query.order_by(Category.id).yield_per(chunk_size))
     
     # Export tags
-    for tag in Tag.query.all():
-        backup_data['tags'].append({
-            'id': tag.id,
-            'name': tag.name
-        })
+    tags = ({
+        'id': tag.id,
+        'name': tag.name
+    } for tag in Tag.query.order_by(Tag.id).yield_per(chunk_size))
     
     # Export spending limits
-    for limit in SpendingLimit.query.all():
-        backup_data['spending_limits'].append({
-            'id': limit.id,
-            'type': limit.type,
-            'amount': str(limit.amount),
-            'is_active': limit.is_active,
-            'user_id': limit.user_id,
-            'category_id': limit.category_id
-        })
-    
-    return json.dumps(backup_data, indent=2)
+    spending_limits = ({
+        'id': limit.id,
+        'type': limit.type,
+        'amount': str(limit.amount),
+        'is_active': limit.is_active,
+        'user_id': limit.user_id,
+        'category_id': limit.category_id
+    } for limit in limit_query.order_by(SpendingLimit.id).yield_per(chunk_size))
+    
+    # Referenced tables come first, so a restore can insert in a single pass
+    sections = [('categories', categories), ('tags', tags), ('users', users),
+                ('transactions', transactions), ('spending_limits', spending_limits)]
+    
+    # Export hard deletes recorded in the audit log since the last backup
+    if since:
+        deleted = ({
+            'table_name': BACKUP_DELETE_ACTIONS[log.action],
+            'id': log.record_id
+        } for log in AuditLog.query.filter(
+            AuditLog.action.in_(BACKUP_DELETE_ACTIONS), AuditLog.created_at > since
+        ).order_by(AuditLog.id).yield_per(chunk_size))
+        sections.append(('deleted', deleted))
+    return sections
+
+def iter_backup_json(chunk_size=1000, since=None, watermark=None):
+    """
+    Write the database backup as JSON, piece by piece.
+    
+    Rows are read with chunked (yield_per) queries and serialized one per
+    line as they arrive, so only one chunk of rows is in memory at a time.
+    The output is a single JSON document:
+    
+        {
+          "timestamp": "...",
+          "mode": "full",            # or "incremental"
+          "since": null,             # incremental: rows changed after this
+          "watermark": "...",        # start of this backup (UTC)
+          "categories": [
+            {...},
+            {...}
+          ],
+          ...
+        }
+    
+    Every row is on a line of its own, which lets restores stream the file
+    (see app/backups.py).
+    """
+    yield '{\n  "timestamp": %s' % json.dumps(datetime.now().isoformat())
+    yield ',\n  "mode": %s' % json.dumps('incremental' if since else 'full')
+    yield ',\n  "since": %s' % json.dumps(since.isoformat() if since else None)
+    yield ',\n  "watermark": %s' % json.dumps(watermark.isoformat() if watermark else None)
+    for name, rows in _backup_sections(chunk_size, since):
+        yield ',\n  %s: [' % json.dumps(name)
+        separator = '\n    '
+        for row in rows:
+            yield separator + json.dumps(row)
+            separator = ',\n    '
+        yield '\n  ]' if separator != '\n    ' else ']'
+    yield '\n}\n'
+
+def stream_backup(compress=False, chunk_size=1000, incremental=False):
+    """
+    Database backup as a stream of bytes for a streaming HTTP response.
+    
+    Output is batched into pieces of about BACKUP_WRITE_SIZE and optionally
+    gzip-compressed on the fly, so memory use stays flat however big the
+    database is.
+    
+    Every completed backup records its start time as the backup watermark.
+    With incremental=True only rows changed since the previous backup (and
+    deletions) are written; without a previous backup this is a full backup.
+    """
+    import zlib
+    from app.models import SystemSetting
+    
+    watermark = datetime.utcnow()
+    since = None
+    if incremental:
+        last = SystemSetting.get_value(BACKUP_WATERMARK_KEY)
+        since = datetime.fromisoformat(last) - BACKUP_WATERMARK_OVERLAP if last else None
+    
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31: gzip format
+    pending, pending_size = [], 0
+    for piece in iter_backup_json(chunk_size, since=since, watermark=watermark):
+        pending.append(piece)
+        pending_size += len(piece)
+        if pending_size >= BACKUP_WRITE_SIZE:
+            data = ''.join(pending).encode('utf-8')
+            pending, pending_size = [], 0
+            data = compressor.compress(data) if compressor else data
+            if data:
+                yield data
+    
+    data = ''.join(pending).encode('utf-8')
+    yield compressor.compress(data) + compressor.flush() if compressor else data
+    
+    # Only reached once the whole backup was sent
+    SystemSetting.set_value(db.session.connection(), BACKUP_WATERMARK_KEY, watermark.isoformat())
+    db.session.commit()
+
+def backup_database():
+    """Create database backup as a JSON string (see stream_backup() for large databases)"""
+    return ''.join(iter_backup_json())
@@ -0,0 +1,86 @@
+"""
+===========================================
+BENCHMARK - Audit log queries and archival
+===========================================
+Fills audit_logs with N records spread over two years, then times the
+audit API query (audit_log_page) for the first page, a page deep into
+the log and a single user's page, and archives everything older than
+AUDIT_RETENTION_MONTHS to monthly .jsonl.gz files.
+
+USAGE:
+    python benchmarks/audit_archive.py             # 1M records
+    python benchmarks/audit_archive.py 5000000
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db
+from sqlite_snapshot import make_app
+
+ACTIONS = ('login', 'logout', 'create_transaction', 'update_transaction', 'delete_transaction')
+
+
+def seed(rows):
+    from app.models import AuditLog
+    db.create_all()
+    now = datetime.utcnow()
+    step = timedelta(days=730) / rows
+    batch = []
+    for i in range(rows):
+        batch.append({
+            'user_id': i % 50 + 1,
+            'action': ACTIONS[i % len(ACTIONS)],
+            'table_name': 'transactions',
+            'record_id': i,
+            'ip_address': '127.0.0.1',
+            'created_at': now - timedelta(days=730) + step * i,
+        })
+        if len(batch) == 10000:
+            db.session.execute(AuditLog.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(AuditLog.__table__.insert(), batch)
+    db.session.commit()
+
+
+def timed(label, function, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    print(f"  {label:28s} {(time.perf_counter() - start) / repeat * 1000:8.2f} ms", flush=True)
+    return result
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(f"sqlite:///{os.path.join(tmp, 'bench.db')}", tmp)
+        app.config.update(AUDIT_RETENTION_MONTHS=12, AUDIT_ARCHIVE_FOLDER=os.path.join(tmp, 'archive'))
+        with app.app_context():
+            from app.audit import archive_audit_logs, audit_log_page
+            from app.pagination import encode_cursor
+            from app.models import AuditLog
+
+            seed(rows)
+            print(f"{rows:,} audit records")
+            middle = db.session.query(AuditLog.created_at, AuditLog.id).filter(AuditLog.id == rows // 2).one()
+            timed('first page', lambda: audit_log_page(per_page=50))
+            timed('page at the middle', lambda: audit_log_page(cursor=encode_cursor('next', tuple(middle))))
+            timed('one user, first page', lambda: audit_log_page(user_id=7))
+            timed('one action, past middle', lambda: audit_log_page(
+                action='login', cursor=encode_cursor('next', tuple(middle))))
+
+            start = time.perf_counter()
+            archived = archive_audit_logs()
+            seconds = time.perf_counter() - start
+            count = sum(records for _, records in archived)
+            folder = app.config['AUDIT_ARCHIVE_FOLDER']
+            size = sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder))
+            print(f"  archived {len(archived)} months, {count:,} records in {seconds:.2f} s "
+                  f"({count / seconds:,.0f} records/s, {size / 2**20:.1f} MiB)")
@@ -0,0 +1,67 @@
+"""
+===========================================
+BENCHMARK - Audit log write modes
+===========================================
+Times a typical write request (update one transaction, log the action,
+commit) under each AUDIT_MODE, on a scratch SQLite file so every commit
+pays for a real fsync. 'sync' logs after the commit like the routes used
+to; 'async' is also timed until its queue has been written.
+
+USAGE:
+    python benchmarks/audit_log.py            # 2000 actions per mode
+    python benchmarks/audit_log.py 10000
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import db
+from sqlite_snapshot import make_app, seed
+
+
+def run(app, mode, actions):
+    from app.audit import shutdown_audit_writer
+    from app.models import AuditLog, Transaction
+    from app.utils import log_audit_action
+
+    app.config['AUDIT_MODE'] = mode
+    commits = []
+    event.listen(db.engine, 'commit', lambda connection: commits.append(1))
+    start = time.perf_counter()
+    for i in range(actions):
+        with app.test_request_context('/transactions/1/edit', method='POST'):
+            transaction = db.session.get(Transaction, i % 1000 + 1)
+            transaction.notes = f'{mode} {i}'
+            if mode == 'sync':
+                # The original order: commit the change, then log (and commit) again
+                db.session.commit()
+                log_audit_action(1, 'update_transaction', 'transactions', transaction.id)
+            else:
+                log_audit_action(1, 'update_transaction', 'transactions', transaction.id)
+                db.session.commit()
+    request_seconds = time.perf_counter() - start
+    shutdown_audit_writer()
+    total_seconds = time.perf_counter() - start
+    written = AuditLog.query.filter(AuditLog.action == 'update_transaction').count()
+    db.session.execute(AuditLog.__table__.delete())
+    db.session.commit()
+    print(f"{mode:8s} {request_seconds / actions * 1000:6.2f} ms/request   "
+          f"{len(commits) / actions:4.2f} commits/request   total {total_seconds:6.2f} s   "
+          f"written {written}", flush=True)
+
+
+if __name__ == '__main__':
+    actions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(f"sqlite:///{os.path.join(tmp, 'bench.db')}", tmp)
+        app.config.update(AUDIT_QUEUE_SIZE=10000, AUDIT_BATCH_SIZE=500, AUDIT_FLUSH_INTERVAL=1.0)
+        with app.app_context():
+            seed(1000)
+            for mode in ('sync', 'session', 'async'):
+                run(app, mode, actions)
@@ -0,0 +1,68 @@
+"""
+===========================================
+BENCHMARK - Cold start (CASHBOOK_STARTUP)
+===========================================
+Starts a fresh Python process per run, as a serverless cold start does,
+and times importing the app, create_app() and the first request (GET
+/login), for CASHBOOK_STARTUP=full and CASHBOOK_STARTUP=fast.
+
+The app package is copied to a scratch directory, so the SQLite database
+it creates (instance/cashbook.db) is a throwaway one. With DATABASE_URL
+pointing at PostgreSQL the runs use that database instead; that is
+where fast mode also saves the psycopg2 test connection.
+
+USAGE:
+    python benchmarks/cold_start.py          # 7 runs per mode
+    python benchmarks/cold_start.py 15
+"""
+
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, logging, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+logging.disable(logging.CRITICAL)
+app = create_app()
+created = time.perf_counter()
+status = app.test_client().get('/login').status_code
+served = time.perf_counter()
+assert status == 200, status
+print(json.dumps({'import': imported - start, 'create_app': created - imported, 'first_request': served - created}))
+"""
+
+
+def cold_start(workdir, mode):
+    """Seconds for the whole process plus the in-process breakdown"""
+    env = dict(os.environ, CASHBOOK_STARTUP=mode, PYTHONPATH=workdir)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', CHILD], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process'] = time.perf_counter() - start
+    return timings
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    with tempfile.TemporaryDirectory() as workdir:
+        shutil.copytree(os.path.join(ROOT, 'app'), os.path.join(workdir, 'app'),
+                        ignore=shutil.ignore_patterns('__pycache__'))
+        # One-time initialization, as `flask init-db` does after a deploy
+        cold_start(workdir, 'full')
+        for mode in ('full', 'fast'):
+            samples = [cold_start(workdir, mode) for _ in range(runs)]
+            median = {key: statistics.median(sample[key] for sample in samples) * 1000 for key in samples[0]}
+            print(f"{mode:5s} process {median['process']:7.1f} ms   import {median['import']:6.1f} ms   "
+                  f"create_app {median['create_app']:6.1f} ms   first request {median['first_request']:6.1f} ms",
+                  flush=True)
@@ -0,0 +1,149 @@
+"""
+===========================================
+BENCHMARK - get_dashboard_stats
+===========================================
+Compares the original five-query dashboard statistics (raw SUMs and COUNT
+over transactions) with the rollup-backed single aggregate query, reporting
+database round trips and median latency per call.
+
+USAGE:
+    python benchmarks/dashboard_stats.py                    # SQLite, 10k/100k/1M rows
+    python benchmarks/dashboard_stats.py 10000 100000       # custom sizes
+    BENCH_POSTGRES_URL=postgresql://user:pw@localhost/bench \\
+        python benchmarks/dashboard_stats.py                # also run on PostgreSQL
+
+The PostgreSQL database is wiped, so point it at a scratch database.
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event, func
+
+from app import db
+
+REPEAT = 20
+USERS = 5
+
+
+def make_app(database_url):
+    """Minimal app bound to a scratch database (create_app would use the real one)"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def seed(rows):
+    """Fill the scratch database with `rows` transactions spread over two years"""
+    from app.models import Category, Role, Transaction, TransactionRollup, User
+
+    db.drop_all()
+    db.create_all()
+    role = Role(name='Viewer', description='bench')
+    db.session.add(role)
+    db.session.flush()
+    for i in range(USERS):
+        db.session.add(User(username=f'bench{i}', email=f'bench{i}@example.com',
+                            password_hash='x', role_id=role.id, _is_active=True))
+    for name in ('Food', 'Rent', 'Salary', 'Other'):
+        db.session.add(Category(name=name))
+    db.session.commit()
+
+    random.seed(42)
+    today = date.today()
+    now = datetime.utcnow()
+    batch = []
+    for i in range(rows):
+        batch.append({
+            'type': 'income' if i % 4 == 0 else 'expense',
+            'amount': round(random.uniform(1, 500), 2),
+            'description': f'bench transaction {i}',
+            'transaction_date': today - timedelta(days=random.randint(0, 730)),
+            'created_at': now - timedelta(seconds=i),
+            'updated_at': now,
+            'user_id': random.randint(1, USERS),
+            'category_id': random.randint(1, 4),
+        })
+        if len(batch) == 10000:
+            db.session.execute(Transaction.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Transaction.__table__.insert(), batch)
+    db.session.commit()
+    TransactionRollup.rebuild()
+
+
+def legacy_dashboard_stats(user_id):
+    """The original implementation: five queries over the raw transactions table"""
+    from app.models import Transaction, User
+
+    query = Transaction.query.filter(Transaction.user_id == user_id)
+    month_start = date.today().replace(day=1)
+    income = query.filter(Transaction.type == 'income', Transaction.transaction_date >= month_start
+                          ).with_entities(func.sum(Transaction.amount)).scalar() or 0
+    expenses = query.filter(Transaction.type == 'expense', Transaction.transaction_date >= month_start
+                            ).with_entities(func.sum(Transaction.amount)).scalar() or 0
+    total = query.count()
+    users = User.query.filter(User._is_active == True).count()
+    recent = query.order_by(Transaction.created_at.desc()).limit(5).all()
+    return income, expenses, total, users, recent
+
+
+class _Viewer:
+    """Stand-in for current_user: a non-admin, so stats are scoped to one user"""
+    id = 1
+
+    def has_permission(self, permission):
+        return False
+
+
+def measure(func_, *args):
+    """Return (round trips per call, median ms per call)"""
+    statements = []
+
+    def count(*_):
+        statements.append(1)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    timings = []
+    try:
+        for _ in range(REPEAT):
+            statements.clear()
+            db.session.expire_all()
+            start = time.perf_counter()
+            func_(*args)
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    return len(statements), statistics.median(timings)
+
+
+def run(label, database_url, sizes):
+    from app.utils import get_dashboard_stats
+
+    app = make_app(database_url)
+    with app.app_context():
+        for rows in sizes:
+            seed(rows)
+            legacy_trips, legacy_ms = measure(legacy_dashboard_stats, 1)
+            new_trips, new_ms = measure(get_dashboard_stats, _Viewer())
+            print(f"{label:<10} {rows:>9,}  legacy {legacy_trips} trips {legacy_ms:9.2f} ms"
+                  f"   rollup {new_trips} trips {new_ms:9.2f} ms   x{legacy_ms / new_ms:6.1f}")
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    with tempfile.TemporaryDirectory() as tmp:
+        run('sqlite', f"sqlite:///{os.path.join(tmp, 'bench.db')}", sizes)
+    if os.environ.get('BENCH_POSTGRES_URL'):
+        run('postgres', os.environ['BENCH_POSTGRES_URL'], sizes)
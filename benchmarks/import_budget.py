@@ -0,0 +1,76 @@
+"""
+===========================================
+BENCHMARK - Startup import budget
+===========================================
+Every process (serverless cold start, gunicorn worker) imports app.routes
+before it can serve a request. This check runs `python -X importtime` on
+that import, after the web framework itself is loaded, so the figure
+covers the app's own modules and whatever they pull in. It fails (exit
+code 1) when:
+
+- a library that only report generation needs (reportlab, openpyxl) is
+  imported at startup instead of lazily through app/reports.py, or
+- the import takes longer than the budget (best of several runs).
+
+tests/test_import_budget.py runs the same checks as part of the test suite.
+
+USAGE:
+    python benchmarks/import_budget.py              # 200 ms budget
+    python benchmarks/import_budget.py 100         # custom budget in ms
+    IMPORT_BUDGET_MS=100 python benchmarks/import_budget.py
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded before measuring: every request needs the framework anyway
+FRAMEWORK = 'import flask, flask_sqlalchemy, flask_login, flask_wtf, wtforms, sqlalchemy.orm'
+TARGET = 'app.routes'
+LAZY_ONLY = ('reportlab', 'openpyxl')
+RUNS = 3
+
+
+def import_times():
+    """{module: (self us, cumulative us)} for the target and everything its import loads"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'{FRAMEWORK}\nimport {TARGET}'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    lines = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        lines.append((len(name) - len(name.lstrip()), name.strip(), int(self_us), int(cumulative_us)))
+
+    # Lines come children first; the target's subtree is the run of more
+    # deeply indented lines right before it
+    end = max(i for i, (_, name, _, _) in enumerate(lines) if name == TARGET)
+    depth = lines[end][0]
+    start = end
+    while start > 0 and lines[start - 1][0] > depth:
+        start -= 1
+    return {name: (self_us, cumulative_us) for _, name, self_us, cumulative_us in lines[start:end + 1]}
+
+
+if __name__ == '__main__':
+    budget_ms = float(sys.argv[1] if len(sys.argv) > 1 else os.environ.get('IMPORT_BUDGET_MS', 200))
+    runs = [import_times() for _ in range(RUNS)]
+    best = min(runs, key=lambda times: times[TARGET][1])
+    total_ms = best[TARGET][1] / 1000
+
+    print(f"import {TARGET}: {total_ms:.1f} ms (best of {RUNS}, budget {budget_ms:.0f} ms)")
+    print("slowest modules (self time):")
+    for name, (self_us, _) in sorted(best.items(), key=lambda item: -item[1][0])[:10]:
+        print(f"  {self_us / 1000:7.1f} ms  {name}")
+
+    failures = []
+    eager = sorted({name.split('.')[0] for name in best} & set(LAZY_ONLY))
+    if eager:
+        failures.append(f"imported at startup, should be lazy (app/reports.py): {', '.join(eager)}")
+    if total_ms > budget_ms:
+        failures.append(f"import took {total_ms:.1f} ms, over the {budget_ms:.0f} ms budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
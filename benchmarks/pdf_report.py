@@ -0,0 +1,84 @@
+"""
+===========================================
+BENCHMARK - PDF report rendering
+===========================================
+Compares the original single-Table SimpleDocTemplate report with the
+page-chunked generate_pdf_report, reporting wall time and peak Python
+memory (tracemalloc) for 1k, 10k and 100k row reports.
+
+USAGE:
+    python benchmarks/pdf_report.py                 # 1k/10k/100k rows
+    python benchmarks/pdf_report.py 1000 5000       # custom sizes
+    LEGACY_MAX_ROWS=100000 python benchmarks/pdf_report.py
+                                                    # also time the original at 100k
+                                                    # (can take many minutes)
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Table
+
+from app.reports import PDF_COLUMN_WIDTHS, PDF_HEADER_ROW, PDF_TABLE_STYLE, _pdf_row, generate_pdf_report
+
+LEGACY_MAX_ROWS = int(os.environ.get('LEGACY_MAX_ROWS', 10_000))
+TOTALS = {'total_income': Decimal('0'), 'total_expense': Decimal('0'), 'net_amount': Decimal('0')}
+
+
+def fake_rows(count):
+    """Rows shaped like report_rows(), generated lazily like a server-side cursor"""
+    start = date(2025, 1, 1)
+    for i in range(count):
+        yield (start + timedelta(days=i % 365), 'expense' if i % 3 else 'income',
+               f'Benchmark transaction number {i} with a longer description', 'Food & Dining',
+               'Acme Ltd', Decimal('12.34') + i, None)
+
+
+def legacy_pdf(rows):
+    """The original approach: one platypus Table holding every row, built in a BytesIO"""
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    table = Table([PDF_HEADER_ROW] + [_pdf_row(*row) for row in rows], colWidths=PDF_COLUMN_WIDTHS)
+    table.setStyle(PDF_TABLE_STYLE)
+    doc.build([table])
+    buffer.seek(0)
+    return buffer
+
+
+def chunked_pdf(rows):
+    return generate_pdf_report(rows, "Benchmark Report", totals=TOTALS)
+
+
+def measure(render, rows):
+    """Return (seconds, peak MiB); time and memory come from separate runs
+    because tracemalloc slows rendering down several times"""
+    start = time.perf_counter()
+    render(fake_rows(rows))
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    render(fake_rows(rows))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    for rows in sizes:
+        chunked = measure(chunked_pdf, rows)
+        line = f"{rows:>8,} rows   chunked {chunked[0]:8.2f} s {chunked[1]:8.1f} MiB peak"
+        if rows <= LEGACY_MAX_ROWS:
+            legacy = measure(legacy_pdf, rows)
+            line += f"   original {legacy[0]:8.2f} s {legacy[1]:8.1f} MiB peak"
+        else:
+            line += "   original skipped (set LEGACY_MAX_ROWS)"
+        print(line, flush=True)
@@ -0,0 +1,68 @@
+"""
+===========================================
+BENCHMARK - Connection checkout liveness modes
+===========================================
+Times checking out a pooled connection and running one trivial query
+with DB_POOL_PRE_PING set to 'always' (a ping round trip per checkout),
+'idle' (ping only connections unused for DB_POOL_PING_IDLE_SECONDS) and
+'off', and reports the pings issued (app/db_pool.py).
+
+Set DATABASE_URL to a PostgreSQL database to measure real round trips;
+without it a scratch SQLite file is used, where a ping costs almost
+nothing.
+
+USAGE:
+    python benchmarks/pool_checkout.py           # 5000 checkouts per mode
+    DATABASE_URL=postgresql://... python benchmarks/pool_checkout.py 20000
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from app import db
+from app.db_pool import engine_options, init_pool, pool_stats
+
+
+def make_pool_app(database_url, pre_ping):
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=database_url, DB_POOL_SIZE=5, DB_MAX_OVERFLOW=10,
+                      DB_POOL_TIMEOUT=30, DB_POOL_RECYCLE=300, DB_POOL_PRE_PING=pre_ping,
+                      DB_POOL_PING_IDLE_SECONDS=10)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    db.init_app(app)
+    init_pool(app)
+    return app
+
+
+def run(app, checkouts):
+    """Microseconds per checkout + query, and pings issued"""
+    with app.app_context():
+        engine = db.engine
+        with engine.connect() as connection:  # open the first connection outside the timing
+            connection.exec_driver_sql('SELECT 1')
+        pool_stats.reset()
+        start = time.perf_counter()
+        for _ in range(checkouts):
+            with engine.connect() as connection:
+                connection.exec_driver_sql('SELECT 1')
+        elapsed = time.perf_counter() - start
+        engine.dispose()
+    return elapsed * 1e6 / checkouts, pool_stats.snapshot()['pings']
+
+
+if __name__ == '__main__':
+    checkouts = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        print(f"{database_url.split(':')[0]}, {checkouts:,} checkouts per mode")
+        for mode in ('always', 'idle', 'off'):
+            microseconds, pings = run(make_pool_app(database_url, mode), checkouts)
+            # 'always' pings inside SQLAlchemy, so pool_stats does not count them
+            pings = checkouts if mode == 'always' else pings
+            print(f"  {mode:6s} {microseconds:7.1f} us/checkout   pings {pings:,}", flush=True)
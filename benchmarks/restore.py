@@ -0,0 +1,71 @@
+"""
+===========================================
+BENCHMARK - Restoring a JSON backup
+===========================================
+Writes a gzip JSON backup (stream_backup) of a database with N
+transactions, every tenth one tagged, then restores it into an empty
+database (with its full-text index) using restore_backups(), and reports the wall time and rows/s.
+
+USAGE:
+    python benchmarks/restore.py                  # 100k/1M rows
+    python benchmarks/restore.py 5000000          # custom sizes
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db
+from sqlite_snapshot import make_app, seed
+
+
+def tag_every_tenth(rows):
+    """Give every tenth transaction one of three tags"""
+    from app.models import Tag, transaction_tags
+    for name in ('work', 'travel', 'family'):
+        db.session.add(Tag(name=name))
+    db.session.commit()
+    db.session.execute(transaction_tags.insert(), [
+        {'transaction_id': transaction_id, 'tag_id': transaction_id % 3 + 1}
+        for transaction_id in range(10, rows + 1, 10)])
+    db.session.commit()
+
+
+def write_backup(path):
+    from app.utils import stream_backup
+    with open(path, 'wb') as f:
+        for piece in stream_backup(compress=True):
+            f.write(piece)
+
+
+def time_restore(path):
+    from app.backups import restore_backups
+    from app.models import Role
+    from app.search import ensure_fulltext_index
+    db.drop_all()
+    db.session.execute(db.text("DROP TABLE IF EXISTS transactions_fts"))
+    db.create_all()
+    ensure_fulltext_index()  # restores into an app database pay for the search index too
+    db.session.add(Role(name='Admin', description='bench'))
+    db.session.commit()
+    start = time.perf_counter()
+    restore_backups([path])
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(f"sqlite:///{os.path.join(tmp, 'bench.db')}", tmp)
+        with app.app_context():
+            for rows in sizes:
+                seed(rows)
+                tag_every_tenth(rows)
+                backup_path = os.path.join(tmp, 'backup.json.gz')
+                write_backup(backup_path)
+                seconds = time_restore(backup_path)
+                print(f"{rows:>9,} rows  backup {os.path.getsize(backup_path) / 2**20:6.1f} MiB   "
+                      f"restore {seconds:6.2f} s   {rows / seconds:9,.0f} rows/s", flush=True)
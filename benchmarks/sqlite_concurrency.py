@@ -0,0 +1,120 @@
+"""
+===========================================
+BENCHMARK - SQLite throughput with many threads
+===========================================
+Runs reader threads (the first page of a user's transaction list) and
+writer threads (one transaction insert per commit) against a
+scratch SQLite database for a fixed time, once with SQLite's defaults
+(rollback journal, synchronous=FULL) and once with the PRAGMA profile
+from app/sqlite_profile.py, and reports operations per second and
+"database is locked" errors for each.
+
+USAGE:
+    python benchmarks/sqlite_concurrency.py              # 8 readers, 4 writers, 5 s
+    python benchmarks/sqlite_concurrency.py 12 6 10      # readers, writers, seconds
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import exc, select
+
+from app import db
+from app.sqlite_profile import SQLITE_PRAGMAS, init_sqlite_profile
+from sqlite_snapshot import make_app, seed
+
+# The create_app defaults (Step 5f-2)
+PROFILE = {
+    'SQLITE_BUSY_TIMEOUT': '5000',
+    'SQLITE_JOURNAL_MODE': 'WAL',
+    'SQLITE_SYNCHRONOUS': 'NORMAL',
+    'SQLITE_CACHE_SIZE': '-65536',
+    'SQLITE_MMAP_SIZE': str(256 * 1024 * 1024),
+    'SQLITE_TEMP_STORE': 'MEMORY',
+}
+DEFAULTS = {key: '' for _, key in SQLITE_PRAGMAS}
+
+
+def make_profile_app(database_url, upload_folder, settings):
+    app = make_app(database_url, upload_folder)
+    app.config.update(settings)
+    init_sqlite_profile(app)
+    return app
+
+
+def run(app, readers, writers, seconds):
+    """Reads/s, writes/s and lock errors with all threads running at once"""
+    from app.models import Transaction
+
+    table = Transaction.__table__
+    first_page = select(table).where(table.c.user_id == 1).order_by(
+        table.c.transaction_date.desc(), table.c.created_at.desc(), table.c.id.desc()).limit(20)
+    counts = {'reads': 0, 'writes': 0, 'locked': 0}
+    lock = threading.Lock()
+    start_gate = threading.Barrier(readers + writers + 1)
+    stop = threading.Event()
+
+    def read(engine):
+        with engine.connect() as connection:
+            connection.execute(first_page).all()
+
+    def write(engine):
+        now = datetime.utcnow()
+        with engine.begin() as connection:
+            connection.execute(table.insert(), {
+                'type': 'expense', 'amount': 12.5, 'description': 'concurrency bench',
+                'transaction_date': date.today(), 'created_at': now, 'updated_at': now,
+                'user_id': 1, 'category_id': 1})
+
+    def worker(operation, field):
+        start_gate.wait()
+        done = locked = 0
+        while not stop.is_set():
+            try:
+                operation(engine)
+                done += 1
+            except exc.OperationalError as error:
+                if 'locked' not in str(error):
+                    raise
+                locked += 1
+        with lock:
+            counts[field] += done
+            counts['locked'] += locked
+
+    with app.app_context():
+        engine = db.engine
+        threads = ([threading.Thread(target=worker, args=(read, 'reads')) for _ in range(readers)]
+                   + [threading.Thread(target=worker, args=(write, 'writes')) for _ in range(writers)])
+        for thread in threads:
+            thread.start()
+        start_gate.wait()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+        db.session.remove()
+        engine.dispose()
+    return counts['reads'] / seconds, counts['writes'] / seconds, counts['locked'], journal_mode
+
+
+if __name__ == '__main__':
+    readers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    writers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+    print(f"{readers} readers, {writers} writers, {seconds:g} s per run, 50,000 seeded transactions")
+    for label, settings in (('defaults', DEFAULTS), ('profile', PROFILE)):
+        # A fresh file per run: the journal mode is stored in the database
+        with tempfile.TemporaryDirectory() as tmp:
+            app = make_profile_app(f"sqlite:///{os.path.join(tmp, 'bench.db')}", tmp, settings)
+            with app.app_context():
+                seed(50000)
+            reads, writes, locked, journal_mode = run(app, readers, writers, seconds)
+        print(f"  {label:8s} ({journal_mode:6s}) reads {reads:8,.0f}/s   writes {writes:7,.0f}/s   "
+              f"locked errors {locked:,}", flush=True)
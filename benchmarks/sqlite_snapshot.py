@@ -0,0 +1,107 @@
+"""
+===========================================
+BENCHMARK - SQLite snapshot vs JSON backup
+===========================================
+Compares the streaming JSON backup (stream_backup, gzip) with the native
+SQLite snapshot (create_sqlite_snapshot: online backup API + zip), reporting
+wall time and output size for databases of 100k and 1M transactions.
+
+USAGE:
+    python benchmarks/sqlite_snapshot.py                  # 100k/1M rows
+    python benchmarks/sqlite_snapshot.py 5000000          # custom sizes
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from app import db
+
+
+def make_app(database_url, upload_folder):
+    """Minimal app bound to a scratch database (create_app would use the real one)"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['UPLOAD_FOLDER'] = upload_folder
+    db.init_app(app)
+    return app
+
+
+def seed(rows):
+    """Fill the scratch database with `rows` transactions spread over two years"""
+    from app.models import Category, Role, Transaction, User
+
+    db.drop_all()
+    db.create_all()
+    role = Role(name='Admin', description='bench')
+    db.session.add(role)
+    db.session.flush()
+    db.session.add(User(username='bench', email='bench@example.com', password_hash='x', role_id=role.id))
+    for name in ('Food', 'Rent', 'Salary', 'Other'):
+        db.session.add(Category(name=name))
+    db.session.commit()
+
+    random.seed(42)
+    today = date.today()
+    now = datetime.utcnow()
+    batch = []
+    for i in range(rows):
+        batch.append({
+            'type': 'income' if i % 4 == 0 else 'expense',
+            'amount': round(random.uniform(1, 500), 2),
+            'description': f'bench transaction {i} at some merchant',
+            'party': f'merchant {i % 500}',
+            'transaction_date': today - timedelta(days=random.randint(0, 730)),
+            'created_at': now,
+            'updated_at': now,
+            'user_id': 1,
+            'category_id': random.randint(1, 4),
+        })
+        if len(batch) == 10000:
+            db.session.execute(Transaction.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Transaction.__table__.insert(), batch)
+    db.session.commit()
+
+
+def time_json_backup(path):
+    from app.utils import stream_backup
+    start = time.perf_counter()
+    with open(path, 'wb') as f:
+        for piece in stream_backup(compress=True):
+            f.write(piece)
+    return time.perf_counter() - start
+
+
+def time_snapshot(path):
+    from app.backups import create_sqlite_snapshot
+    start = time.perf_counter()
+    create_sqlite_snapshot(path)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, 'bench.db')
+        app = make_app(f"sqlite:///{database_path}", tmp)
+        with app.app_context():
+            for rows in sizes:
+                seed(rows)
+                json_path, zip_path = os.path.join(tmp, 'backup.json.gz'), os.path.join(tmp, 'snapshot.zip')
+                json_seconds = time_json_backup(json_path)
+                snapshot_seconds = time_snapshot(zip_path)
+                mib = lambda path: os.path.getsize(path) / 2**20
+                print(f"{rows:>9,} rows  db {mib(database_path):7.1f} MiB   "
+                      f"json+gzip {json_seconds:7.2f} s {mib(json_path):6.1f} MiB   "
+                      f"snapshot {snapshot_seconds:6.2f} s {mib(zip_path):6.1f} MiB   "
+                      f"x{json_seconds / snapshot_seconds:5.1f}", flush=True)
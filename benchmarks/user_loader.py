@@ -0,0 +1,56 @@
+"""
+===========================================
+BENCHMARK - Cached user loader
+===========================================
+Times what Flask-Login does at the start of every authenticated request,
+load_user() plus a few has_permission() checks, with the per-process user
+cache off (USER_CACHE_TTL=0, the old User.query.get + lazy role load) and
+on, and counts the SQL statements each request runs.
+
+USAGE:
+    python benchmarks/user_loader.py            # 2000 simulated requests
+    python benchmarks/user_loader.py 10000
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import db, load_user
+from sqlite_snapshot import make_app, seed
+
+
+def run(app, requests):
+    """Return (ms per request, statements per request)"""
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    start = time.perf_counter()
+    for _ in range(requests):
+        with app.test_request_context():
+            user = load_user('1')
+            for permission in ('read', 'create', 'reports', 'manage_users'):
+                user.has_permission(permission)
+            db.session.remove()
+    elapsed = time.perf_counter() - start
+    event.remove(db.engine, 'before_cursor_execute', listener)
+    return elapsed * 1000 / requests, len(statements) / requests
+
+
+if __name__ == '__main__':
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(f"sqlite:///{os.path.join(tmp, 'bench.db')}", tmp)
+        app.config['USER_CACHE_MAX_ENTRIES'] = 10000
+        with app.app_context():
+            seed(0)
+        for label, ttl in (('uncached', 0), ('cached', 60)):
+            app.config['USER_CACHE_TTL'] = ttl
+            with app.app_context():
+                ms, queries = run(app, requests)
+            print(f"{label:9s} {ms:6.3f} ms/request  {queries:4.2f} queries/request", flush=True)
@@ -0,0 +1,57 @@
+"""
+===========================================
+TEST FIXTURES
+===========================================
+One application per test session on a scratch SQLite file (SQLITE_PATH),
+so the tests never touch instance/cashbook.db. create_app() seeds the
+default roles and the admin / admin123 account.
+"""
+
+import logging
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.setenv('SQLITE_PATH', str(tmp_path_factory.mktemp('db') / 'cashbook.db'))
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    monkeypatch.delenv('READ_REPLICA_URL', raising=False)
+
+    from app import create_app
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    logging.disable(logging.CRITICAL)
+    yield app
+    logging.disable(logging.NOTSET)
+    monkeypatch.undo()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_client(client):
+    response = client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    assert response.status_code == 302
+    return client
+
+
+@pytest.fixture(scope='session')
+def sample_transactions(app):
+    """Three of the admin's transactions, all with 'zebrawood' in the description"""
+    from app.models import Category
+
+    with app.app_context():
+        category_id = Category.query.first().id
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    for i in range(3):
+        response = client.post('/transactions/add', data={
+            'type': 'expense', 'amount': str(10 + i), 'description': f'zebrawood shelf {i}',
+            'transaction_date': '2026-01-15', 'category_id': category_id})
+        assert response.status_code == 302
+    return 3
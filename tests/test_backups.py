@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import inspect
+
+from app import backups, db
+from app.utils import stream_backup
+
+
+@pytest.fixture
+def backup_file(app, tmp_path, sample_transactions):
+    path = tmp_path / 'full.json'
+    with app.app_context():
+        path.write_bytes(b''.join(stream_backup()))
+    return str(path)
+
+
+def index_names(app):
+    with app.app_context():
+        return {index['name'] for index in inspect(db.engine).get_indexes('transactions')}
+
+
+def restore_watching_drops(app, monkeypatch, path):
+    dropped = []
+    original_drop = backups.db.Index.drop
+    monkeypatch.setattr(backups.db.Index, 'drop',
+                        lambda index, *args, **kwargs: (dropped.append(index.name),
+                                                        original_drop(index, *args, **kwargs)))
+    with app.app_context():
+        backups.restore_backups([path])
+    return dropped
+
+
+def test_count_backup_rows_stops_at_threshold(backup_file):
+    total = backups.count_backup_rows(backup_file, ('transactions',))
+    assert total > 1
+    assert backups.count_backup_rows(backup_file, ('transactions',), stop_at=1) == 1
+
+
+def test_small_restore_keeps_indexes(app, monkeypatch, backup_file):
+    before = index_names(app)
+    monkeypatch.setattr(backups, 'RESTORE_INDEX_REBUILD_ROWS', 10 ** 6)
+    assert restore_watching_drops(app, monkeypatch, backup_file) == []
+    assert index_names(app) == before
+
+
+def test_large_restore_rebuilds_indexes(app, monkeypatch, backup_file):
+    before = index_names(app)
+    monkeypatch.setattr(backups, 'RESTORE_INDEX_REBUILD_ROWS', 1)
+    assert 'ix_transactions_user_date' in restore_watching_drops(app, monkeypatch, backup_file)
+    assert index_names(app) == before
@@ -0,0 +1,49 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app import db
+from app.models import Category, Role, Transaction, User, get_data_version
+
+
+@pytest.fixture(scope='module')
+def viewer_id(app):
+    with app.app_context():
+        viewer = User(username='viewer-dv', email='viewer-dv@example.com', password_hash='x',
+                      role_id=Role.query.filter_by(name='Viewer').one().id)
+        db.session.add(viewer)
+        db.session.commit()
+        return viewer.id
+
+
+def add_transaction(user_id):
+    db.session.add(Transaction(type='expense', amount=Decimal('5.00'), description='data version probe',
+                               transaction_date=date(2026, 2, 1), user_id=user_id,
+                               category_id=Category.query.first().id))
+    db.session.commit()
+
+
+def versions(admin_id, viewer_id):
+    return get_data_version(admin_id), get_data_version(viewer_id), get_data_version()
+
+
+def test_write_bumps_only_the_writers_version(app, viewer_id):
+    with app.app_context():
+        admin_id = User.query.filter_by(username='admin').one().id
+        admin_before, viewer_before, all_before = versions(admin_id, viewer_id)
+        add_transaction(viewer_id)
+        admin_after, viewer_after, all_after = versions(admin_id, viewer_id)
+    assert admin_after == admin_before
+    assert viewer_after != viewer_before
+    assert all_after != all_before
+
+
+def test_category_change_bumps_every_version(app, viewer_id):
+    with app.app_context():
+        admin_id = User.query.filter_by(username='admin').one().id
+        before = versions(admin_id, viewer_id)
+        Category.query.first().description = 'renamed for the data version test'
+        db.session.commit()
+        after = versions(admin_id, viewer_id)
+    assert all(old != new for old, new in zip(before, after))
@@ -0,0 +1,35 @@
+from flask import Flask
+
+from app import db
+from app.db_pool import init_pool, pool_status, stats_for
+
+
+def make_pool_app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.db'}",
+        SQLALCHEMY_BINDS={'replica': f"sqlite:///{tmp_path / 'replica.db'}"},
+        DB_POOL_PRE_PING='idle', DB_POOL_PING_IDLE_SECONDS=0)
+    db.init_app(app)
+    init_pool(app)
+    return app
+
+
+def test_replica_connections_are_pinged_and_counted(tmp_path):
+    app = make_pool_app(tmp_path)
+    for bind_key in (None, 'replica'):
+        stats_for(bind_key).reset()
+    with app.app_context():
+        replica = db.engines['replica']
+        for _ in range(3):
+            with replica.connect() as connection:
+                connection.exec_driver_sql('SELECT 1')
+        status = pool_status()
+        for engine in db.engines.values():
+            engine.dispose()
+
+    assert status['replica']['checkouts'] == 3
+    assert status['replica']['connects'] == 1
+    # Checked in, then idle for >= 0 s: every later checkout is pinged
+    assert status['replica']['pings'] == 2
+    assert status['checkouts'] == 0
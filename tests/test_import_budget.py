@@ -0,0 +1,26 @@
+"""
+Startup import budget: `python -X importtime` on `import app.routes`
+(see benchmarks/import_budget.py for the per-module breakdown).
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from import_budget import LAZY_ONLY, RUNS, TARGET, import_times  # noqa: E402
+
+BUDGET_MS = float(os.environ.get('IMPORT_BUDGET_MS', 200))
+
+
+def test_report_libraries_are_not_imported_at_startup():
+    times = import_times()
+    eager = sorted(name for name in times if name.split('.')[0] in LAZY_ONLY)
+    assert eager == [], "import these lazily through app/reports.py"
+
+
+def test_app_routes_import_stays_within_budget():
+    # Best of a few runs, so one slow run on a busy machine does not fail it
+    best_ms = min(import_times()[TARGET][1] for _ in range(RUNS)) / 1000
+    assert best_ms <= BUDGET_MS, f"import {TARGET} took {best_ms:.1f} ms, budget {BUDGET_MS:.0f} ms"
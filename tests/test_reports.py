@@ -0,0 +1,34 @@
+from datetime import date
+from decimal import Decimal
+
+from reportlab.platypus import Table
+
+from app.reports import PDF_COLUMN_WIDTHS, PDF_HEADER_ROW, PDF_TABLE_STYLE, _pdf_row, generate_pdf_report
+
+
+def row_height(row):
+    def height(body):
+        table = Table([PDF_HEADER_ROW] + body, colWidths=PDF_COLUMN_WIDTHS)
+        table.setStyle(PDF_TABLE_STYLE)
+        return table.wrap(1000, 1000)[1]
+    return height([row]) - height([])
+
+
+def report_row(description, category='Groceries'):
+    return (date(2026, 3, 1), 'expense', description, category, None, Decimal('12.50'), None)
+
+
+def test_long_descriptions_stay_one_line_high():
+    short = row_height(_pdf_row(*report_row('Coffee')))
+    long_description = 'Weekly shop\nmilk, bread,\r\neggs ' + 'and a very long list of things ' * 20
+    cells = _pdf_row(*report_row(long_description, category='Household\nsupplies ' * 5))
+    assert row_height(cells) == short
+    assert cells[2].endswith('...') and '\n' not in cells[2]
+    assert _pdf_row(*report_row('Coffee'))[2] == 'Coffee'
+
+
+def test_pdf_report_with_long_descriptions():
+    rows = [report_row(f'line one {i}\nline two\nline three ' * 10) for i in range(120)]
+    buffer = generate_pdf_report(rows, totals={'total_income': Decimal('0'), 'total_expense': Decimal('1500'),
+                                               'net_amount': Decimal('-1500')})
+    assert buffer.read(8).startswith(b'%PDF')
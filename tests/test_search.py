@@ -0,0 +1,17 @@
+import pytest
+
+
+def search(client, limit):
+    response = client.get(f'/api/transactions/search?q=zebrawood&limit={limit}')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_search_limit(admin_client, sample_transactions):
+    assert len(search(admin_client, 2)) == 2
+    assert len(search(admin_client, 100)) == sample_transactions
+
+
+@pytest.mark.parametrize('limit', [-1, 0])
+def test_search_limit_below_one_returns_one_result(admin_client, sample_transactions, limit):
+    assert len(search(admin_client, limit)) == 1
@@ -0,0 +1,25 @@
+from datetime import date
+from decimal import Decimal
+
+from app import db
+from app.models import SpendingLimit, User
+
+
+def test_dashboard_commits_refreshed_counters(app, admin_client):
+    with app.app_context():
+        limit = SpendingLimit(type='daily', amount=Decimal('50.00'),
+                              user_id=User.query.filter_by(username='admin').one().id,
+                              current_period_start=date(2000, 1, 1), current_spent=Decimal('999.00'))
+        db.session.add(limit)
+        db.session.commit()
+        limit_id = limit.id
+
+    assert admin_client.get('/dashboard').status_code == 200
+
+    table = SpendingLimit.__table__
+    with app.app_context(), db.engine.connect() as connection:
+        period_start, spent = connection.execute(
+            db.select(table.c.current_period_start, table.c.current_spent).where(table.c.id == limit_id)
+        ).one()
+    assert period_start == date.today()
+    assert spent != Decimal('999.00')
@@ -0,0 +1,55 @@
+import pytest
+
+from app import db
+from app.models import Role, User
+from app.user_cache import _read_version, bump_users_version, load_cached_user, user_cache
+
+
+@pytest.fixture(scope='module')
+def member_id(app):
+    with app.app_context():
+        member = User(username='member-uc', email='member-uc@example.com', password_hash='x',
+                      role_id=Role.query.filter_by(name='Manager').one().id)
+        db.session.add(member)
+        db.session.commit()
+        return member.id
+
+
+def users_version():
+    with db.engine.connect() as connection:
+        return _read_version(connection)
+
+
+def test_access_changes_bump_the_shared_version(app, member_id):
+    with app.app_context():
+        before = users_version()
+        db.session.get(User, member_id).email = 'member-uc@example.org'
+        db.session.commit()
+        assert users_version() == before
+
+        db.session.get(User, member_id).role = Role.query.filter_by(name='Viewer').one()
+        db.session.commit()
+        demoted = users_version()
+        assert demoted != before
+
+        db.session.get(User, member_id).is_active = False
+        db.session.commit()
+        assert users_version() != demoted
+
+
+def test_other_process_deactivation_drops_cached_user(app, member_id, monkeypatch):
+    monkeypatch.setitem(app.config, 'USER_CACHE_RECHECK_SECONDS', 0)
+    users = User.__table__
+    with app.test_request_context():
+        with db.engine.begin() as connection:
+            connection.execute(users.update().where(users.c.id == member_id).values(is_active=True))
+            bump_users_version(connection)
+        assert load_cached_user(member_id).is_active
+        db.session.rollback()
+
+        # Another process: its flush writes the row and bumps the version
+        with db.engine.begin() as connection:
+            connection.execute(users.update().where(users.c.id == member_id).values(is_active=False))
+            bump_users_version(connection)
+        assert user_cache.get(member_id) is not None
+        assert not load_cached_user(member_id).is_active
@@ -0,0 +1,5 @@
+def test_users_page_renders_for_admin(admin_client):
+    response = admin_client.get('/users')
+    assert response.status_code == 200
+    assert b'/users/1/edit' in response.data
+    assert b'Manage users and roles' in response.data